@@ -33,6 +33,10 @@ class DefaultParams:
     update_timer_time = 1000
     ramp_timer_time = 10000
 
+    # threaded connection parameters
+    connection_read_deadline = 2  # queued polling calls of update loops older than this (in s) are dropped
+    connection_close_timeout = 5000  # maximum time (in ms) to wait for device workers to finish on close
+
     # PSU parameters
     psu_voltage_deviation = 5
     psu_voltage_maximum = 6000
@@ -67,6 +71,23 @@ class DefaultParams:
     db_folder = 'DB'
     db_file_sqlite3 = 'Laserlab.db'
     db_file_duckdb = 'Laserlab.duckdb'
+    db_archive_suffix = '_archive'
+    db_cache_size = 256 * 1024 ** 2
+    db_heartbeat_time = 300
+    db_maintenance_idle_time = 30
+    db_checkpoint_threshold = '256MB'
+    db_readers = 2
+    db_journal_suffix = '_journal'
+    db_journal_size = 1024 ** 2
+    db_journal_sync_time = 1
+
+    # history parameters
+    history_preview_points = 2000
+    history_export_chunk_time = 86400
+    history_live_time = 600
+    history_statistics = ('count', 'min', 'max', 'mean', 'std')
+    history_statistics_percentiles = ('p5', 'median', 'p95')
+    history_statistics_percentile_time = 86400
 
     # logging parameters
     logging_folder = 'log'
@@ -1,11 +1,21 @@
+from __future__ import annotations
+
 from typing import TYPE_CHECKING, Callable
-from time import time, sleep
+from time import perf_counter, time
+from threading import Condition, Event, Timer, Lock
+from concurrent.futures import Future, InvalidStateError
+import asyncio
+from collections import deque
+from enum import Enum
+
+
+import numpy as np
 
 
 from PyQt6.QtCore import QObject, pyqtSignal, QRunnable, pyqtSlot, QThreadPool
 
 
-from Config.GlobalConf import GlobalConf
+from Config.GlobalConf import GlobalConf, DefaultParams
 
 from Connection.ISEG import ISEGConnection
 from Connection.TPG300 import TPG300Connection
@@ -49,28 +59,139 @@ class CallbackId:
         return self.id
 
 
+class DeviceThreadPool:
+    """
+    Thread pool for long-lived device I/O workers (<ConnectionWorker>, ScriptServerWorker), which keeps one thread per
+    running worker, so they do not occupy QThreadPool.globalInstance(), which stays free for short background jobs.
+    Use globalInstance() to get the shared instance
+    """
+
+    _instance: DeviceThreadPool | None = None
+
+    def __init__(self):
+        self.threadpool = QThreadPool()
+        self.lock = Lock()
+        self.task_id = CallbackId()
+        self.tasks: dict[int, tuple[str, float, QRunnable]] = {}
+
+    @classmethod
+    def globalInstance(cls) -> DeviceThreadPool:
+        """Returns the shared device thread pool"""
+
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def start(self, runnable: QRunnable, name: str):
+        """
+        Starts runnable in its own thread, the number of threads follows the number of running workers (e.g. open connections)
+
+        :param runnable: worker to run
+        :param name: name of worker shown in occupancy()
+        """
+
+        with self.lock:
+            task_id = self.task_id()
+            self.tasks[task_id] = (name, time(), runnable)
+            self.threadpool.setMaxThreadCount(len(self.tasks))
+
+        def run():
+            try:
+                runnable.run()
+            finally:
+                # idle threads expire after QThreadPool.expiryTimeout()
+                with self.lock:
+                    del self.tasks[task_id]
+                    self.threadpool.setMaxThreadCount(max(1, len(self.tasks)))
+
+        self.threadpool.start(run)
+
+    def occupancy(self) -> dict:
+        """
+        Returns occupancy of the device thread pool and of QThreadPool.globalInstance():
+        number of threads, active threads and list of running tasks (name, start time, runnable) of the device thread pool
+        """
+
+        global_pool = QThreadPool.globalInstance()
+        with self.lock:
+            tasks = list(self.tasks.values())
+        return {
+            'device_threads': self.threadpool.maxThreadCount(),
+            'device_active': self.threadpool.activeThreadCount(),
+            'device_tasks': tasks,
+            'global_threads': global_pool.maxThreadCount(),
+            'global_active': global_pool.activeThreadCount(),
+        }
+
+    def waitForDone(self, timeout: int = -1) -> bool:
+        """
+        Waits until all workers are finished and returns if they are
+
+        :param timeout: maximum time to wait in ms (-1 to wait forever)
+        """
+
+        return self.threadpool.waitForDone(timeout)
+
+
+class DeviceFuture(Future):
+    """
+    Future of a call of a <ThreadedConnection>, which is resolved in the worker thread and can be awaited in asyncio
+
+    Calls that were not started can be cancelled, they are not executed then. Use <ThreadedConnection.callback()> to handle the
+    result in the GUI thread, since callbacks of add_done_callback() are executed in the worker thread
+    """
+
+    def __await__(self):
+        return asyncio.wrap_future(self).__await__()
+
+
 class ConnectionWorkerSignals(QObject):
     """
     Signals for connection worker
 
     error: callback_id, any occurring error
     result: callback_id, result
+    dropped: callback_id of a call that was dropped, since its deadline passed
     """
 
     error = pyqtSignal(int, Exception)
     result = pyqtSignal(int, object)
+    dropped = pyqtSignal(int)
 
 
 class ConnectionWorker(QRunnable):
     """
-    Threaded worker for handling a connection without lagging the input panel
+    Threaded worker for handling a connection without lagging the input panel.
+    The worker sleeps on a condition until work is queued, so calls are dispatched right after execute()
+
+    Calls are queued in lanes of priorities (see <ConnectionWorker.Priority>) and the lane with the highest priority is always
+    executed first, so setters and safety actions do not wait behind polling reads. Calls can have a deadline, after which they
+    are dropped instead of executed (e.g. polling reads, see <ThreadedConnection.polling()>).
+
+    Identical pending reads (same function, arguments and priority, see isRead()) are coalesced: the call is queued once and its
+    result is emitted for every callback_id that requested it, so the queue holds at most one read per function and arguments
 
     :param connection: any connection class
     :param auto_delete: auto delete after x time has passed
     """
 
+    class Priority(Enum):
+        Interlock = 0
+        Write = 1
+        Read = 2
+
     max_queue = 100
 
+    # number of last calls whose dispatch latency is kept per priority (see dispatchLatency())
+    latency_samples = 1000
+
+    # functions with these prefixes or suffixes only read from the device and can be coalesced
+    read_prefixes = ('get', 'read', 'measure')
+    read_suffixes = ('Get',)
+
+    # reading functions that consume data from the device, so every call must be executed
+    read_excluded = ('read', 'readRaw', 'readline', 'readData', 'readInit', 'parseRead', 'getLastData', 'getNextFastArrayMeasurement', 'getBurstArraySamples')
+
     def __init__(self, connection, auto_delete: int | None = max_queue // 2):
         super().__init__()
         self.connection: ISEGConnection | ThyracontConnection | MonacoConnection | TLPMxConnection = connection
@@ -79,7 +200,14 @@ class ConnectionWorker(QRunnable):
         self.close_called = False
         self.started = False
         self.auto_delete = auto_delete
-        self.work = []
+        self.work: dict[ConnectionWorker.Priority, deque] = {priority: deque() for priority in self.Priority}
+        self.pending: dict[tuple, list[int]] = {}
+        self.futures: dict[int, DeviceFuture] = {}
+        self.coalesced_calls = 0
+        self.condition = Condition()
+        self.stopped = Event()
+        self.latencies = {priority: deque(maxlen=self.latency_samples) for priority in self.Priority}
+        self.dropped_calls = {priority: 0 for priority in self.Priority}
 
     @pyqtSlot()
     def run(self):
@@ -87,68 +215,296 @@ class ConnectionWorker(QRunnable):
 
         self.started = True
 
-        while True:
-            if not self.running:
-                break
-
-            if not self.work:
-                sleep(0.1)
-                continue
+        try:
+            while True:
+                with self.condition:
+                    while self.running and not self.queued():
+                        self.condition.wait()
+                    if not self.running:
+                        break
+                    priority = next(priority for priority, work in self.work.items() if work)
+                    callback_id, queued_time, deadline, name, args, kwargs, key = self.work[priority].popleft()
+                    # reads requested from now on are queued again, since they expect a value newer than this call
+                    callback_ids = self.pending.pop(key, [callback_id]) if key is not None else [callback_id]
+                    futures = {callback_id: self.futures.pop(callback_id) for callback_id in callback_ids if callback_id in self.futures}
+
+                    now = perf_counter()
+                    if deadline is not None and now > deadline:
+                        self.dropped_calls[priority] += 1
+                    else:
+                        self.latencies[priority].append(now - queued_time)
 
-            callback_id, _, name, args, kwargs = self.work.pop(0)
+                if deadline is not None and now > deadline:
+                    for future in futures.values():
+                        future.cancel()
+                    for callback_id in callback_ids:
+                        self.signal.dropped.emit(callback_id)
+                    continue
 
-            try:
-                obj_func = getattr(self.connection, name)
-                result = obj_func(*args, **kwargs)
-                self.signal.result.emit(callback_id, result)
-            except Exception as error:
-                self.signal.error.emit(callback_id, error)
+                # cancelled futures are skipped and the call is not executed if nothing else requested it
+                callback_ids = [callback_id for callback_id in callback_ids if callback_id not in futures or futures[callback_id].set_running_or_notify_cancel()]
+                if not callback_ids:
+                    continue
+                futures = [futures[callback_id] for callback_id in callback_ids if callback_id in futures]
 
-            if name == 'close':
-                self.close_called = True
-                self.running = False
-                self.work = []
+                try:
+                    obj_func = getattr(self.connection, name)
+                    result = obj_func(*args, **kwargs)
+                    for future in futures:
+                        future.set_result(result)
+                    for callback_id in callback_ids:
+                        self.signal.result.emit(callback_id, result)
+                except Exception as error:
+                    for future in futures:
+                        future.set_exception(error)
+                    for callback_id in callback_ids:
+                        self.signal.error.emit(callback_id, error)
+
+                if name == 'close':
+                    with self.condition:
+                        self.close_called = True
+                        self.running = False
+                        for work in self.work.values():
+                            work.clear()
+                        self.pending.clear()
+                        for future in self.futures.values():
+                            future.cancel()
+                        self.futures.clear()
+        finally:
+            self.stopped.set()
+
+    def queued(self) -> int:
+        """Returns number of queued calls"""
+
+        return sum(len(work) for work in self.work.values())
 
     def execute(self, callback_id: int, name, *args, **kwargs):
+        """
+        Adds function call to connection with the default priority and without deadline
+
+        :param callback_id: unique id of callback
+        :param name: function name
+        """
+
+        return self.submit(callback_id, name, args, kwargs)
+
+    def submit(
+        self,
+        callback_id: int,
+        name: str,
+        args: tuple,
+        kwargs: dict,
+        priority: Priority | None = None,
+        deadline: float | None = None,
+        future: DeviceFuture | None = None
+    ):
         """
         Adds function call to connection
 
         :param callback_id: unique id of callback
         :param name: function name
+        :param args: arguments of call
+        :param kwargs: keyword arguments of call
+        :param priority: priority of call (default: Read for reads, Write otherwise)
+        :param deadline: time in s after which the call is dropped if not started (None to always execute it)
+        :param future: future, which is resolved with the result of the call (it is cancelled if the call is dropped and gets the exception if the call is rejected)
         """
 
-        if name == 'close':
-            self.work.insert(0, (callback_id, time(), name, args, kwargs))
-            return callback_id
+        is_read = self.isRead(name)
+        if priority is None:
+            priority = self.Priority.Read if is_read else self.Priority.Write
+        now = perf_counter()
+        deadline_time = None if deadline is None else now + deadline
 
-        if len(self.work) > self.max_queue:
-            if self.auto_delete is None:
-                self.signal.error.emit(-1, BufferError('Too many tasks in queue'))
+        with self.condition:
+            if name == 'close':
+                self.work[self.Priority.Interlock].appendleft((callback_id, now, None, name, args, kwargs, None))
+                self.condition.notify()
+                return callback_id
+
+            if future is not None:
+                self.futures[callback_id] = future
+
+            key = self.readKey(name, args, kwargs, priority) if is_read else None
+            if key is not None and key in self.pending and self.running:
+                self.pending[key].append(callback_id)
+                self.coalesced_calls += 1
+                # the queued call also answers the newest request, so it is kept until the deadline of that request
+                for index, work in enumerate(self.work[priority]):
+                    if work[6] == key:
+                        self.work[priority][index] = work[:2] + (deadline_time, ) + work[3:]
+                        break
+                return callback_id
+
+            # interlock calls are never rejected
+            if priority != self.Priority.Interlock and self.queued() > self.max_queue:
+                if self.auto_delete is None:
+                    self.signal.error.emit(-1, BufferError('Too many tasks in queue'))
+                    self._rejectFuture(callback_id, BufferError('Too many tasks in queue'))
+                    return -1
+
+                self.signal.error.emit(-1, BufferError('Too many tasks in queue, will delete possible oldest ones'))
+                auto_delete_time = now - self.auto_delete
+                deleted_callback_ids = []
+                for lane in self.Priority:
+                    for work in self.work[lane]:
+                        if work[1] <= auto_delete_time or (work[2] is not None and work[2] < now):
+                            deleted_callback_ids.extend(self.pending.pop(work[6], [work[0]]) if work[6] is not None else [work[0]])
+                    self.work[lane] = deque(work for work in self.work[lane] if work[1] > auto_delete_time and (work[2] is None or work[2] >= now))
+                for deleted_callback_id in deleted_callback_ids:
+                    self._rejectFuture(deleted_callback_id, BufferError('Deleted from queue, since too many tasks were queued'))
+                self._rejectFuture(callback_id, BufferError('Too many tasks in queue'))
+                return deleted_callback_ids
+
+            if not self.running:
+                if self.close_called:
+                    future = self.futures.pop(callback_id, None)
+                    if future is not None:
+                        future.cancel()
+                    return -10
+
+                self.signal.error.emit(-1, ChildProcessError('Not running'))
+                self._rejectFuture(callback_id, ChildProcessError('Not running'))
                 return -1
 
-            self.signal.error.emit(-1, BufferError('Too many tasks in queue, will delete possible oldest ones'))
-            auto_delete_time = time() - self.auto_delete
-            deleted_callback_ids = []
-            for _ in range(len(self.work)):
-                try:
-                    work = self.work.pop(0)
-                    if work[1] > auto_delete_time:
-                        work.append(work)
-                    else:
-                        deleted_callback_ids.append(work[0])
-                except IndexError:
-                    pass
-            return deleted_callback_ids
+            # queued calls of lower priority would run after the interlock call and undo it
+            if priority == self.Priority.Interlock:
+                self._supersede(name, args)
 
-        if not self.running:
-            if self.close_called:
-                return -10
+            self.work[priority].append((callback_id, now, deadline_time, name, args, kwargs, key))
+            if key is not None:
+                self.pending[key] = [callback_id]
+            self.condition.notify()
+            return callback_id
 
-            self.signal.error.emit(-1, ChildProcessError('Not running'))
-            return -1
+    def _supersede(self, name: str, args: tuple):
+        """
+        Drops queued calls of lower priority than Interlock of the same function and channel (all positional arguments except
+        the last one, which is the value), their callbacks are dropped and their futures cancelled. Expects the condition to be held
 
-        self.work.append((callback_id, time(), name, args, kwargs))
-        return callback_id
+        :param name: function name of interlock call
+        :param args: arguments of interlock call
+        """
+
+        for lane in (self.Priority.Write, self.Priority.Read):
+            superseded = [work for work in self.work[lane] if work[3] == name and work[4][:-1] == args[:-1]]
+            if not superseded:
+                continue
+            self.work[lane] = deque(work for work in self.work[lane] if not (work[3] == name and work[4][:-1] == args[:-1]))
+            self.dropped_calls[lane] += len(superseded)
+            for work in superseded:
+                callback_ids = self.pending.pop(work[6], [work[0]]) if work[6] is not None else [work[0]]
+                for callback_id in callback_ids:
+                    future = self.futures.pop(callback_id, None)
+                    if future is not None:
+                        future.cancel()
+                    self.signal.dropped.emit(callback_id)
+
+    def _rejectFuture(self, callback_id: int, error: Exception):
+        """
+        Sets exception of future of a call that was not queued or deleted from the queue
+
+        :param callback_id: unique id of call
+        :param error: exception
+        """
+
+        future = self.futures.pop(callback_id, None)
+        if future is not None and future.set_running_or_notify_cancel():
+            future.set_exception(error)
+
+    @classmethod
+    def isRead(cls, name: str) -> bool:
+        """
+        Returns if function only reads from the device, so identical pending calls can be coalesced
+
+        :param name: function name
+        """
+
+        if name in cls.read_excluded:
+            return False
+        return name.startswith(cls.read_prefixes) or name.endswith(cls.read_suffixes)
+
+    @classmethod
+    def readKey(cls, name: str, args: tuple, kwargs: dict, priority: Priority) -> tuple | None:
+        """
+        Returns key of a read for coalescing or None if the call can not be coalesced
+
+        :param name: function name
+        :param args: arguments of call
+        :param kwargs: keyword arguments of call
+        :param priority: priority of call
+        """
+
+        if not cls.isRead(name):
+            return None
+        key = (priority, name, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def dispatchLatency(self) -> dict[str, dict[str, float | int]]:
+        """
+        Returns number of executed and dropped calls, median, 95th percentile and maximum in milliseconds of the time between
+        submitting and starting the last calls for every priority
+        """
+
+        with self.condition:
+            all_latencies = {priority: list(latencies) for priority, latencies in self.latencies.items()}
+            dropped_calls = dict(self.dropped_calls)
+
+        statistics = {}
+        for priority in self.Priority:
+            latencies = 1E3 * np.array(all_latencies[priority])
+            statistics[priority.name] = {
+                'calls': len(latencies),
+                'dropped': dropped_calls[priority],
+                'median_ms': float(np.median(latencies)) if len(latencies) else 0.0,
+                'p95_ms': float(np.percentile(latencies, 95)) if len(latencies) else 0.0,
+                'max_ms': float(np.max(latencies)) if len(latencies) else 0.0,
+            }
+        return statistics
+
+
+class PriorityConnection:
+    """
+    Calls functions of a <ThreadedConnection> with a priority and deadline, see <ThreadedConnection.withPriority()> and <ThreadedConnection.withFutures()>
+
+    :param threaded_connection: threaded connection
+    :param priority: priority of calls (default: see <ConnectionWorker.submit()>)
+    :param deadline: time in s after which a call is dropped if not started
+    :param futures: calls return a <DeviceFuture> instead of a callback_id
+    """
+
+    def __init__(
+        self,
+        threaded_connection: ThreadedConnection,
+        priority: ConnectionWorker.Priority | None,
+        deadline: float | None = None,
+        futures: bool = False
+    ):
+        self.threaded_connection = threaded_connection
+        self.priority = priority
+        self.deadline = deadline
+        self.futures = futures
+
+    def __getattr__(self, name):
+        """
+        Gets name of accessed attribute on this class
+
+        :param name: name of function
+        """
+
+        if self.threaded_connection.connection is None:
+            raise ConnectionError('No connection established')
+
+        def func(*args, **kwargs):
+            future = DeviceFuture() if self.futures else None
+            callback_id = self.threaded_connection.worker.submit(self.threaded_connection.callback_id(), name, args, kwargs, self.priority, self.deadline, future)
+            return callback_id if future is None else future
+
+        return func
 
 
 class ThreadedConnection(QObject):
@@ -159,6 +515,9 @@ class ThreadedConnection(QObject):
     :param connection_aborted_function: function to be called on aborted or lost connection
     """
 
+    # emitted from the worker thread when a future is done: function, future
+    future_done = pyqtSignal(object, object)
+
     def __init__(
         self,
         connection: ISEGConnection | ThyracontConnection | TPG300Connection | MixedPressureConnection | MonacoConnection | TLPMxConnection | None,
@@ -171,10 +530,12 @@ class ThreadedConnection(QObject):
         self.worker = ConnectionWorker(connection)
         self.worker.signal.error.connect(self.handleError)
         self.worker.signal.result.connect(self.executeCallback)
+        self.worker.signal.dropped.connect(self.dropCallback)
+        self.future_done.connect(self.executeFutureCallback)
 
-        self.threadpool = QThreadPool.globalInstance()
+        self.threadpool = DeviceThreadPool.globalInstance()
         if self.connection is not None:
-            self.threadpool.start(self.worker)
+            self.threadpool.start(self.worker, type(self.connection).__name__)
 
         self.callback_id = CallbackId()
         self.callbacks = {}
@@ -215,7 +576,8 @@ class ThreadedConnection(QObject):
     def callback(self, function, callback_id):
         """
         Calls function when second statement finishes. Expects a callback_id, which is a positive integer if successfull,
-        a negative integer if not successfull and a list of integers of deleted callback_ids if queue is already too long
+        a negative integer if not successfull and a list of integers of deleted callback_ids if queue is already too long.
+        A <Future> (see withFutures() and gather()) can be passed instead, then function is called in the GUI thread when it is done
 
         Example: callback(func_to_execute_on_callback, threaded_connection.func_for_device(args))
 
@@ -226,9 +588,14 @@ class ThreadedConnection(QObject):
         if self.connection is None:
             raise NotImplementedError('There should not be a callback happening')
 
+        if isinstance(callback_id, Future):
+            callback_id.add_done_callback(lambda future: self.future_done.emit(function, future))
+            return
+
         if isinstance(callback_id, list):
             for i in callback_id:
-                del self.callbacks[i]
+                self.callbacks.pop(i, None)
+            return
 
         if not isinstance(callback_id, int):
             raise ValueError(f'Callback id must be <int>, received {type(callback_id)}')
@@ -257,18 +624,91 @@ class ThreadedConnection(QObject):
         function(result)
         del self.callbacks[callback_id]
 
+    @pyqtSlot(object, object)
+    def executeFutureCallback(self, function, future: Future):
+        """
+        Executes callback function with result of future, or its exception if it failed. Cancelled futures are ignored
+
+        :param function: function to be executed
+        :param future: done future
+        """
+
+        if future.cancelled():
+            return
+
+        error = future.exception()
+        if error is None:
+            function(future.result())
+            return
+
+        try:
+            function(error)
+        except (ValueError, AttributeError, TypeError):
+            pass
+
+    @pyqtSlot(int)
+    def dropCallback(self, callback_id: int):
+        """
+        Forgets callback of a call that was dropped, since its deadline passed
+
+        :param callback_id: unique id of dropped call
+        """
+
+        self.callbacks.pop(callback_id, None)
+
+    def withPriority(self, priority: ConnectionWorker.Priority, deadline: float | None = None) -> PriorityConnection:
+        """
+        Returns connection whose calls are queued with a priority and deadline
+
+        Example: threaded_connection.withPriority(ConnectionWorker.Priority.Interlock).currentSet(channel, current)
+
+        :param priority: priority of calls
+        :param deadline: time in s after which a call is dropped if not started (None to always execute it)
+        """
+
+        return PriorityConnection(self, priority, deadline)
+
+    def polling(self) -> PriorityConnection:
+        """
+        Returns connection for calls that are repeated by an update loop, which are dropped if they are not started within
+        DefaultParams.connection_read_deadline, since the next update requests them again. One-shot calls should not use it
+
+        Example: threaded_connection.callback(func_to_execute_on_callback, threaded_connection.polling().chtGet())
+        """
+
+        return PriorityConnection(self, None, DefaultParams.connection_read_deadline)
+
+    def withFutures(self, priority: ConnectionWorker.Priority | None = None, deadline: float | None = None) -> PriorityConnection:
+        """
+        Returns connection whose calls return a <DeviceFuture> with their result, which supports timeouts (result(timeout)),
+        cancellation of calls that were not started, awaiting in asyncio and combining with gather()
+
+        Example: threaded_connection.callback(func_to_execute_on_callback, gather(connection.chtGet(), connection.chstGet()))
+        with connection = threaded_connection.withFutures()
+
+        :param priority: priority of calls (default: see <ConnectionWorker.submit()>)
+        :param deadline: time in s after which a call is dropped and its future cancelled if not started
+        """
+
+        if self.connection is None:
+            raise ConnectionError('No connection established')
+
+        return PriorityConnection(self, priority, deadline, futures=True)
+
+    def dispatchLatency(self) -> dict[str, dict[str, float | int]]:
+        """Returns statistics of the dispatch latency of the worker per priority (see ConnectionWorker.dispatchLatency())"""
+
+        return self.worker.dispatchLatency()
+
     def close(self):
-        """Closes the worker"""
+        """Closes the worker and waits until it is stopped"""
 
         if not self.worker.started or not self.worker.running:
             return
 
         self.worker.execute(self.callback_id(), 'close')
-
-        while True:
-            if not self.worker.running:
-                break
-            sleep(0.1)
+        self.worker.stopped.wait()
+        self.callbacks.clear()
 
     def __getattr__(self, name):
         """
@@ -361,6 +801,181 @@ class ThreadedDummyConnection(ThreadedConnection):
         super().__init__(None)
 
 
+def gather(*futures: Future, timeout: float | None = None) -> DeviceFuture:
+    """
+    Returns future of the list of results of futures, which fails with the first exception of the futures,
+    with a TimeoutError if timeout passed before all are done or is cancelled if any of them is cancelled.
+    When the returned future is done early (or cancelled), all futures that were not started are cancelled
+
+    :param futures: futures of calls (see <ThreadedConnection.withFutures()>)
+    :param timeout: time in s after which the returned future fails with TimeoutError
+    """
+
+    gathered = DeviceFuture()
+    if not futures:
+        gathered.set_result([])
+        return gathered
+
+    lock = Lock()
+    remaining = [len(futures)]
+
+    def finish(result: list | None = None, error: BaseException | None = None):
+        try:
+            if error is not None:
+                gathered.set_exception(error)
+            elif result is not None:
+                gathered.set_result(result)
+            else:
+                gathered.cancel()
+        except InvalidStateError:
+            # already done
+            pass
+
+    def done(future: Future):
+        if future.cancelled():
+            finish()
+        elif future.exception() is not None:
+            finish(error=future.exception())
+        else:
+            with lock:
+                remaining[0] -= 1
+                complete = remaining[0] == 0
+            if complete:
+                finish([future.result() for future in futures])
+
+    timer = None
+    if timeout is not None:
+        timer = Timer(timeout, lambda: finish(error=TimeoutError(f'Calls did not finish within {timeout} s')))
+        timer.daemon = True
+
+    def cleanup(_: Future):
+        if timer is not None:
+            timer.cancel()
+        for future in futures:
+            future.cancel()
+
+    gathered.add_done_callback(cleanup)
+    if timer is not None:
+        timer.start()
+    for future in futures:
+        future.add_done_callback(done)
+
+    return gathered
+
+
+def assertionTest():
+    """
+    Different assertion tests
+    """
+
+    def testInterlockSupersedesWrites():
+        """Test if an interlock call drops queued writes of the same channel, so they can not undo it afterwards"""
+
+        from threading import Thread
+
+        class Device:
+            def __init__(self):
+                self.busy = Event()
+                self.release = Event()
+                self.currents = {}
+                self.calls = []
+
+            def block(self):
+                self.busy.set()
+                self.release.wait(5)
+
+            def currentSet(self, channel: int, current: float):
+                self.calls.append((channel, current))
+                self.currents[channel] = current
+
+            def close(self):
+                pass
+
+        device = Device()
+        worker = ConnectionWorker(device)
+        callback_id = CallbackId()
+        thread = Thread(target=worker.run)
+        thread.start()
+
+        # device is busy, while a user write and an interlock write of the same channel and a write of another channel are queued
+        worker.execute(callback_id(), 'block')
+        assert device.busy.wait(5)
+        worker.execute(callback_id(), 'currentSet', 5, 10.0)
+        last_future = DeviceFuture()
+        worker.submit(callback_id(), 'currentSet', (4, 2.0), {}, future=last_future)
+        future = DeviceFuture()
+        worker.submit(callback_id(), 'currentSet', (5, 3.0), {}, future=future)
+        worker.submit(callback_id(), 'currentSet', (5, 0.1), {}, ConnectionWorker.Priority.Interlock)
+        assert future.cancelled()
+
+        device.release.set()
+        last_future.result(5)
+        worker.execute(callback_id(), 'close')
+        assert worker.stopped.wait(5)
+        thread.join(5)
+
+        assert device.calls == [(5, 0.1), (4, 2.0)]
+        assert device.currents == {5: 0.1, 4: 2.0}
+        assert worker.dispatchLatency()['Write']['dropped'] == 2
+
+    def testReadDeadlines():
+        """Test if only reads with a deadline are dropped and a coalesced read keeps the deadline of the newest request"""
+
+        from threading import Thread
+        from time import sleep
+
+        class Device:
+            def __init__(self):
+                self.busy = Event()
+                self.release = Event()
+                self.calls = []
+
+            def block(self):
+                self.busy.set()
+                self.release.wait(5)
+
+            def voltageGet(self, channel: int) -> float:
+                self.calls.append(('voltageGet', channel))
+                return 1.0 + channel
+
+            def close(self):
+                pass
+
+        device = Device()
+        worker = ConnectionWorker(device)
+        callback_id = CallbackId()
+        thread = Thread(target=worker.run)
+        thread.start()
+
+        # device is busy longer than the deadline of the polling reads
+        worker.execute(callback_id(), 'block')
+        assert device.busy.wait(5)
+        polling_future = DeviceFuture()
+        worker.submit(callback_id(), 'voltageGet', (0, ), {}, deadline=0.01, future=polling_future)
+        one_shot_future = DeviceFuture()
+        worker.submit(callback_id(), 'voltageGet', (0, ), {}, future=one_shot_future)
+        startup_future = DeviceFuture()
+        worker.submit(callback_id(), 'voltageGet', (1, ), {}, future=startup_future)
+        dropped_future = DeviceFuture()
+        worker.submit(callback_id(), 'voltageGet', (2, ), {}, deadline=0.01, future=dropped_future)
+        sleep(0.05)
+
+        device.release.set()
+        assert one_shot_future.result(5) == 1.0
+        assert polling_future.result(5) == 1.0
+        assert startup_future.result(5) == 2.0
+        worker.execute(callback_id(), 'close')
+        assert worker.stopped.wait(5)
+        thread.join(5)
+
+        assert dropped_future.cancelled()
+        assert device.calls == [('voltageGet', 0), ('voltageGet', 1)]
+        assert worker.dispatchLatency()['Read']['dropped'] == 1
+
+    testInterlockSupersedesWrites()
+    testReadDeadlines()
+
+
 def stresstest_iseg():
     from serial import SerialException
     from Connection.USBPorts import getComports
@@ -464,4 +1079,5 @@ def stresstest_iseg():
 
 
 if __name__ == '__main__':
+    assertionTest()
     stresstest_iseg()
@@ -0,0 +1,343 @@
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from subprocess import run, CalledProcessError
+from tempfile import TemporaryDirectory
+from time import perf_counter
+import json
+import platform
+import sqlite3
+import sys
+import tracemalloc
+
+import duckdb
+import numpy as np
+
+try:
+    from resource import getrusage, RUSAGE_SELF
+except ImportError:
+    getrusage = None
+
+
+from DB.db import DB, Tables, FastTables
+
+
+# first time of synthetic rows (01.01.2024 00:00:00 UTC), so every run covers the same calendar months
+benchmark_start_time = 1704067200
+
+# name and width in seconds of timeframes of range queries
+benchmark_spans = {
+    '1m': 60,
+    '1h': 3600,
+    '1d': 86400,
+    '1w': 604800,
+    '30d': 2592000,
+}
+
+# number of rows that are inserted before the bulk load waits for the writer thread
+benchmark_chunk_rows = 100000
+
+
+def synthetic_columns(table: Tables, times: np.ndarray, rng: np.random.Generator) -> dict[str, np.ndarray]:
+    """
+    Returns synthetic values for every column of table: integer columns switch rarely between a few states, float columns are random walks
+
+    :param table: table
+    :param times: sorted times as timestamps
+    :param rng: random number generator
+    """
+
+    columns = {'Time': times}
+    for column, dtype in zip(table.variables, table.dtypes(table.variables)):
+        if dtype == np.int64:
+            columns[column] = np.cumsum(rng.random(len(times)) < 1E-3) % 3
+        else:
+            columns[column] = 20 + np.cumsum(rng.normal(0, 0.01, len(times)))
+    return columns
+
+
+def benchmark_tables() -> list[Tables]:
+    """Returns the tables of the database (see DB.tables), which are read from a database without set up in a temporary folder"""
+
+    with TemporaryDirectory() as folder:
+        db = DB(db_file=str(Path(folder) / 'Tables.db'), db_type=DB.DBType.sqlite3, no_setup=True, archive=False, maintenance=False, journal=False)
+        tables = db.tables
+        db.close()
+        db.connection.close()
+    return tables
+
+
+def insert_table_rows(db: DB, table: Tables, rows: list[tuple]):
+    """
+    Inserts rows with the insert method of the table (e.g. DB.insertLaser()), as done by the devices.
+    Rows of <FastTables> are inserted as one block of samples (e.g. DB.insertPowerMeterFast())
+
+    :param db: database
+    :param table: table
+    :param rows: rows of values of table.insert_columns(), starting with the time
+    """
+
+    if isinstance(table, FastTables):
+        if rows:
+            getattr(db, f'insert{table.name.replace("_", "")}')(*[np.array(column) for column in zip(*rows)])
+        return
+
+    insert = getattr(db, f'insert{table.name}')
+    for row in rows:
+        insert(*row[1:], timestamp=row[0])
+
+
+def load_rows(db: DB, table: Tables, columns: dict[str, np.ndarray], chunk_rows: int) -> int:
+    """
+    Inserts columns in chunks with the insert method of the table and returns the number of rows.
+    Every chunk is flushed, so the queue of the writer thread never holds more than chunk_rows rows
+
+    :param db: database
+    :param table: table
+    :param columns: dictionary of column name and values (see synthetic_columns())
+    :param chunk_rows: number of rows per chunk
+    """
+
+    values = [columns[column] for column in table.insert_columns()]
+    rows = len(values[0])
+    for start in range(0, rows, chunk_rows):
+        insert_table_rows(db, table, list(zip(*[value[start:start + chunk_rows].tolist() for value in values])))
+        db.flush()
+    return rows
+
+
+def percentiles(durations: list[float]) -> dict[str, float]:
+    """
+    Returns median, 95th percentile and maximum of durations in milliseconds
+
+    :param durations: durations in seconds
+    """
+
+    durations = 1E3 * np.array(durations)
+    return {
+        'median_ms': float(np.median(durations)),
+        'p95_ms': float(np.percentile(durations, 95)),
+        'max_ms': float(np.max(durations)),
+    }
+
+
+def benchmark_backend(
+    db_type: str,
+    months: int,
+    rates: dict[str, float],
+    spans: dict[str, int],
+    repeats: int,
+    insert_rows: int,
+    seed: int
+) -> dict:
+    """
+    Benchmarks one backend in a temporary database file and returns the results
+
+    :param db_type: name of <DB.DBType>
+    :param months: number of months of synthetic rows
+    :param rates: dictionary of table name and rows per second
+    :param spans: dictionary of name and width in seconds of timeframes of range queries
+    :param repeats: number of range queries per timeframe and of measured flushes
+    :param insert_rows: number of rows inserted row by row to measure the insert throughput
+    :param seed: seed of random number generator
+    """
+
+    rng = np.random.default_rng(seed)
+    end_time = DB._monthStart(benchmark_start_time, months)
+    results = {'tables': {}, 'range_queries': {}, 'downsampled_queries': {}}
+
+    with TemporaryDirectory() as folder:
+        db_file = Path(folder) / f'Benchmark.{"db" if db_type == "sqlite3" else "duckdb"}'
+        # threaded as in the application, every row is stored, every query reaches the database and the queue holds a whole chunk of rows
+        db = DB(
+            db_file=str(db_file),
+            db_type=DB.DBType[db_type],
+            threaded=True,
+            queue_size=max(benchmark_chunk_rows, insert_rows) + 1,
+            archive=False,
+            cache_size=0,
+            deadbands={table_name: {} for table_name in rates.keys()},
+            maintenance=False
+        )
+
+        # bulk load
+        total_rows = 0
+        start = perf_counter()
+        for table in db.tables:
+            rate = rates.get(table.name, 0)
+            if rate <= 0:
+                continue
+            # tables with a finer time resolution keep the fractions of seconds
+            times = np.arange(benchmark_start_time, end_time, 1 / rate)
+            if table.time_resolution == 1:
+                times = times.astype(np.int64)
+            rows = load_rows(db, table, synthetic_columns(table, times, rng), benchmark_chunk_rows)
+            results['tables'][table.name] = {'rows': rows, 'rate': rate}
+            total_rows += rows
+        duration = perf_counter() - start
+        results['bulk_insert'] = {'rows': total_rows, 'seconds': duration, 'rows_per_s': total_rows / duration}
+
+        start = perf_counter()
+        db.backfillRollups()
+        results['rollup_backfill_s'] = perf_counter() - start
+
+        # row by row inserts through the writer thread, as done while logging
+        table = db.laser_table
+        values = synthetic_columns(table, np.arange(insert_rows) + end_time, rng)
+        rows = list(zip(*[values[column].tolist() for column in table.insert_columns()]))
+        start = perf_counter()
+        insert_table_rows(db, table, rows)
+        db.flush()
+        duration = perf_counter() - start
+        results['insert'] = {'rows': insert_rows, 'buffer_size': db.buffer_size, 'rows_per_s': insert_rows / duration}
+
+        # writing and committing one buffer of rows
+        durations = []
+        for i in range(repeats):
+            insert_table_rows(db, table, rows[i * db.buffer_size:(i + 1) * db.buffer_size] or rows[:db.buffer_size])
+            start = perf_counter()
+            db.flush()
+            durations.append(perf_counter() - start)
+        results['flush'] = percentiles(durations)
+        results['dropped_rows'] = db.dropped_rows
+
+        # range queries at random positions within the synthetic rows
+        for table_name in results['tables'].keys():
+            table_idx = [table.name for table in db.tables].index(table_name)
+            for span_name, span in spans.items():
+                if span > end_time - benchmark_start_time:
+                    continue
+                starts = rng.integers(benchmark_start_time, end_time - span + 1, repeats)
+
+                durations = []
+                rows = 0
+                for start_time in starts:
+                    start = perf_counter()
+                    data = db.getDataColumns(table_idx, None, int(start_time), int(start_time) + span)
+                    durations.append(perf_counter() - start)
+                    rows += 0 if data is False else len(data[1][0])
+                results['range_queries'].setdefault(table_name, {})[span_name] = {'rows': rows // repeats, **percentiles(durations)}
+
+                durations = []
+                for start_time in starts:
+                    start = perf_counter()
+                    db.getDataDownsampled(table_idx, None, int(start_time), int(start_time) + span, 2000)
+                    durations.append(perf_counter() - start)
+                results['downsampled_queries'].setdefault(table_name, {})[span_name] = percentiles(durations)
+
+        # memory of Python objects while fetching the longest timeframe of the first table
+        table_name = next(iter(results['tables']), None)
+        span = max([span for span in spans.values() if span <= end_time - benchmark_start_time], default=0)
+        if table_name is not None and span:
+            table_idx = [table.name for table in db.tables].index(table_name)
+            tracemalloc.start()
+            db.getDataColumns(table_idx, None, benchmark_start_time, benchmark_start_time + span)
+            results['query_peak_python_mb'] = tracemalloc.get_traced_memory()[1] / 1E6
+            tracemalloc.stop()
+
+        # the WAL is written into the database file, since the connection of sqlite3 belongs to the writer thread and is not closed here
+        db.maintain(['checkpoint'])
+        db.close()
+        if db.db_type == DB.DBType.duckdb:
+            db.connection.close()
+
+        results['file_size_mb'] = sum(file.stat().st_size for file in Path(folder).iterdir() if file.is_file()) / 1E6
+
+    # maximum resident memory of this process (kilobytes on Linux, bytes on macOS), not available on Windows
+    results['peak_rss_mb'] = None
+    if getrusage is not None:
+        peak_rss = getrusage(RUSAGE_SELF).ru_maxrss
+        results['peak_rss_mb'] = peak_rss / 1E6 if sys.platform == 'darwin' else peak_rss / 1E3
+
+    return results
+
+
+def benchmark(
+    months: int = 1,
+    rates: dict[str, float] | None = None,
+    spans: dict[str, int] | None = None,
+    repeats: int = 20,
+    insert_rows: int = 20000,
+    seed: int = 0,
+    backends: list[str] | None = None,
+    output: str = ''
+) -> dict:
+    """
+    Benchmarks the database backends with the same synthetic rows. Every backend runs in its own process, so the peak memory is its own
+
+    :param months: number of months of synthetic rows
+    :param rates: dictionary of table name and rows per second (tables that are not listed get one row per second, use 0 to leave a table empty)
+    :param spans: dictionary of name and width in seconds of timeframes of range queries (default: benchmark_spans)
+    :param repeats: number of range queries per timeframe and of measured flushes
+    :param insert_rows: number of rows inserted row by row to measure the insert throughput
+    :param seed: seed of random number generator
+    :param backends: names of <DB.DBType> (default: all)
+    :param output: path of JSON file of results (use empty to not write a file)
+    :returns: results, which are also written to output
+    """
+
+    rates = {table.name: (rates or {}).get(table.name, 1.0) for table in benchmark_tables()}
+    spans = spans or benchmark_spans
+    backends = backends or [db_type.name for db_type in DB.DBType]
+
+    try:
+        commit = run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True, cwd=Path(__file__).parent).stdout.strip()
+    except (OSError, CalledProcessError):
+        commit = None
+
+    results = {
+        'created': datetime.now(timezone.utc).isoformat(),
+        'commit': commit,
+        'versions': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'duckdb': duckdb.__version__,
+            'sqlite3': sqlite3.sqlite_version,
+        },
+        'platform': platform.platform(),
+        'parameters': {
+            'months': months,
+            'rates': rates,
+            'spans': spans,
+            'repeats': repeats,
+            'insert_rows': insert_rows,
+            'seed': seed,
+        },
+        'backends': {},
+    }
+
+    for backend in backends:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            results['backends'][backend] = executor.submit(benchmark_backend, backend, months, rates, spans, repeats, insert_rows, seed).result()
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+
+    return results
+
+
+def main():
+    parser = ArgumentParser(description='Benchmark of the database backends with synthetic rows, results are written as JSON')
+    parser.add_argument('--months', type=int, default=1, help='number of months of synthetic rows')
+    parser.add_argument('--rate', action='append', default=[], metavar='TABLE=HZ', help='rows per second of a table (default 1)')
+    parser.add_argument('--repeats', type=int, default=20, help='number of range queries per timeframe and of measured flushes')
+    parser.add_argument('--insert-rows', type=int, default=20000, help='number of rows inserted row by row')
+    parser.add_argument('--seed', type=int, default=0, help='seed of random number generator')
+    parser.add_argument('--backend', action='append', choices=[db_type.name for db_type in DB.DBType], help='backend to benchmark (default all)')
+    parser.add_argument('--output', default='', help='path of JSON file (default: print results)')
+    arguments = parser.parse_args()
+
+    rates = {}
+    for rate in arguments.rate:
+        table_name, value = rate.split('=')
+        rates[table_name] = float(value)
+
+    results = benchmark(arguments.months, rates, None, arguments.repeats, arguments.insert_rows, arguments.seed, arguments.backend, arguments.output)
+    if not arguments.output:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
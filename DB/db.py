@@ -1,9 +1,18 @@
 from __future__ import annotations
+from typing import Callable
 from sqlite3 import connect as connect_sqlite3, OperationalError, Connection, Cursor
 from duckdb import connect as connect_duckdb, CatalogException, DuckDBPyConnection
 
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
+from time import time
+from math import ceil
+from threading import Thread, Lock, current_thread
+from queue import Queue, Full, Empty
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import wraps
+from collections import OrderedDict
+from contextlib import contextmanager
 
 from enum import Enum, auto
 
@@ -12,6 +21,8 @@ import numpy as np
 
 from Config.GlobalConf import GlobalConf, DefaultParams
 
+from DB.journal import Journal
+
 
 class Tables:
     """
@@ -24,6 +35,19 @@ class Tables:
     }
     index = ''
 
+    # default of the time column and its replacement for sqlite3, which has no EXTRACT() and needs parentheses around expressions
+    time_default = 'CAST(EXTRACT(EPOCH FROM now()) AS BIGINT)'
+    time_default_sqlite3 = "(CAST(strftime('%s', 'now') AS INTEGER))"
+
+    # units of the time column per second (e.g. 1000000 for microseconds), queries always take and return times in seconds
+    time_resolution = 1
+
+    # age in seconds after which rows are deleted by the maintenance of DB (0 to keep all rows), rollup tables are kept
+    retention = 0
+
+    # tolerance of columns for change-only logging (see DB), columns that are not listed have to match exactly. Empty to store every row
+    deadband: dict[str, float] = {}
+
     def __init__(self):
         self.variables = []
 
@@ -35,6 +59,10 @@ class Tables:
         if ' ' in self.name:
             raise ValueError(f'Name {self.name} cannot have a space inside')
 
+        for column in self.deadband.keys():
+            if column not in self.structure.keys():
+                raise ValueError(f'Deadband column "{column}" not in structure of table "{self.name}"')
+
         for variable, variable_type in self.structure.items():
             if 'DEFAULT' not in variable_type:
                 self.variables.append(variable)
@@ -43,11 +71,34 @@ class Tables:
         """Returns the column names"""
         return list(self.structure.keys())
 
-    def create_table(self) -> str:
-        """SQL query to create table"""
+    def dtypes(self, column_names: list[str], raw: bool = False) -> list[np.dtype]:
+        """
+        Returns the NumPy data types of columns (int64 for integers, float64 for floats).
+        The time column of tables with sub-second resolution is returned by queries as float64 seconds
+
+        :param column_names: list of column names
+        :param raw: data types of stored values, where the time column is always int64
+        """
+
+        dtypes = []
+        for column_name in column_names:
+            column_type = self.structure[column_name].split()[0].upper()
+            if column_name == 'Time' and self.time_resolution != 1 and not raw:
+                dtypes.append(np.dtype(np.float64))
+            else:
+                dtypes.append(np.dtype(np.int64) if column_type in ('BIGINT', 'INTEGER') else np.dtype(np.float64))
+        return dtypes
+
+    def create_table(self, sqlite3: bool = False) -> str:
+        """
+        SQL query to create table
+
+        :param sqlite3: use the dialect of sqlite3
+        """
+
         table_string = ''
         for variable, variable_type in self.structure.items():
-            table_string += f' {variable} {variable_type},\n'
+            table_string += f' {variable} {self._column_type(variable_type, sqlite3)},\n'
 
         return f'''CREATE TABLE {self.name} (\n{table_string[:-2]}\n);'''
 
@@ -75,11 +126,12 @@ class Tables:
         """SQL query for column names"""
         return f'''PRAGMA table_info({self.name})'''
 
-    def alter_add(self, columns: list[str]) -> str:
+    def alter_add(self, columns: list[str], sqlite3: bool = False) -> str:
         """
         SQL query to alter the table and add given columns
 
         :param columns: list of columns
+        :param sqlite3: use the dialect of sqlite3
         """
 
         add_structure = dict()
@@ -90,7 +142,7 @@ class Tables:
 
         table_string = ''
         for variable, variable_type in add_structure.items():
-            table_string += f'ADD {variable} {variable_type},\n'
+            table_string += f'ADD {variable} {self._column_type(variable_type, sqlite3)},\n'
 
         return f'''ALTER TABLE {self.name}\n{table_string[:-2]};'''
 
@@ -115,17 +167,409 @@ class Tables:
 
         return f'''INSERT INTO {self.name} ({','.join(self.variables)}) VALUES ({','.join([str(arg) for arg in args])});'''
 
-    def get(self, column_ids: tuple[int], start_time: int | None, end_time: int | None) -> tuple[list, str]:
+    def insert_columns(self) -> list[str]:
+        """Returns the column names of a row with explicit time"""
+        return ['Time'] + self.variables
+
+    def insert_parameterized(self) -> str:
+        """SQL query to insert a row with explicit time using placeholders (for executemany)"""
+
+        columns = self.insert_columns()
+        return f'''INSERT INTO {self.name} ({','.join(columns)}) VALUES ({','.join(['?'] * len(columns))});'''
+
+    def insert_select(self, source: str) -> str:
+        """
+        SQL query to insert all rows with explicit time from another relation
+
+        :param source: name of relation with the same columns
+        """
+
+        columns = ','.join(self.insert_columns())
+        return f'''INSERT INTO {self.name} ({columns}) SELECT {columns} FROM {source};'''
+
+    def row(self, timestamp: float, *args) -> tuple:
+        """
+        Row for parameterized insert query
+
+        :param timestamp: time of row as timestamp
+        """
+
+        if len(args) != len(self.variables):
+            raise AttributeError(f'Table "{self.name}" expects {len(self.variables)} arguments, but {len(args)} arguments are provided')
+
+        return (self._time(timestamp), *args)
+
+    def rows(self, timestamps: np.ndarray, *columns: np.ndarray) -> list[tuple]:
+        """
+        Rows for parameterized insert query from arrays of samples
+
+        :param timestamps: times of rows as timestamps
+        :param columns: values of each column for every row
+        """
+
+        if len(columns) != len(self.variables):
+            raise AttributeError(f'Table "{self.name}" expects {len(self.variables)} columns, but {len(columns)} columns are provided')
+
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        if self.time_resolution == 1:
+            times = timestamps.astype(np.int64)
+        else:
+            times = np.round(timestamps * self.time_resolution).astype(np.int64)
+        columns = [np.broadcast_to(column, times.shape).tolist() for column in columns]
+        return list(zip(times.tolist(), *columns))
+
+    def time_select(self, column: str = 'Time') -> str:
+        """
+        SQL expression of time column in seconds
+
+        :param column: (qualified) name of time column
+        """
+
+        if self.time_resolution == 1:
+            return column
+        return f'CAST({column} AS DOUBLE) / {self.time_resolution}'
+
+    def time_seconds(self, column: str = 'Time') -> str:
+        """
+        SQL expression of time column in whole seconds (e.g. for time buckets)
+
+        :param column: (qualified) name of time column
+        """
+
+        if self.time_resolution == 1:
+            return column
+        return f'CAST(({column} - {column} % {self.time_resolution}) / {self.time_resolution} AS BIGINT)'
+
+    def get(self, column_ids: tuple[int], start_time: int | None, end_time: int | None, source: str = '') -> tuple[list, str]:
         """
         SQL query to get columns of data within given timeframe
 
         :param column_ids: ids of columns
         :param start_time: start time as timestamp
         :param end_time: end time as timestamp
+        :param source: relation to read from instead of the table (see archive_union()), rows will be ordered by time
 
         :returns: list of columns, sql query
         """
 
+        column_names = self._column_names(column_ids)
+        condition = self._time_condition(start_time, end_time)
+        order = ' ORDER BY Time' if source else ''
+        selects = [f'{self.time_select()} AS Time' if column_name == 'Time' and self.time_resolution != 1 else column_name for column_name in column_names]
+
+        return column_names, f'''SELECT {', '.join(selects)} FROM {source or self.name}{condition}{order};'''
+
+    def get_downsampled(self, column_ids: tuple[int], start_time: int, end_time: int, bucket_width: int, source: str = '') -> tuple[list, str]:
+        """
+        SQL query to get minimum, maximum and mean of columns for each time bucket within given timeframe
+
+        :param column_ids: ids of columns (time column will be ignored)
+        :param start_time: start time as timestamp
+        :param end_time: end time as timestamp
+        :param bucket_width: width of time buckets in seconds (may be below one second for tables with sub-second resolution)
+        :param source: relation to read from instead of the table (see archive_union())
+
+        :returns: list of columns ('Time' followed by '<column>_min', '<column>_max', '<column>_mean' for each column), sql query
+        """
+
+        column_names = [column_name for column_name in self._column_names(column_ids) if column_name != 'Time']
+        if not column_names:
+            raise ValueError('No columns besides time provided')
+        condition = self._time_condition(start_time, end_time)
+
+        bucket_names = ['Time']
+        aggregates = [f'{self._bucket(start_time, bucket_width)} AS Bucket']
+        for column_name in column_names:
+            bucket_names.extend([f'{column_name}_min', f'{column_name}_max', f'{column_name}_mean'])
+            aggregates.extend([f'MIN({column_name})', f'MAX({column_name})', f'AVG({column_name})'])
+
+        return bucket_names, f'''SELECT {', '.join(aggregates)} FROM {source or self.name}{condition} GROUP BY Bucket ORDER BY Bucket;'''
+
+    def get_statistics(
+        self,
+        column_ids: tuple[int],
+        start_time: int,
+        end_time: int,
+        stats: list[str],
+        bucket_width: int | None = None,
+        source: str = '',
+        sqlite3: bool = False,
+        approximate: bool = True
+    ) -> tuple[list, str]:
+        """
+        SQL query to get statistics of columns within given timeframe, optionally for each time bucket.
+        Statistics are 'count', 'min', 'max', 'mean', 'std' (sample standard deviation), 'median' and percentiles 'p<percent>' (e.g. 'p95').
+        For sqlite3 'std' is the sample variance (it has no square root) and percentiles are the nearest rank.
+
+        :param column_ids: ids of columns (time column will be ignored)
+        :param start_time: start time as timestamp
+        :param end_time: end time as timestamp
+        :param stats: list of statistics
+        :param bucket_width: width of time buckets in seconds (None for one bucket starting at start_time)
+        :param source: relation to read from instead of the table (see archive_union())
+        :param sqlite3: use the dialect of sqlite3
+        :param approximate: use approximate percentiles (only for duckdb, which are faster for long timeframes)
+
+        :returns: list of columns ('Time' followed by '<column>_<statistic>' for each column and statistic), sql query
+        """
+
+        column_names = [column_name for column_name in self._column_names(column_ids) if column_name != 'Time']
+        if not column_names:
+            raise ValueError('No columns besides time provided')
+
+        bucket = self._bucket(start_time, bucket_width) if bucket_width else f'{int(start_time)}'
+
+        statistic_names = ['Time']
+        aggregates = []
+        quantile_ctes = []
+        quantile_columns = []
+        for i, column_name in enumerate(column_names):
+            quantiles = []
+            for stat in stats:
+                alias = f's{len(statistic_names)}'
+                statistic_names.append(f'{column_name}_{stat}')
+                quantile = self.statistic_quantile(stat)
+                if quantile is not None and sqlite3:
+                    quantiles.append(f'MAX(CASE WHEN R = CAST(ROUND({quantile} * (N - 1)) AS INTEGER) + 1 THEN {column_name} END) AS {alias}')
+                elif quantile is not None:
+                    aggregates.append(f'{"APPROX_QUANTILE" if approximate else "QUANTILE_CONT"}({column_name}, {quantile}) AS {alias}')
+                elif stat == 'count':
+                    aggregates.append(f'COUNT({column_name}) AS {alias}')
+                elif stat in ('min', 'max'):
+                    aggregates.append(f'{stat.upper()}({column_name}) AS {alias}')
+                elif stat == 'mean':
+                    aggregates.append(f'AVG({column_name}) AS {alias}')
+                elif stat == 'std' and sqlite3:
+                    aggregates.append(f'(SUM({column_name} * {column_name}) - SUM({column_name}) * SUM({column_name}) / COUNT({column_name})) / (COUNT({column_name}) - 1) AS {alias}')
+                elif stat == 'std':
+                    aggregates.append(f'STDDEV_SAMP({column_name}) AS {alias}')
+
+            # ranks of values in each bucket, which are picked for all percentiles of the column at once
+            if quantiles:
+                quantile_columns.append(i)
+                quantile_ctes.append(f'''Ranked{i} AS (
+            SELECT Bucket, {column_name}, ROW_NUMBER() OVER (PARTITION BY Bucket ORDER BY {column_name}) AS R, COUNT(*) OVER (PARTITION BY Bucket) AS N
+            FROM Source WHERE {column_name} IS NOT NULL
+        ),
+        Quantiles{i} AS (SELECT Bucket, {', '.join(quantiles)} FROM Ranked{i} GROUP BY Bucket)''')
+
+        joins = ''.join([f' LEFT JOIN Quantiles{i} USING (Bucket)' for i in quantile_columns])
+        ctes = ',\n        '.join([
+            f'Source AS (SELECT {bucket} AS Bucket, {", ".join(column_names)} FROM {source or self.name}{self._time_condition(start_time, end_time)})',
+            f'Aggregates AS (SELECT {", ".join(["Bucket"] + aggregates)} FROM Source GROUP BY Bucket)',
+        ] + quantile_ctes)
+        values = [f's{j}' for j in range(1, len(statistic_names))]
+
+        return statistic_names, f'''WITH {ctes}
+        SELECT Bucket, {', '.join(values)} FROM Aggregates{joins} ORDER BY Bucket;'''
+
+    def get_held_statistics(
+        self,
+        column_ids: tuple[int],
+        start_time: int,
+        end_time: int,
+        stats: list[str],
+        hold_time: int,
+        bucket_width: int | None = None,
+        source: str = '',
+        sqlite3: bool = False
+    ) -> tuple[list, str]:
+        """
+        SQL query to get time-weighted statistics of columns of a table with deadband within given timeframe, optionally for each time bucket.
+        Every value is held until the next row, but at most for hold_time, and is weighted by that time, so rows that are only stored on changes are not overrepresented.
+        The last row before start_time is held into the timeframe. Held values are not carried into following time buckets.
+        'count', 'min' and 'max' are of the stored rows, 'std' is the time-weighted population variance (sqlite3 has no square root) and percentiles are time-weighted.
+
+        :param column_ids: ids of columns (time column will be ignored)
+        :param start_time: start time as timestamp
+        :param end_time: end time as timestamp
+        :param stats: list of statistics (see get_statistics())
+        :param hold_time: maximum time in seconds for which a value is held
+        :param bucket_width: width of time buckets in seconds (None for one bucket starting at start_time)
+        :param source: relation to read from instead of the table (see archive_union())
+        :param sqlite3: use the dialect of sqlite3
+
+        :returns: list of columns ('Time' followed by '<column>_<statistic>' for each column and statistic), sql query
+        """
+
+        column_names = [column_name for column_name in self._column_names(column_ids) if column_name != 'Time']
+        if not column_names:
+            raise ValueError('No columns besides time provided')
+
+        least, greatest = ('MIN', 'MAX') if sqlite3 else ('LEAST', 'GREATEST')
+        start = self._time(start_time)
+        end = self._time(end_time) + 1
+        hold = max(1, self._time(hold_time))
+
+        # rows start at the start of the timeframe and are held until the next row, the hold time or the end of the timeframe (or their time bucket)
+        until = f'{least}(COALESCE(LEAD(T) OVER (ORDER BY T), {end}), T + {hold}, {end})'
+        if bucket_width:
+            width = max(1, self._time(bucket_width))
+            bucket = self._bucket(start_time, bucket_width)
+            weight = f'CAST({least}(Until, Time - ((Time - {start}) % {width}) + {width}) - Time AS DOUBLE)'
+        else:
+            bucket = f'{int(start_time)}'
+            weight = 'CAST(Until - Time AS DOUBLE)'
+
+        statistic_names = ['Time']
+        aggregates = []
+        quantile_ctes = []
+        quantile_columns = []
+        for i, column_name in enumerate(column_names):
+            quantiles = []
+            value = f'CAST({column_name} AS DOUBLE)'
+            weights = f'SUM(CASE WHEN {column_name} IS NOT NULL THEN Weight END)'
+            mean = f'SUM(Weight * {value}) / {weights}'
+            for stat in stats:
+                alias = f's{len(statistic_names)}'
+                statistic_names.append(f'{column_name}_{stat}')
+                quantile = self.statistic_quantile(stat)
+                if quantile is not None:
+                    quantiles.append(f'MIN(CASE WHEN Cumulative >= {quantile} * Total THEN {column_name} END) AS {alias}')
+                elif stat == 'count':
+                    aggregates.append(f'SUM(CASE WHEN {column_name} IS NOT NULL THEN Stored ELSE 0 END) AS {alias}')
+                elif stat in ('min', 'max'):
+                    aggregates.append(f'{stat.upper()}({column_name}) AS {alias}')
+                elif stat == 'mean':
+                    aggregates.append(f'{mean} AS {alias}')
+                elif stat == 'std':
+                    aggregates.append(f'SUM(Weight * {value} * {value}) / {weights} - ({mean}) * ({mean}) AS {alias}')
+
+            # cumulative weight of values in each bucket, where all percentiles of the column are picked at once
+            if quantiles:
+                quantile_columns.append(i)
+                quantile_ctes.append(f'''Ranked{i} AS (
+            SELECT Bucket, {column_name}, SUM(Weight) OVER (PARTITION BY Bucket ORDER BY {column_name} ROWS UNBOUNDED PRECEDING) AS Cumulative,
+                SUM(Weight) OVER (PARTITION BY Bucket) AS Total
+            FROM Source WHERE {column_name} IS NOT NULL AND Weight > 0
+        ),
+        Quantiles{i} AS (SELECT Bucket, {', '.join(quantiles)} FROM Ranked{i} GROUP BY Bucket)''')
+
+        joins = ''.join([f' LEFT JOIN Quantiles{i} USING (Bucket)' for i in quantile_columns])
+        ctes = ',\n        '.join([
+            f'''Held AS (
+            SELECT {greatest}(T, {start}) AS Time, CASE WHEN T >= {start} THEN 1 ELSE 0 END AS Stored, {until} AS Until, {", ".join(column_names)}
+            FROM (SELECT Time AS T, {", ".join(column_names)} FROM {source or self.name}{self._time_condition(start_time - hold_time, end_time)})
+        )''',
+            f'Source AS (SELECT {bucket} AS Bucket, Stored, {weight} AS Weight, {", ".join(column_names)} FROM Held WHERE Until > Time OR Stored = 1)',
+            f'Aggregates AS (SELECT {", ".join(["Bucket"] + aggregates)} FROM Source GROUP BY Bucket)',
+        ] + quantile_ctes)
+        values = [f's{j}' for j in range(1, len(statistic_names))]
+
+        return statistic_names, f'''WITH {ctes}
+        SELECT Bucket, {', '.join(values)} FROM Aggregates{joins} ORDER BY Bucket;'''
+
+    @staticmethod
+    def statistic_quantile(stat: str) -> float | None:
+        """
+        Returns quantile of percentile statistic ('median' or 'p<percent>'), None for other statistics and raises ValueError for unknown statistics
+
+        :param stat: name of statistic
+        """
+
+        if stat == 'median':
+            return 0.5
+        if stat in ('count', 'min', 'max', 'mean', 'std'):
+            return None
+        try:
+            percent = float(stat[1:]) if stat.startswith('p') else -1
+        except ValueError:
+            percent = -1
+        if not 0 <= percent <= 100:
+            raise ValueError(f'Statistic "{stat}" is not supported')
+        return percent / 100
+
+    def archive_union(self, files: list[str]) -> str:
+        """
+        SQL relation of all rows of the table and of the archived rows in Parquet files
+
+        :param files: paths of Parquet files
+        """
+
+        if not files:
+            return self.name
+        paths = [str(file).replace("'", "''") for file in files]
+        file_list = ', '.join([f"'{path}'" for path in paths])
+        return f'''(SELECT * FROM {self.name} UNION ALL BY NAME SELECT * FROM read_parquet([{file_list}], union_by_name = true)) AS {self.name}'''
+
+    def create_archive_view(self, files: list[str]) -> str:
+        """
+        SQL query to create view of all rows of the table and of the archived rows in Parquet files
+
+        :param files: paths of Parquet files
+        """
+
+        return f'''CREATE OR REPLACE VIEW {self.name}_all AS SELECT * FROM {self.archive_union(files)};'''
+
+    def archive(self, file: str, start_time: int, end_time: int, archived_file: str = '') -> str:
+        """
+        SQL query to write rows within timeframe sorted by time to Parquet file
+
+        :param file: path of Parquet file
+        :param start_time: start time as timestamp
+        :param end_time: end time as timestamp (excluded)
+        :param archived_file: path of already archived Parquet file of this timeframe, whose rows are kept unless the table has rows with the same time
+            (e.g. if the rows were not deleted after the file was written before), so archiving a timeframe again does not duplicate rows
+        """
+
+        condition = f'Time >= {self._time(start_time)} AND Time < {self._time(end_time)}'
+        source = f'''SELECT * FROM {self.name} WHERE {condition}'''
+        if archived_file:
+            archived_file = str(archived_file).replace("'", "''")
+            source = f'''SELECT * FROM read_parquet('{archived_file}') WHERE Time NOT IN (SELECT Time FROM {self.name} WHERE {condition}) UNION ALL BY NAME {source}'''
+        file = str(file).replace("'", "''")
+        return f'''COPY ({source} ORDER BY Time) TO '{file}' (FORMAT PARQUET);'''
+
+    def count(self, start_time: int | None, end_time: int) -> str:
+        """
+        SQL query for number of rows and first time within timeframe
+
+        :param start_time: start time as timestamp
+        :param end_time: end time as timestamp (excluded)
+        """
+
+        condition = self._time_condition(start_time, None)
+        condition = f'{condition} AND' if condition else ' WHERE'
+        return f'''SELECT COUNT(*), MIN({self.time_select()}) FROM {self.name}{condition} Time < {self._time(end_time)};'''
+
+    def delete_before(self, end_time: int) -> str:
+        """
+        SQL query to delete rows older than given time
+
+        :param end_time: end time as timestamp (excluded)
+        """
+
+        return f'''DELETE FROM {self.name} WHERE Time < {self._time(end_time)};'''
+
+    def delete_range(self, start_time: int, end_time: int) -> str:
+        """
+        SQL query to delete rows within timeframe
+
+        :param start_time: start time as timestamp
+        :param end_time: end time as timestamp (excluded)
+        """
+
+        return f'''DELETE FROM {self.name} WHERE Time >= {self._time(start_time)} AND Time < {self._time(end_time)};'''
+
+    def _column_type(self, column_type: str, sqlite3: bool = False) -> str:
+        """
+        Returns type of column in the dialect of the database
+
+        :param column_type: type of column in structure
+        :param sqlite3: use the dialect of sqlite3
+        """
+
+        if sqlite3:
+            return column_type.replace(self.time_default, self.time_default_sqlite3)
+        return column_type
+
+    def _column_names(self, column_ids: tuple[int]) -> list[str]:
+        """
+        Returns names of columns
+
+        :param column_ids: ids of columns
+        """
+
         if not column_ids:
             raise ValueError('No columns provided')
         column_names = []
@@ -134,17 +578,47 @@ class Tables:
             if column_id < 0 or column_id >= len(column_names_all):
                 raise ValueError(f'Column id ({column_id}) is invalid, must be in range (0 .. {len(column_names_all)})')
             column_names.append(column_names_all[column_id])
+        return column_names
+
+    def _time(self, timestamp: float) -> int:
+        """
+        Returns timestamp in units of the time column
+
+        :param timestamp: time as timestamp
+        """
+
+        if self.time_resolution == 1:
+            return int(timestamp)
+        return round(timestamp * self.time_resolution)
+
+    def _bucket(self, start_time: float, bucket_width: float) -> str:
+        """
+        SQL expression of start of time bucket in seconds
+
+        :param start_time: start of first time bucket as timestamp
+        :param bucket_width: width of time buckets in seconds
+        """
+
+        width = max(1, self._time(bucket_width))
+        return self.time_select(f'(Time - ((Time - {self._time(start_time)}) % {width}))')
+
+    def _time_condition(self, start_time: float | None, end_time: float | None) -> str:
+        """
+        SQL condition for timeframe
+
+        :param start_time: start time as timestamp
+        :param end_time: end time as timestamp
+        """
 
         conditions = []
         if start_time is not None:
-            conditions.append(f'Time >= {int(start_time)}')
+            conditions.append(f'Time >= {self._time(start_time)}')
         if end_time is not None:
-            conditions.append(f'Time <= {int(end_time)}')
+            conditions.append(f'Time <= {self._time(end_time)}')
         condition = ' AND '.join(conditions)
         if condition:
             condition = f' WHERE {condition}'
-
-        return column_names, f'''SELECT {', '.join(column_names)} FROM {self.name}{condition};'''
+        return condition
 
 
 class PressureTable(Tables):
@@ -197,6 +671,13 @@ class LaserTable(Tables):
         'Seeder_Bursts': 'INTEGER default 0',
         'RF_Level': 'FLOAT default 0',
     }
+    deadband = {
+        'Chiller_Temperature': 0.1,
+        'Baseplate_Temperature': 0.1,
+        'Chiller_Flow': 0.1,
+        'Chiller_Pressure': 0.1,
+        'RF_Level': 0.1,
+    }
 
     def __init__(self):
         super().__init__()
@@ -220,6 +701,204 @@ class PowerMeterTable(Tables):
         super().__init__()
 
 
+class RollupTable(Tables):
+    """
+    Pre-aggregated table with count, minimum, maximum, mean and population variance of every column of a base table per time bucket
+
+    :param base: table which is aggregated
+    :param suffix: suffix of name of rollup table
+    :param resolution: width of time buckets in seconds
+    """
+
+    def __init__(self, base: Tables, suffix: str, resolution: int):
+        self.base = base
+        self.resolution = resolution
+        self.name = f'{base.name}_{suffix}'
+        self.structure = {
+            'Time': 'BIGINT',
+            'Count': 'BIGINT default 0',
+        }
+        for column_name in base.column_names()[1:]:
+            self.structure[f'{column_name}_min'] = 'FLOAT default 0'
+            self.structure[f'{column_name}_max'] = 'FLOAT default 0'
+            self.structure[f'{column_name}_mean'] = 'FLOAT default 0'
+            self.structure[f'{column_name}_var'] = 'DOUBLE default 0'
+        super().__init__()
+
+    def watermark(self) -> str:
+        """SQL query for start of last (possibly incomplete) time bucket"""
+        return f'''SELECT MAX(Time) FROM {self.name};'''
+
+    def delete_from(self, start_time: int | None) -> str:
+        """
+        SQL query to delete all time buckets starting at given time
+
+        :param start_time: start time as timestamp (None for all)
+        """
+
+        return f'''DELETE FROM {self.name}{self._time_condition(start_time, None)};'''
+
+    def aggregate_from(self, start_time: int | None, source: str = '') -> str:
+        """
+        SQL query to aggregate rows of base table starting at given time
+
+        :param start_time: start time as timestamp (None for all), should be the start of a time bucket
+        :param source: relation to read the rows of the base table from (e.g. including archived rows)
+        """
+
+        seconds = self.base.time_seconds()
+        aggregates = [f'{seconds} - ({seconds} % {self.resolution}) AS Bucket', 'COUNT(*)']
+        for column_name in self.base.column_names()[1:]:
+            value = f'CAST({column_name} AS DOUBLE)'
+            aggregates.extend([f'MIN({column_name})', f'MAX({column_name})', f'AVG({column_name})', f'AVG({value} * {value}) - AVG({value}) * AVG({value})'])
+
+        return f'''INSERT INTO {self.name} ({', '.join(self.column_names())}) SELECT {', '.join(aggregates)} FROM {source or self.base.name}{self.base._time_condition(start_time, None)} GROUP BY Bucket;'''
+
+    # statistics that can be combined from time buckets
+    statistics = ('count', 'min', 'max', 'mean', 'std')
+
+    def get_statistics(
+        self,
+        column_ids: tuple[int],
+        start_time: int,
+        end_time: int,
+        stats: list[str],
+        bucket_width: int | None = None,
+        source: str = '',
+        sqlite3: bool = False,
+        approximate: bool = True,
+        watermark: int | None = None
+    ) -> tuple[list, str]:
+        """
+        SQL query to get statistics (see RollupTable.statistics) of columns of the base table within given timeframe, optionally for each time bucket.
+        Complete time buckets of this table within the timeframe are combined with the remaining rows of the base table at its edges, so the result is exact.
+        'std' is the sample variance, since sqlite3 has no square root.
+
+        :param column_ids: ids of columns of the base table (time column will be ignored)
+        :param start_time: start time as timestamp
+        :param end_time: end time as timestamp
+        :param stats: list of statistics
+        :param bucket_width: width of time buckets in seconds (None for one bucket starting at start_time), start_time and bucket_width should be multiples of the resolution
+        :param source: relation to read the rows of the base table from (e.g. including archived rows)
+        :param sqlite3: not used, the query is the same for all databases
+        :param approximate: not used, there are no percentiles
+        :param watermark: start of last time bucket of this table (see watermark()), None to look it up within the query
+
+        :returns: list of columns ('Time' followed by '<column>_<statistic>' for each column and statistic), sql query
+        """
+
+        column_names = [column_name for column_name in self.base._column_names(column_ids) if column_name != 'Time']
+        if not column_names:
+            raise ValueError('No columns besides time provided')
+        for stat in stats:
+            if stat not in self.statistics:
+                raise ValueError(f'Statistic "{stat}" can not be calculated from rollup table "{self.name}"')
+
+        # complete time buckets within the timeframe that are not the last (possibly incomplete) time bucket
+        covered_start = -(-int(start_time) // self.resolution) * self.resolution
+        covered_end = (int(end_time) + 1) // self.resolution * self.resolution
+        watermark = f'COALESCE((SELECT MAX(Time) FROM {self.name}), 0)' if watermark is None else int(watermark)
+
+        rollup_columns = ['Time', 'Count']
+        base_columns = [f'{self.base.time_select()} AS Time', '1 AS Count']
+        statistic_names = ['Time']
+        aggregates = [f'Time - ((Time - {int(start_time)}) % {int(bucket_width)}) AS Bucket' if bucket_width else f'{int(start_time)} AS Bucket']
+        for column_name in column_names:
+            rollup_columns.extend([f'{column_name}_min', f'{column_name}_max', f'{column_name}_mean', f'{column_name}_var'])
+            base_columns.extend([f'{column_name} AS {column_name}_min', f'{column_name} AS {column_name}_max', f'{column_name} AS {column_name}_mean', f'0 AS {column_name}_var'])
+            # sum of squared deviations of all buckets from the total mean
+            mean = f'CAST({column_name}_mean AS DOUBLE)'
+            squares = f'SUM({column_name}_var * Count) + SUM(Count * {mean} * {mean}) - SUM(Count * {mean}) * SUM(Count * {mean}) / SUM(Count)'
+            for stat in stats:
+                statistic_names.append(f'{column_name}_{stat}')
+                aggregates.append({
+                    'count': 'SUM(Count)',
+                    'min': f'MIN({column_name}_min)',
+                    'max': f'MAX({column_name}_max)',
+                    'mean': f'SUM({mean} * Count) / SUM(Count)',
+                    'std': f'({squares}) / (SUM(Count) - 1)',
+                }[stat])
+
+        # the edges are separate ranges, so both are found by the time index or zone maps of the base table if the watermark is known
+        rollup_end = f'CASE WHEN {watermark} < {covered_end} THEN {watermark} ELSE {covered_end} END' if isinstance(watermark, str) else min(watermark, covered_end)
+        base_condition = self.base._time_condition(start_time, end_time)
+        return statistic_names, f'''WITH Source AS (
+            SELECT {', '.join(rollup_columns)} FROM {self.name} WHERE Time >= {covered_start} AND Time < {covered_end} AND Time < {watermark}
+            UNION ALL
+            SELECT {', '.join(base_columns)} FROM {source or self.base.name}{base_condition} AND Time < {self.base._time(covered_start)}
+            UNION ALL
+            SELECT {', '.join(base_columns)} FROM {source or self.base.name}{base_condition} AND Time >= {self.base._time(covered_start)}
+                AND Time >= {self._base_time(rollup_end)}
+        )
+        SELECT {', '.join(aggregates)} FROM Source GROUP BY Bucket ORDER BY Bucket;'''
+
+    def _base_time(self, timestamp: int | str) -> int | str:
+        """
+        Returns time in seconds (number or SQL expression) in units of the time column of the base table
+
+        :param timestamp: time as timestamp or SQL expression
+        """
+
+        if isinstance(timestamp, str):
+            return timestamp if self.base.time_resolution == 1 else f'({timestamp}) * {self.base.time_resolution}'
+        return self.base._time(timestamp)
+
+    def get_downsampled(
+        self,
+        column_ids: tuple[int],
+        start_time: int,
+        end_time: int,
+        bucket_width: int,
+        source: str = '',
+        watermark: int | None = None
+    ) -> tuple[list, str]:
+        """
+        SQL query to get minimum, maximum and mean of columns of the base table for each time bucket within given timeframe.
+        Complete time buckets of this table within the timeframe are combined with the remaining rows of the base table at its edges and with rows that are not aggregated yet.
+
+        :param column_ids: ids of columns of the base table (time column will be ignored)
+        :param start_time: start time as timestamp
+        :param end_time: end time as timestamp
+        :param bucket_width: width of time buckets in seconds, should be a multiple of the resolution
+        :param source: relation to read the rows of the base table from (e.g. including archived rows)
+        :param watermark: start of last time bucket of this table (see watermark()), None to look it up within the query
+
+        :returns: list of columns ('Time' followed by '<column>_min', '<column>_max', '<column>_mean' for each column), sql query
+        """
+
+        column_names = [column_name for column_name in self.base._column_names(column_ids) if column_name != 'Time']
+        if not column_names:
+            raise ValueError('No columns besides time provided')
+
+        # complete time buckets within the timeframe that are not the last (possibly incomplete) time bucket
+        covered_start = -(-int(start_time) // self.resolution) * self.resolution
+        covered_end = (int(end_time) + 1) // self.resolution * self.resolution
+        watermark = f'COALESCE((SELECT MAX(Time) FROM {self.name}), 0)' if watermark is None else int(watermark)
+
+        rollup_columns = ['Time', 'Count']
+        base_columns = [f'{self.base.time_select()} AS Time', '1 AS Count']
+        bucket_names = ['Time']
+        aggregates = [f'Time - ((Time - {int(start_time)}) % {int(bucket_width)}) AS Bucket']
+        for column_name in column_names:
+            rollup_columns.extend([f'{column_name}_min', f'{column_name}_max', f'{column_name}_mean'])
+            base_columns.extend([f'{column_name} AS {column_name}_min', f'{column_name} AS {column_name}_max', f'{column_name} AS {column_name}_mean'])
+            bucket_names.extend([f'{column_name}_min', f'{column_name}_max', f'{column_name}_mean'])
+            aggregates.extend([f'MIN({column_name}_min)', f'MAX({column_name}_max)', f'SUM({column_name}_mean * Count) / SUM(Count)'])
+
+        # the edges are separate ranges, so both are found by the time index or zone maps of the base table if the watermark is known
+        rollup_end = f'CASE WHEN {watermark} < {covered_end} THEN {watermark} ELSE {covered_end} END' if isinstance(watermark, str) else min(watermark, covered_end)
+        base_condition = self.base._time_condition(start_time, end_time)
+        return bucket_names, f'''WITH Source AS (
+            SELECT {', '.join(rollup_columns)} FROM {self.name} WHERE Time >= {covered_start} AND Time < {covered_end} AND Time < {watermark}
+            UNION ALL
+            SELECT {', '.join(base_columns)} FROM {source or self.base.name}{base_condition} AND Time < {self.base._time(covered_start)}
+            UNION ALL
+            SELECT {', '.join(base_columns)} FROM {source or self.base.name}{base_condition} AND Time >= {self.base._time(covered_start)}
+                AND Time >= {self._base_time(rollup_end)}
+        )
+        SELECT {', '.join(aggregates)} FROM Source GROUP BY Bucket ORDER BY Bucket;'''
+
+
 class EBISTable(Tables):
     name = 'EBIS'
     structure = {
@@ -242,79 +921,526 @@ class EBISTable(Tables):
         super().__init__()
 
 
-class DB:
+class FastTables(Tables):
     """
-    Database class for storing and accessing data in the database
-
-    :param commit_time_interval: interval in seconds until database will be committed if a query is executed
-    :param no_setup: no setup at startup
-    :param debug: if debug is enabled
-    :param db_file: use given database file (use empty for default one)
-    :param db_type: use database query language <DBType>
+    Metadata for tables of channels sampled at 10 Hz to 1000 Hz, whose time column is stored in microseconds.
+    Samples are inserted in blocks with their acquisition times (see DB.insertPowerMeterFast())
     """
 
-    class DBType(Enum):
-        sqlite3 = auto()
-        duckdb = auto()
+    time_default = 'CAST(EXTRACT(EPOCH FROM now()) * 1000000 AS BIGINT)'
+    time_default_sqlite3 = "(CAST((julianday('now') - 2440587.5) * 86400000000 AS INTEGER))"
+    time_resolution = 1000000
 
-    default_last_seconds = 300
+    # samples are deleted after a week, their rollup tables are kept
+    retention = 7 * 86400
 
-    def __init__(
-        self,
-        commit_time_interval: int = 300,
-        no_setup: bool = False,
-        debug: bool = False,
-        db_file: str = '',
-        db_type: DBType = DBType.duckdb
-    ):
-        self.commit_time_interval = commit_time_interval
-        self.debug = debug
 
-        if not db_file:
-            if db_type == DB.DBType.sqlite3:
-                db_file = DefaultParams.db_file_sqlite3
-            elif db_type == DB.DBType.duckdb:
-                db_file = DefaultParams.db_file_duckdb
-            else:
-                GlobalConf.logger.error(f'Provided database type "{db_type}" is not supported!')
-                raise ValueError(f'Provided database type "{db_type}" is not supported!')
+class PowerMeterFastTable(FastTables):
+    name = 'PowerMeter_Fast'
+    structure = {
+        'Time': f'''BIGINT DEFAULT {FastTables.time_default}''',
+        'Power': 'FLOAT default 0',
+    }
 
-        self.database_path = Path(__file__).parents[1] / DefaultParams.db_folder / db_file
-        self.connection: Connection | DuckDBPyConnection | None = None
-        self.cursor: Cursor | DuckDBPyConnection | None = None
+    def __init__(self):
+        super().__init__()
 
-        try:
-            if db_type == DB.DBType.sqlite3:
-                self.connection = connect_sqlite3(self.database_path)
-            elif db_type == DB.DBType.duckdb:
-                self.connection = connect_duckdb(self.database_path)
-            else:
-                GlobalConf.logger.error(f'Provided database type "{db_type}" is not supported!')
-                raise ValueError(f'Provided database type "{db_type}" is not supported!')
-            GlobalConf.logger.info(f'Using database system "{db_type}"')
 
-            self.cursor = self.connection.cursor()
+class PicoammeterFastTable(FastTables):
+    name = 'Picoammeter_Fast'
+    structure = {
+        'Time': f'''BIGINT DEFAULT {FastTables.time_default}''',
+        'Current': 'FLOAT default 0',
+    }
 
-        except (OperationalError, CatalogException) as error:
-            GlobalConf.logger.error(f'DB: Can not connect to database in file "{self.database_path}" because: {error}')
+    def __init__(self):
+        super().__init__()
 
-        self.new_commit_time = datetime.now()
 
-        self.pressure_table = PressureTable()
-        self.psu_table = PSUTable()
-        self.laser_table = LaserTable()
-        self.power_meter_table = PowerMeterTable()
-        self.ebis_table = EBISTable()
-        self.tables = [
-            self.pressure_table,
-            self.psu_table,
-            self.laser_table,
-            self.power_meter_table,
-            self.ebis_table
-        ]
+class RangeCache:
+    """
+    Least recently used cache of query results (one array per column, first column is the time) with bounded memory.
+    Results are stored per key (e.g. table and columns) and time range and also serve all sub-ranges of their time range.
+    All methods are thread-safe.
 
-        if not no_setup:
-            self.setUp()
+    :param max_bytes: maximum memory of all cached arrays in bytes
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[tuple, list[np.ndarray]] = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = Lock()
+
+        # number of invalidations per key prefix and number of clears
+        self.versions: dict[tuple, int] = {}
+        self.clears = 0
+
+    def version(self, key: tuple) -> int:
+        """
+        Returns version of results of key, which changes whenever they are invalidated (see put())
+
+        :param key: key of result
+        """
+
+        with self.lock:
+            return self.clears + sum(self.versions.get(key[:i], 0) for i in range(len(key) + 1))
+
+    def get(self, key: tuple, start_time: int | None, end_time: int | None) -> list[np.ndarray] | None:
+        """
+        Returns copy of cached columns within timeframe or None if the timeframe is not cached
+
+        :param key: key of result
+        :param start_time: start time as timestamp (None for no limit)
+        :param end_time: end time as timestamp (None for no limit)
+        """
+
+        with self.lock:
+            return self._get(key, start_time, end_time)
+
+    def _get(self, key: tuple, start_time: int | None, end_time: int | None) -> list[np.ndarray] | None:
+        """Returns copy of cached columns within timeframe or None (see get())"""
+
+        for entry_key, columns in self.entries.items():
+            entry_start, entry_end = entry_key[-2:]
+            if entry_key[:-2] != key:
+                continue
+            if entry_start is not None and (start_time is None or start_time < entry_start):
+                continue
+            if entry_end is not None and (end_time is None or end_time > entry_end):
+                continue
+
+            self.entries.move_to_end(entry_key)
+            self.hits += 1
+            first = 0 if start_time is None else np.searchsorted(columns[0], start_time, side='left')
+            last = len(columns[0]) if end_time is None else np.searchsorted(columns[0], end_time, side='right')
+            return [column[first:last].copy() for column in columns]
+
+        self.misses += 1
+        return None
+
+    def put(self, key: tuple, start_time: int | None, end_time: int | None, columns: list[np.ndarray], version: int | None = None):
+        """
+        Caches columns of timeframe, the first column must be the sorted time
+
+        :param key: key of result
+        :param start_time: start time as timestamp (None for no limit)
+        :param end_time: end time as timestamp (None for no limit)
+        :param columns: list of arrays
+        :param version: version of results of key before the query (see version()), columns are not cached if they were invalidated since then
+        """
+
+        size = sum(column.nbytes for column in columns)
+        if size > self.max_bytes or np.any(np.diff(columns[0]) < 0):
+            return
+
+        if version is not None and version != self.version(key):
+            return
+
+        with self.lock:
+            self._put(key, start_time, end_time, columns, size)
+
+    def _put(self, key: tuple, start_time: int | None, end_time: int | None, columns: list[np.ndarray], size: int):
+        """Caches columns of timeframe (see put())"""
+
+        entry_key = key + (start_time, end_time)
+        if entry_key in self.entries:
+            self._remove(entry_key)
+        self.entries[entry_key] = columns
+        self.bytes += size
+
+        while self.bytes > self.max_bytes:
+            self._remove(next(iter(self.entries)))
+
+    def invalidate(self, key_prefix: tuple, timestamp: int):
+        """
+        Removes all results whose timeframe includes or ends after timestamp, e.g. when a row with this time is inserted
+
+        :param key_prefix: first values of keys of results (e.g. only the table)
+        :param timestamp: time as timestamp
+        """
+
+        with self.lock:
+            self.versions[key_prefix] = self.versions.get(key_prefix, 0) + 1
+            for entry_key in list(self.entries.keys()):
+                if entry_key[:len(key_prefix)] != key_prefix:
+                    continue
+                if entry_key[-1] is None or entry_key[-1] >= timestamp:
+                    self._remove(entry_key)
+
+    def clear(self):
+        """Removes all results"""
+
+        with self.lock:
+            self.clears += 1
+            self.entries.clear()
+            self.bytes = 0
+
+    def info(self) -> dict[str, int]:
+        """Returns number of hits, misses, results and used bytes"""
+
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self.entries),
+                'bytes': self.bytes,
+            }
+
+    def _remove(self, entry_key: tuple):
+        """Removes result"""
+
+        self.bytes -= sum(column.nbytes for column in self.entries.pop(entry_key))
+
+
+def onWriterThread(method):
+    """Decorator for <DB> methods: executes the method on the writer thread (if threaded) and waits for its result"""
+
+    @wraps(method)
+    def wrapper(self: DB, *args, **kwargs):
+        if self.writer is None or current_thread() is self.writer:
+            return method(self, *args, **kwargs)
+        self.last_query_time = time()
+        return self._submit(method, self, *args, **kwargs).result()
+
+    return wrapper
+
+
+def onReader(method):
+    """Decorator for reading <DB> methods: executes the method on the calling thread if there are readers (see DB._reader()), otherwise like onWriterThread"""
+
+    @wraps(method)
+    def wrapper(self: DB, *args, **kwargs):
+        if self.writer is None or current_thread() is self.writer:
+            return method(self, *args, **kwargs)
+        self.last_query_time = time()
+        if self.readers is None:
+            return self._submit(method, self, *args, **kwargs).result()
+        return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+class DB:
+    """
+    Database class for storing and accessing data in the database
+
+    :param commit_time_interval: interval in seconds until database will be committed if a query is executed
+    :param no_setup: no setup at startup
+    :param debug: if debug is enabled
+    :param db_file: use given database file (use empty for default one)
+    :param db_type: use database query language <DBType>
+    :param buffer_size: number of rows per table that are buffered before they are written (use 1 for no buffering)
+    :param buffer_time: maximum age in seconds of buffered rows before they are written
+    :param threaded: use a writer thread that owns the connection and executes all queries, so the calling (GUI) thread never waits for inserts or commits
+    :param queue_size: maximum number of pending tasks of the writer thread. If the queue is full, inserted rows are dropped (and counted in dropped_rows) instead of blocking the caller, all other calls wait for a free slot
+    :param archive: move rows of closed months into monthly Parquet files (only for duckdb), queries read them transparently
+    :param cache_size: maximum memory in bytes of cached query results (see getDataColumns(), use 0 for no caching)
+    :param deadbands: dictionary of table name and dictionary of column name and tolerance, which replaces Tables.deadband of the table (use an empty dictionary to store every row).
+        A row of a table with deadband is only stored if any column changed by more than its tolerance since the last stored row or if heartbeat_time has passed since then
+    :param heartbeat_time: maximum time in seconds between stored rows of tables with deadband
+    :param retentions: dictionary of table name and age in seconds after which rows are deleted, which replaces Tables.retention of the table (0 to keep all rows)
+    :param maintenance: run maintenance (see maintenance_intervals) on the writer thread when no queries were made for DefaultParams.db_maintenance_idle_time seconds (only if threaded)
+    :param readers: number of read-only connections (only if threaded), which execute queries of getData() and similar methods on the calling thread in parallel to the writer thread (use 0 to execute them on the writer thread)
+    :param journal: write stored rows to a memory-mapped journal per table (see Journal) until they are durable in the database, rows of the journals are inserted at the next start after a crash
+    """
+
+    class DBType(Enum):
+        sqlite3 = auto()
+        duckdb = auto()
+
+    default_last_seconds = 300
+
+    # suffix and width in seconds of time buckets of rollup tables
+    rollup_resolutions = {
+        '1m': 60,
+        '1h': 3600,
+        '1d': 86400,
+    }
+    rollup_time_interval = 60
+
+    # maintenance steps and interval in seconds between their runs
+    maintenance_intervals = {
+        'retention': 86400,
+        'checkpoint': 3600,
+        'vacuum': 86400,
+        'analyze': 86400,
+    }
+
+    def __init__(
+        self,
+        commit_time_interval: int = 300,
+        no_setup: bool = False,
+        debug: bool = False,
+        db_file: str = '',
+        db_type: DBType = DBType.duckdb,
+        buffer_size: int = 100,
+        buffer_time: int = 10,
+        threaded: bool = False,
+        queue_size: int = 1000,
+        archive: bool = True,
+        cache_size: int = DefaultParams.db_cache_size,
+        deadbands: dict[str, dict[str, float]] | None = None,
+        heartbeat_time: int = DefaultParams.db_heartbeat_time,
+        retentions: dict[str, int] | None = None,
+        maintenance: bool = True,
+        readers: int = DefaultParams.db_readers,
+        journal: bool = True
+    ):
+        self.commit_time_interval = commit_time_interval
+        self.debug = debug
+        self.db_type = db_type
+        self.buffer_size = max(1, buffer_size)
+        self.buffer_time = buffer_time
+
+        if not db_file:
+            if db_type == DB.DBType.sqlite3:
+                db_file = DefaultParams.db_file_sqlite3
+            elif db_type == DB.DBType.duckdb:
+                db_file = DefaultParams.db_file_duckdb
+            else:
+                GlobalConf.logger.error(f'Provided database type "{db_type}" is not supported!')
+                raise ValueError(f'Provided database type "{db_type}" is not supported!')
+
+        self.database_path = Path(__file__).parents[1] / DefaultParams.db_folder / db_file
+        self.archive_path = self.database_path.parent / f'{self.database_path.stem}{DefaultParams.db_archive_suffix}'
+        self.journal_path = self.database_path.parent / f'{self.database_path.stem}{DefaultParams.db_journal_suffix}'
+        self.archive = archive and db_type == DB.DBType.duckdb
+        self.new_archive_time = self._monthStart(time(), 1)
+        self.connection: Connection | DuckDBPyConnection | None = None
+        self.cursor: Cursor | DuckDBPyConnection | None = None
+
+        self.new_commit_time = datetime.now()
+
+        self.pressure_table = PressureTable()
+        self.psu_table = PSUTable()
+        self.laser_table = LaserTable()
+        self.power_meter_table = PowerMeterTable()
+        self.ebis_table = EBISTable()
+        self.power_meter_fast_table = PowerMeterFastTable()
+        self.picoammeter_fast_table = PicoammeterFastTable()
+        self.tables = [
+            self.pressure_table,
+            self.psu_table,
+            self.laser_table,
+            self.power_meter_table,
+            self.ebis_table,
+            self.power_meter_fast_table,
+            self.picoammeter_fast_table
+        ]
+
+        self.rollup_tables: dict[str, list[RollupTable]] = {
+            table.name: [RollupTable(table, suffix, resolution) for suffix, resolution in self.rollup_resolutions.items()]
+            for table in self.tables
+        }
+        self.new_rollup_time = datetime.now() + timedelta(seconds=self.rollup_time_interval)
+        # earliest time (as timestamp) of rows inserted since the last rollup update of each table
+        self.rollup_start_times: dict[str, float] = {}
+
+        self.buffers: dict[str, list[tuple]] = {table.name: [] for table in self.tables}
+        self.cache = RangeCache(cache_size)
+
+        # journals of rows that are not durable in the database yet, opened by setUp()
+        self.journal = journal
+        self.journals: dict[str, Journal] = {}
+        self.replayed_rows = 0
+
+        # tolerances of value columns, last stored row and last suppressed row of tables with deadband
+        self.heartbeat_time = heartbeat_time
+        self.deadbands: dict[str, np.ndarray] = {}
+        self.last_rows: dict[str, np.ndarray] = {}
+        self.held_rows: dict[str, tuple] = {}
+        self.suppressed_rows = 0
+        for table in self.tables:
+            deadband = table.deadband
+            if deadbands is not None and table.name in deadbands:
+                deadband = deadbands[table.name]
+            if not deadband:
+                continue
+            for column in deadband.keys():
+                if column not in table.variables:
+                    raise ValueError(f'Deadband column "{column}" not in values of table "{table.name}"')
+            self.deadbands[table.name] = np.array([deadband.get(column, 0) for column in table.variables], dtype=np.float64)
+        self.new_flush_time = datetime.now() + timedelta(seconds=self.buffer_time)
+
+        self.retentions: dict[str, int] = {}
+        for table in self.tables:
+            retention = table.retention
+            if retentions is not None and table.name in retentions:
+                retention = retentions[table.name]
+            if retention:
+                self.retentions[table.name] = int(retention)
+
+        # maintenance starts with a checkpoint and all other steps after their first interval
+        self.maintenance = maintenance and threaded
+        self.maintenance_report: dict = {}
+        self.last_query_time = time()
+        # duckdb reuses space of deleted rows, but does not shrink its file on VACUUM (see split_months() to rewrite the file)
+        if db_type == DB.DBType.duckdb:
+            self.maintenance_intervals = {step: interval for step, interval in self.maintenance_intervals.items() if step != 'vacuum'}
+        self.new_maintenance_times = {step: time() + interval for step, interval in self.maintenance_intervals.items()}
+        self.new_maintenance_times['checkpoint'] = time()
+
+        self.writer: Thread | None = None
+        self.queue: Queue | None = None
+        self.dropped_rows = 0
+
+        # pool of read-only connections and time of the oldest row that is not committed yet (only for sqlite3, duckdb commits every query)
+        self.reader_count = readers if threaded else 0
+        self.readers: Queue | None = None
+        self.read_executor: ThreadPoolExecutor | None = None
+        self.uncommitted_time: int | None = None
+        if threaded:
+            self.queue = Queue(maxsize=queue_size)
+            self.writer = Thread(target=self._writerLoop, name='DBWriter', daemon=True)
+            self.writer.start()
+
+        self._connect()
+
+        if not no_setup:
+            self.setUp()
+
+    @onWriterThread
+    def _connect(self):
+        """Connects to the database file"""
+
+        try:
+            if self.db_type == DB.DBType.sqlite3:
+                self.connection = connect_sqlite3(self.database_path)
+            elif self.db_type == DB.DBType.duckdb:
+                self.connection = connect_duckdb(self.database_path)
+            else:
+                GlobalConf.logger.error(f'Provided database type "{self.db_type}" is not supported!')
+                raise ValueError(f'Provided database type "{self.db_type}" is not supported!')
+            GlobalConf.logger.info(f'Using database system "{self.db_type}"')
+
+            self.cursor = self.connection.cursor()
+
+            # the WAL is checkpointed by the maintenance, so commits are not stalled by automatic checkpoints
+            if self.db_type == DB.DBType.duckdb and self.maintenance:
+                self.cursor.execute(f"SET checkpoint_threshold = '{DefaultParams.db_checkpoint_threshold}';")
+
+            if self.reader_count > 0:
+                self._connectReaders()
+
+        except (OperationalError, CatalogException) as error:
+            GlobalConf.logger.error(f'DB: Can not connect to database in file "{self.database_path}" because: {error}')
+
+    def _connectReaders(self):
+        """
+        Opens the read-only connections: duplicated connections of the same database instance for duckdb,
+        read-only connections for sqlite3 in WAL mode, so readers and the writer do not block each other
+        """
+
+        if self.db_type == DB.DBType.sqlite3:
+            self.cursor.execute('PRAGMA journal_mode=WAL;')
+
+        self.readers = Queue()
+        for _ in range(self.reader_count):
+            if self.db_type == DB.DBType.duckdb:
+                self.readers.put(self.connection.cursor())
+            else:
+                self.readers.put(connect_sqlite3(f'{self.database_path.as_uri()}?mode=ro', uri=True, check_same_thread=False).cursor())
+        self.read_executor = ThreadPoolExecutor(max_workers=self.reader_count, thread_name_prefix='DBReader')
+
+    @contextmanager
+    def _reader(self):
+        """Context manager of the cursor of a free read-only connection, waits if all are in use (cursor of the writer if there are no readers)"""
+
+        if self.readers is None:
+            yield self.cursor
+            return
+
+        reader = self.readers.get()
+        try:
+            yield reader
+        finally:
+            self.readers.put(reader)
+
+    def _publish(self, tables: list[Tables], end_time: int | None):
+        """
+        Makes rows of tables up to end_time visible to the readers by writing their buffered rows and committing on the writer thread, if this is needed
+
+        :param tables: tables that are read
+        :param end_time: end time of read timeframe as timestamp
+        """
+
+        if self.readers is None:
+            for table in tables:
+                self._flush(table)
+            return
+
+        pending_tables = []
+        for table in tables:
+            rows = self.buffers[table.name]
+            if rows and (end_time is None or rows[0][0] <= table._time(end_time)):
+                pending_tables.append(table)
+
+        # queued tasks of the writer thread might insert rows
+        uncommitted_time = self.uncommitted_time
+        if pending_tables or self.queue.unfinished_tasks or (uncommitted_time is not None and (end_time is None or uncommitted_time <= end_time)):
+            self._publishTables(tables)
+
+    @onWriterThread
+    def _publishTables(self, tables: list[Tables]):
+        """
+        Writes buffered rows of tables and commits if needed (see _publish())
+
+        :param tables: tables whose buffered rows are written
+        """
+
+        for table in tables:
+            self._flush(table)
+        if self.uncommitted_time is not None:
+            self._commitIfDue(force_commit=True)
+
+    def _submit(self, function: Callable, *args, block: bool = True, **kwargs) -> Future:
+        """
+        Queues function call for the writer thread
+
+        :param function: function to be executed
+        :param block: wait for a free slot if queue is full, otherwise raises queue.Full
+        :returns: future of the result
+        """
+
+        future = Future()
+        self.queue.put((future, function, args, kwargs), block=block)
+        return future
+
+    def _writerLoop(self):
+        """Executes queued function calls until None is queued. Writes buffered rows if there is nothing to do"""
+
+        while True:
+            try:
+                task = self.queue.get(timeout=max(1, self.buffer_time))
+            except Empty:
+                if self.connection is not None:
+                    try:
+                        self._flush()
+                        self._syncJournals()
+                    except Exception as error:
+                        GlobalConf.logger.error(f'DB: Writing buffered rows failed because: {error}')
+                task = False
+
+            if task is None:
+                break
+
+            if task:
+                future, function, args, kwargs = task
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(function(*args, **kwargs))
+                    except Exception as error:
+                        future.set_exception(error)
+                self.queue.task_done()
+
+            if self.maintenance and self.connection is not None:
+                try:
+                    self._maintainIfDue()
+                except Exception as error:
+                    GlobalConf.logger.error(f'DB: Maintenance failed because: {error}')
 
     def _execute(self, query: str, force_commit: bool = False):
         """
@@ -332,83 +1458,766 @@ class DB:
             GlobalConf.logger.debug(f'DB query: {query}')
         self.cursor.execute(query)
 
+        if self.db_type == DB.DBType.sqlite3 and self.uncommitted_time is None and self.connection.in_transaction:
+            self.uncommitted_time = 0
+
+        self._commitIfDue(force_commit)
+
+    def _insertRows(self, table: Tables, rows: list[tuple], force_commit: bool = False):
+        """
+        Inserts all rows in one go and writes to database if timer is reached.
+        Uses executemany for sqlite3 and a NumPy relation for duckdb, since executemany is executed row by row there.
+
+        :param table: table where rows should be inserted
+        :param rows: list of rows (see Tables.row())
+        :param force_commit: forces a commit
+        """
+
+        if self.connection is None or self.cursor is None:
+            GlobalConf.logger.error(f'DB: connection or cursor is None')
+            return
+
+        first_time = min(row[0] for row in rows) / table.time_resolution
+        self.rollup_start_times[table.name] = min(self.rollup_start_times.get(table.name, first_time), first_time)
+
+        if self.db_type == DB.DBType.duckdb:
+            source = f'buffer_{table.name.lower()}'
+            query = table.insert_select(source)
+            if self.debug:
+                GlobalConf.logger.debug(f'DB query ({len(rows)} rows): {query}')
+            self.cursor.register(source, {column: np.array(values) for column, values in zip(table.insert_columns(), zip(*rows))})
+            try:
+                self.cursor.execute(query)
+            finally:
+                self.cursor.unregister(source)
+
+            # every query of duckdb is committed, so only buffered rows are not durable
+            self._resetJournals([table])
+        else:
+            query = table.insert_parameterized()
+            if self.debug:
+                GlobalConf.logger.debug(f'DB query ({len(rows)} rows): {query}')
+            self.cursor.executemany(query, rows)
+
+            self.uncommitted_time = first_time if self.uncommitted_time is None else min(self.uncommitted_time, first_time)
+
+        self._commitIfDue(force_commit)
+
+    def _commitIfDue(self, force_commit: bool = False):
+        """
+        Writes to database if timer is reached
+
+        :param force_commit: forces a commit
+        """
+
         now = datetime.now()
         if not force_commit:
             if now <= self.new_commit_time:
                 return
         self.connection.commit()
+        self.uncommitted_time = None
         self.new_commit_time = now + timedelta(seconds=self.commit_time_interval)
+        self._resetJournals(self.tables)
+
+    def _resetJournals(self, tables: list[Tables]):
+        """
+        Resets journals of tables after their rows are durable in the database, only buffered rows are kept
+
+        :param tables: tables whose inserted rows are durable
+        """
+
+        for table in tables:
+            journal = self.journals.get(table.name)
+            if journal is not None:
+                journal.reset(self.buffers[table.name])
+
+    def _syncJournals(self):
+        """Synchronizes journals to disk if their sync time has passed"""
+
+        for journal in self.journals.values():
+            journal.sync()
+
+    def _execute_return(self, query: str, force_commit: bool = False) -> list:
+        """
+        Executes the SQL query, writes to database if timer is reached and returns result.
+
+        :param query: SQL query to be executed
+        :param force_commit: forces a commit
+        :return: list of results
+        """
+
+        if self.connection is None or self.cursor is None:
+            GlobalConf.logger.error(f'DB: connection or cursor is None')
+            return []
+
+        self._execute(query, force_commit)
+        return self.cursor.fetchall()
+
+    def _execute_return_columns(self, query: str, dtypes: list[np.dtype], force_commit: bool = False) -> list[np.ndarray]:
+        """
+        Executes the SQL query, writes to database if timer is reached and returns result as one contiguous array per column.
+        Uses fetchnumpy for duckdb and reads the rows of sqlite3 directly into a structured array, so no list of rows is created.
+
+        :param query: SQL query to be executed
+        :param dtypes: data types of columns (only used for sqlite3, duckdb keeps the types of the database)
+        :param force_commit: forces a commit
+        :return: list of arrays
+        """
+
+        if self.connection is None or self.cursor is None:
+            GlobalConf.logger.error(f'DB: connection or cursor is None')
+            return [np.empty(0, dtype=dtype) for dtype in dtypes]
+
+        self._execute(query, force_commit)
+        return self._fetchColumns(self.cursor, query, dtypes)
+
+    def _read_columns(self, query: str, dtypes: list[np.dtype]) -> list[np.ndarray]:
+        """
+        Executes the SQL query on a free reader (see _reader()) and returns result as one contiguous array per column (see _execute_return_columns())
+
+        :param query: SQL query to be executed
+        :param dtypes: data types of columns (only used for sqlite3)
+        :return: list of arrays
+        """
+
+        if self.readers is None:
+            return self._execute_return_columns(query, dtypes)
+
+        if self.debug:
+            GlobalConf.logger.debug(f'DB read query: {query}')
+        with self._reader() as cursor:
+            cursor.execute(query)
+            return self._fetchColumns(cursor, query, dtypes)
+
+    def _read(self, query: str) -> list:
+        """
+        Executes the SQL query on a free reader (see _reader()) and returns result
+
+        :param query: SQL query to be executed
+        :return: list of results
+        """
+
+        if self.readers is None:
+            return self._execute_return(query)
+
+        if self.debug:
+            GlobalConf.logger.debug(f'DB read query: {query}')
+        with self._reader() as cursor:
+            cursor.execute(query)
+            return cursor.fetchall()
+
+    def _fetchColumns(self, cursor: Cursor | DuckDBPyConnection, query: str, dtypes: list[np.dtype]) -> list[np.ndarray]:
+        """
+        Returns result of executed SQL query as one contiguous array per column (see _execute_return_columns())
+
+        :param cursor: cursor that executed the query
+        :param query: executed SQL query, which is executed again if sqlite3 returns NULL values
+        :param dtypes: data types of columns (only used for sqlite3)
+        :return: list of arrays
+        """
+
+        if self.db_type == DB.DBType.duckdb:
+            columns = []
+            for column in cursor.fetchnumpy().values():
+                if isinstance(column, np.ma.MaskedArray):
+                    column = column.astype(np.float64).filled(np.nan)
+                columns.append(np.ascontiguousarray(column))
+            return columns
+
+        structured_dtype = np.dtype([(f'c{i}', dtype) for i, dtype in enumerate(dtypes)])
+        try:
+            results = np.fromiter(cursor, dtype=structured_dtype)
+        except TypeError:
+            # NULL values can not be converted to integers, so read everything as floats
+            cursor.execute(query)
+            results = np.array(cursor.fetchall(), dtype=np.float64).reshape(-1, len(dtypes))
+            return [np.ascontiguousarray(results[:, i]) for i in range(len(dtypes))]
+        return [np.ascontiguousarray(results[name]) for name in structured_dtype.names]
+
+    def _insert(self, table: Tables, *args, timestamp: float | None = None):
+        """
+        Timestamps row for table and buffers it (on the writer thread if threaded)
+
+        :param table: table where row should be inserted
+        :param timestamp: acquisition time of row as timestamp (default: now)
+        """
+
+        row = table.row(time() if timestamp is None else timestamp, *args)
+
+        if self.writer is None or current_thread() is self.writer:
+            self._bufferRow(table, row)
+            return
+
+        try:
+            self._submit(self._bufferRow, table, row, block=False).add_done_callback(self._logFailedInsert)
+        except Full:
+            self._dropRows(1)
+
+    def _insertSamples(self, table: Tables, timestamps: np.ndarray, *columns: np.ndarray):
+        """
+        Buffers rows of samples for table with one task of the writer thread (if threaded)
+
+        :param table: table where rows should be inserted
+        :param timestamps: acquisition times of samples as timestamps
+        :param columns: values of each column for every sample
+        """
+
+        rows = table.rows(timestamps, *columns)
+        if not rows:
+            return
+
+        if self.writer is None or current_thread() is self.writer:
+            self._bufferRows(table, rows)
+            return
+
+        try:
+            self._submit(self._bufferRows, table, rows, block=False).add_done_callback(self._logFailedInsert)
+        except Full:
+            self._dropRows(len(rows))
+
+    def _dropRows(self, rows: int):
+        """
+        Counts rows that are dropped, since the queue of the writer thread is full
+
+        :param rows: number of dropped rows
+        """
+
+        previous_rows = self.dropped_rows
+        self.dropped_rows += rows
+        if previous_rows == 0 or previous_rows // 100 != self.dropped_rows // 100:
+            GlobalConf.logger.warning(f'DB: Queue of writer thread is full, dropped {self.dropped_rows} rows so far')
+
+    @staticmethod
+    def _logFailedInsert(future: Future):
+        """Logs exception of queued insert, since no one is waiting for its result"""
+
+        error = future.exception()
+        if error is not None:
+            GlobalConf.logger.error(f'DB: Inserting row failed because: {error}')
+
+    def _bufferRow(self, table: Tables, row: tuple):
+        """
+        Buffers row for table and writes all buffered rows if buffer is full or too old
+
+        :param table: table where row should be inserted
+        :param row: row (see Tables.row())
+        """
+
+        if not self._changed(table, row):
+            self.held_rows[table.name] = row
+            self.suppressed_rows += 1
+            return
+        self.held_rows.pop(table.name, None)
+
+        journal = self.journals.get(table.name)
+        if journal is not None:
+            try:
+                journal.append(row)
+            except (TypeError, ValueError) as error:
+                GlobalConf.logger.error(f'DB: Row of table "{table.name}" could not be written to journal because: {error}')
+
+        self.buffers[table.name].append(row)
+        self.cache.invalidate((table.name, ), row[0] / table.time_resolution)
+
+        if len(self.buffers[table.name]) >= self.buffer_size:
+            self._flush(table)
+        elif datetime.now() > self.new_flush_time:
+            self._flush()
+
+    def _bufferRows(self, table: Tables, rows: list[tuple]):
+        """
+        Buffers rows for table (see _bufferRow())
+
+        :param table: table where rows should be inserted
+        :param rows: rows (see Tables.rows())
+        """
+
+        for row in rows:
+            self._bufferRow(table, row)
+
+    def _changed(self, table: Tables, row: tuple) -> bool:
+        """
+        Checks if row has to be stored, which is the case if the table has no deadband, if any column changed by more than its tolerance since the last stored row or if the heartbeat time has passed since then
+
+        :param table: table of row
+        :param row: row (see Tables.row())
+        """
+
+        tolerances = self.deadbands.get(table.name)
+        if tolerances is None:
+            return True
+
+        values = np.array(row, dtype=np.float64)
+        last_row = self.last_rows.get(table.name)
+        if last_row is not None and values[0] - last_row[0] < self.heartbeat_time * table.time_resolution:
+            # NaN is a change, unless it was NaN before
+            changed = ~(np.abs(values[1:] - last_row[1:]) <= tolerances) & ~(np.isnan(values[1:]) & np.isnan(last_row[1:]))
+            if not changed.any():
+                return False
+
+        self.last_rows[table.name] = values
+        return True
+
+    def _flush(self, table: Tables = None):
+        """
+        Writes buffered rows to database
+
+        :param table: table which buffer should be written (when non is provided all buffers will be written)
+        """
+
+        tables = self.tables
+        if table:
+            tables = [table]
+
+        for table in tables:
+            rows = self.buffers[table.name]
+            if not rows:
+                continue
+            self.buffers[table.name] = []
+            self._insertRows(table, rows)
+
+        if len(tables) == len(self.tables):
+            self.new_flush_time = datetime.now() + timedelta(seconds=self.buffer_time)
+
+            if datetime.now() > self.new_rollup_time:
+                self.updateRollups()
+
+            if self.archive and time() > self.new_archive_time:
+                self.archiveMonths()
+
+    def _commit(self):
+        """Commits to database"""
+
+        if self.connection is None or self.cursor is None:
+            GlobalConf.logger.error(f'DB: connection or cursor is None')
+            return
+
+        self._commitIfDue(force_commit=True)
+
+    @onWriterThread
+    def deleteAllTables(self):
+        """Deletes all tables on the database"""
+
+        if self.connection is None or self.cursor is None:
+            GlobalConf.logger.error(f'DB: connection or cursor is None')
+            return
+
+        self._execute('''SELECT name FROM sqlite_master WHERE type='table';''')
+        tables = self.cursor.fetchall()
+
+        for table in tables:
+            self._execute(f'''DROP TABLE IF EXISTS {table[0]};''')
+
+        self._commitIfDue(force_commit=True)
+        self.cache.clear()
+        self.last_rows = {}
+        self.held_rows = {}
+        for journal in self.journals.values():
+            journal.reset()
+
+    @onWriterThread
+    def setUp(self):
+        """Sets up all tables"""
+
+        for table in self.tables:
+            self._setUpTable(table)
+
+        if self.journal:
+            self._setUpJournals()
+
+        if self.archive:
+            for table in self.tables:
+                self._setUpArchive(table)
+
+        for rollup_tables in self.rollup_tables.values():
+            for rollup_table in rollup_tables:
+                self._setUpRollupTable(rollup_table)
+
+    def _setUpJournals(self):
+        """
+        Opens journals of all tables and inserts their rows, which were not durable in the database when it was last closed.
+        The journal only contains rows since its last reset (see Journal.reset()), so all of them are inserted regardless of their time.
+        A crash right between an insert and the reset of the journal might duplicate the inserted rows
+        """
+
+        for table in self.tables:
+            if table.name in self.journals:
+                continue
+
+            columns = table.insert_columns()
+            file = self.journal_path / f'{table.name}.journal'
+            journal = Journal(file, columns, table.dtypes(columns, raw=True), DefaultParams.db_journal_size, DefaultParams.db_journal_sync_time)
+
+            # journal of another structure of the table is kept for manual recovery
+            if not journal.matches():
+                journal.close()
+                kept_file = file.with_name(f'{file.stem}_{int(time())}{file.suffix}')
+                file.rename(kept_file)
+                GlobalConf.logger.warning(f'DB: Journal of table "{table.name}" does not match its columns, it is kept as "{kept_file}"')
+                journal = Journal(file, columns, table.dtypes(columns, raw=True), DefaultParams.db_journal_size, DefaultParams.db_journal_sync_time)
+
+            rows = journal.rows()
+            if rows:
+                self._insertRows(table, rows)
+                self.replayed_rows += len(rows)
+                GlobalConf.logger.info(f'DB: Inserted {len(rows)} rows of table "{table.name}" from journal')
+
+            self.journals[table.name] = journal
+
+        self._commitIfDue(force_commit=True)
+
+    def _setUpRollupTable(self, rollup_table: RollupTable):
+        """
+        Sets up rollup table, it will be (re-)created and filled if it does not exist or its structure is outdated
+
+        :param rollup_table: rollup table
+        """
+
+        try:
+            self._execute(rollup_table.exists_table())
+            result = [res[1] for res in self._execute_return(rollup_table.columns())]
+            if set(result) == set(rollup_table.column_names()):
+                return
+            GlobalConf.logger.info(f'DB: Rollup table "{rollup_table.name}" is outdated, will recreate it...')
+            self._execute(f'''DROP TABLE {rollup_table.name};''')
+        except (OperationalError, CatalogException):
+            GlobalConf.logger.info(f'DB: Rollup table "{rollup_table.name}" did not exist, will create it...')
+
+        self._execute(rollup_table.create_table(self.db_type == DB.DBType.sqlite3))
+        self._updateRollup(rollup_table, backfill=True)
+
+    def _setUpTable(self, table: Tables):
+        """
+        Sets up table
+
+        :param table: table
+        """
+
+        # check if table exists and if not create it
+        try:
+            self._execute(table.exists_table())
+        except (OperationalError, CatalogException):
+            GlobalConf.logger.info(f'DB: Table "{table.name}" did not exist, will create it...')
+            self._execute(table.create_table(self.db_type == DB.DBType.sqlite3))
+
+        # check if table structure is correct
+        result = [res[1] for res in self._execute_return(table.columns())]
+        if set(result) != set(table.column_names()):
+            raise RuntimeError(f'Columns of existing table "{table.name}" of ({result}) do not match required column names ({table.column_names()}).\nTry to call DB.updateColumns() for updating the columns. You should probably safe the DB beforehand.')
+
+        # check if index exists and if not create it
+        index_query = table.exists_index()
+        if index_query:
+            self._execute(index_query)
+            if not self.cursor.fetchone():
+                GlobalConf.logger.info(f'DB: Index for table "{table.name}" on "{table.index}" did not exist, will create it...')
+                self._execute(table.create_index())
+
+    @onWriterThread
+    def updateColumns(self):
+        """Updates all columns of all tables. WARNING: will delete old columns that are not used"""
+        self.removeOldColumns()
+        self.addNewColumns()
+
+        for rollup_tables in self.rollup_tables.values():
+            for rollup_table in rollup_tables:
+                self._setUpRollupTable(rollup_table)
+
+    @onWriterThread
+    def updateRollups(self, table: Tables = None, backfill: bool = False):
+        """
+        Aggregates new rows into the rollup tables. Only the last (possibly incomplete) time bucket of each rollup table and newer rows are aggregated again
+
+        :param table: table whose rollup tables should be updated (when non is provided all rollup tables will be updated)
+        :param backfill: aggregate all rows again, e.g. after rows were imported
+        """
+
+        tables = self.tables
+        if table:
+            tables = [table]
+
+        for table in tables:
+            self._flush(table)
+            for rollup_table in self.rollup_tables[table.name]:
+                self._updateRollup(rollup_table, backfill)
+            self.rollup_start_times.pop(table.name, None)
+
+        if len(tables) == len(self.tables):
+            self.new_rollup_time = datetime.now() + timedelta(seconds=self.rollup_time_interval)
+
+    def backfillRollups(self, table: Tables = None):
+        """
+        Aggregates all rows into the rollup tables again
+
+        :param table: table whose rollup tables should be filled (when non is provided all rollup tables will be filled)
+        """
+
+        self.updateRollups(table, backfill=True)
+
+    def _updateRollup(self, rollup_table: RollupTable, backfill: bool = False):
+        """
+        Aggregates rows starting at the last time bucket into the rollup table.
+        Rows inserted since the last update that are older than the last time bucket (e.g. with an acquisition time or from a journal) are aggregated again starting at their time bucket
+
+        :param rollup_table: rollup table
+        :param backfill: aggregate all rows
+        """
+
+        watermark = None
+        source = ''
+        if backfill:
+            source = self._source(rollup_table.base, None, None)
+        else:
+            watermark = self._execute_return(rollup_table.watermark())[0][0]
+            start_time = self.rollup_start_times.get(rollup_table.base.name)
+            if watermark is not None and start_time is not None and start_time < watermark:
+                watermark = int(start_time // rollup_table.resolution * rollup_table.resolution)
+                source = self._source(rollup_table.base, watermark, None)
+
+        self._execute(rollup_table.delete_from(watermark))
+        self._execute(rollup_table.aggregate_from(watermark, source))
+
+    def _setUpArchive(self, table: Tables):
+        """
+        Creates view (<table>_all) of all rows of table including its archived rows
+
+        :param table: table
+        """
+
+        self._execute(table.create_archive_view(self._archiveFiles(table)))
+
+    @onWriterThread
+    def archiveMonths(self, before: int | None = None) -> dict[str, int]:
+        """
+        Moves rows of closed months of all tables into monthly Parquet files sorted by time (e.g. '<database>_archive/Laser/2025-08.parquet'),
+        so the tables stay small. Rows are deleted after their Parquet file is written, rows of already archived months are added to their file.
+        Archiving is idempotent, so rows that were not deleted after their file was written (e.g. on a crash) are not duplicated in the next run.
+        If a file can not be replaced (e.g. it is opened by another program on Windows), its month stays in the table and is archived in a later run.
+
+        :param before: only months before the month of this timestamp are archived (default: current month)
+
+        :returns: number of archived rows per table
+        """
+
+        if self.db_type != DB.DBType.duckdb:
+            raise NotImplementedError(f'Archiving is not supported for database type "{self.db_type}"')
+
+        before = self._monthStart(time() if before is None else before)
+
+        archived_rows = {}
+        for table in self.tables:
+            # rows are aggregated before they are removed from the table
+            self.updateRollups(table)
+            archived_rows[table.name] = 0
+
+            first_time = self._execute_return(table.count(None, before))[0][1]
+            if first_time is None:
+                continue
+
+            (self.archive_path / table.name).mkdir(parents=True, exist_ok=True)
+            month_start = self._monthStart(first_time)
+            while month_start < before:
+                month_end = self._monthStart(month_start, 1)
+                rows = self._execute_return(table.count(month_start, month_end))[0][0]
+                if rows:
+                    file = self._archiveFile(table, month_start)
+                    temporary_file = file.with_suffix('.tmp')
+                    self._execute(table.archive(temporary_file, month_start, month_end, file if file.exists() else ''))
+                    try:
+                        temporary_file.replace(file)
+                    except OSError as error:
+                        GlobalConf.logger.error(f'DB: Could not replace archive "{file}" of table "{table.name}", rows stay in the table: {error}')
+                        temporary_file.unlink(missing_ok=True)
+                        month_start = month_end
+                        continue
+                    self._execute(table.delete_range(month_start, month_end), force_commit=True)
+                    archived_rows[table.name] += rows
+                    GlobalConf.logger.info(f'DB: Archived {rows} rows of table "{table.name}" into "{file}"')
+                month_start = month_end
+
+            self._setUpArchive(table)
+
+        self.new_archive_time = self._monthStart(time(), 1)
+        return archived_rows
+
+    def _archiveFile(self, table: Tables, month_start: int) -> Path:
+        """
+        Returns path of Parquet file of a month
+
+        :param table: table
+        :param month_start: start of month as timestamp
+        """
+
+        return self.archive_path / table.name / f'{datetime.fromtimestamp(month_start, timezone.utc):%Y-%m}.parquet'
+
+    def _archiveFiles(self, table: Tables, start_time: int | None = None, end_time: int | None = None) -> list[Path]:
+        """
+        Returns paths of Parquet files of table whose month (given by the file name) overlaps with timeframe
+
+        :param table: table
+        :param start_time: start time as timestamp
+        :param end_time: end time as timestamp
+        """
+
+        files = []
+        for file in sorted((self.archive_path / table.name).glob('*.parquet')):
+            month_start = self._archiveMonth(file)
+            if month_start is None:
+                continue
+            if end_time is not None and month_start > end_time:
+                continue
+            if start_time is not None and self._monthStart(month_start, 1) <= start_time:
+                continue
+            files.append(file)
+        return files
+
+    @staticmethod
+    def _archiveMonth(file: Path) -> int | None:
+        """
+        Returns start of month of Parquet file as timestamp (given by the file name), or None if it is no archive file
+
+        :param file: path of Parquet file
+        """
+
+        try:
+            return int(datetime.strptime(file.stem, '%Y-%m').replace(tzinfo=timezone.utc).timestamp())
+        except ValueError:
+            return None
+
+    def _source(self, table: Tables, start_time: int | None, end_time: int | None) -> str:
+        """
+        Returns relation of rows of table including archived rows within timeframe, or an empty string if no archived rows are needed
 
-    def _execute_return(self, query: str, force_commit: bool = False) -> list:
+        :param table: table
+        :param start_time: start time as timestamp
+        :param end_time: end time as timestamp
         """
-        Executes the SQL query, writes to database if timer is reached and returns result.
 
-        :param query: SQL query to be executed
-        :param force_commit: forces a commit
-        :return: list of results
+        if not self.archive:
+            return ''
+        files = self._archiveFiles(table, start_time, end_time)
+        if not files:
+            return ''
+        return table.archive_union(files)
+
+    @staticmethod
+    def _monthStart(timestamp: float, months: int = 0) -> int:
         """
+        Returns start of month (in UTC) of timestamp as timestamp
 
-        if self.connection is None or self.cursor is None:
-            GlobalConf.logger.error(f'DB: connection or cursor is None')
-            return []
+        :param timestamp: timestamp
+        :param months: number of months to shift the result
+        """
 
-        self._execute(query, force_commit)
-        return self.cursor.fetchall()
+        date = datetime.fromtimestamp(timestamp, timezone.utc)
+        month = date.year * 12 + date.month - 1 + months
+        return int(datetime(month // 12, month % 12 + 1, 1, tzinfo=timezone.utc).timestamp())
 
-    def _commit(self):
-        """Commits to database"""
+    def _maintainIfDue(self):
+        """Runs due maintenance steps if no queries were made recently, steps that are not started because of a new query are run in the next quiet period"""
 
-        if self.connection is None or self.cursor is None:
-            GlobalConf.logger.error(f'DB: connection or cursor is None')
+        due_steps = [step for step, new_time in self.new_maintenance_times.items() if time() >= new_time]
+        if not due_steps or time() - self.last_query_time < DefaultParams.db_maintenance_idle_time:
             return
 
-        self.connection.commit()
-        self.new_commit_time = datetime.now() + timedelta(self.commit_time_interval)
+        self.maintenance_report = self.maintain(due_steps, lambda: time() - self.last_query_time >= DefaultParams.db_maintenance_idle_time)
 
-    def deleteAllTables(self):
-        """Deletes all tables on the database"""
+    @onWriterThread
+    def maintain(self, steps: list[str] | None = None, quiet: Callable[[], bool] | None = None) -> dict:
+        """
+        Runs maintenance steps and reports time spent and measured size of the database files:
+         - 'retention': deletes rows older than the retention of their table (see Tables.retention) and removes archived months that are completely older
+         - 'checkpoint': writes the WAL into the database file
+         - 'vacuum': rewrites the whole file to return space of deleted rows (only for sqlite3)
+         - 'analyze': updates statistics of the query planner
 
-        if self.connection is None or self.cursor is None:
-            GlobalConf.logger.error(f'DB: connection or cursor is None')
-            return
+        :param steps: steps to run (default: all steps of maintenance_intervals)
+        :param quiet: called before each step, remaining steps are skipped if it returns False (e.g. if a query is waiting)
 
-        self._execute('''SELECT name FROM sqlite_master WHERE type='table';''')
-        tables = self.cursor.fetchall()
+        :returns: dictionary of seconds per step, deleted rows and removed files per table, file sizes before and after in bytes,
+            their difference as reclaimed bytes (negative if the files grew) and skipped steps
+        """
 
-        for table in tables:
-            self._execute(f'''DROP TABLE IF EXISTS {table[0]};''')
+        steps = list(self.maintenance_intervals.keys()) if steps is None else steps
+        for step in steps:
+            if step not in self.maintenance_intervals:
+                raise ValueError(f'Maintenance step "{step}" is not supported')
+
+        self._flush()
+        report = {'seconds': {}, 'deleted_rows': {}, 'removed_files': {}, 'size_before': self._fileSize(), 'skipped': []}
+
+        for step in steps:
+            if quiet is not None and not quiet():
+                report['skipped'].append(step)
+                continue
+
+            start_time = time()
+            if step == 'retention':
+                self._applyRetention(report)
+            elif step == 'checkpoint':
+                if self.db_type == DB.DBType.duckdb:
+                    self._execute('CHECKPOINT;', force_commit=True)
+                else:
+                    self._commitIfDue(force_commit=True)
+                    self._execute('PRAGMA wal_checkpoint(TRUNCATE);')
+            elif step == 'vacuum':
+                self._commitIfDue(force_commit=True)
+                self._execute('VACUUM;')
+            elif step == 'analyze':
+                self._execute('ANALYZE;', force_commit=True)
+            report['seconds'][step] = time() - start_time
+            self.new_maintenance_times[step] = time() + self.maintenance_intervals[step]
+
+        report['size_after'] = self._fileSize()
+        report['reclaimed'] = report['size_before'] - report['size_after']
+
+        GlobalConf.logger.info(
+            f'DB: Maintenance ({", ".join(report["seconds"].keys()) or "nothing"}) took {sum(report["seconds"].values()):.2f}s, '
+            f'database files changed from {report["size_before"] / 1E6:.1f} MB to {report["size_after"] / 1E6:.1f} MB'
+            + (f', skipped {", ".join(report["skipped"])} because of queries' if report['skipped'] else '')
+        )
+        return report
 
-        self.connection.commit()
+    def _applyRetention(self, report: dict):
+        """
+        Deletes rows and archived months that are older than the retention of their table
 
-    def setUp(self):
-        """Sets up all tables"""
+        :param report: report of maintain(), where deleted rows and removed files are added
+        """
 
         for table in self.tables:
-            # check if table exists and if not create it
-            try:
-                self._execute(table.exists_table())
-            except (OperationalError, CatalogException):
-                GlobalConf.logger.info(f'DB: Table "{table.name}" did not exist, will create it...')
-                self._execute(table.create_table())
-
-            # check if table structure is correct
-            result = [res[1] for res in self._execute_return(table.columns())]
-            if set(result) != set(table.column_names()):
-                raise RuntimeError(f'Columns of existing table "{table.name}" of ({result}) do not match required column names ({table.column_names()}).\nTry to call DB.updateColumns() for updating the columns. You should probably safe the DB beforehand.')
-
-            # check if index exists and if not create it
-            index_query = table.exists_index()
-            if index_query:
-                self._execute(index_query)
-                if not self.cursor.fetchone():
-                    GlobalConf.logger.info(f'DB: Index for table "{table.name}" on "{table.index}" did not exist, will create it...')
-                    self._execute(table.create_index())
-
-    def updateColumns(self):
-        """Updates all columns of all tables. WARNING: will delete old columns that are not used"""
-        self.removeOldColumns()
-        self.addNewColumns()
-
+            retention = self.retentions.get(table.name)
+            if not retention:
+                continue
+            before = int(time()) - retention
+
+            # rows are aggregated before they are removed from the table
+            self.updateRollups(table)
+
+            rows = self._execute_return(table.count(None, before))[0][0]
+            if rows:
+                self._execute(table.delete_before(before), force_commit=True)
+            report['deleted_rows'][table.name] = rows
+
+            files = [file for file in self._archiveFiles(table, None, before) if self._monthStart(self._archiveMonth(file), 1) <= before]
+            for file in files:
+                file.unlink()
+            if files and self.archive:
+                self._setUpArchive(table)
+            report['removed_files'][table.name] = len(files)
+
+            if rows or files:
+                self.cache.clear()
+
+    def _fileSize(self) -> int:
+        """Returns size in bytes of the database file, its WAL and its archived files"""
+
+        files = [self.database_path, Path(f'{self.database_path}.wal'), Path(f'{self.database_path}-wal')]
+        if self.archive_path.exists():
+            files.extend(self.archive_path.rglob('*.parquet'))
+        return sum(file.stat().st_size for file in files if file.exists())
+
+    @onWriterThread
     def addNewColumns(self, table: Tables = None, columns: list[str] = None):
         """
         Add new columns to table (from structure-definition to database.db file)
@@ -428,8 +2237,10 @@ class DB:
                 new_columns = [c for c in new_columns if c in columns]
             diff_columns = list(set(new_columns) - set(old_columns))
             if diff_columns:
-                self._execute(table.alter_add(diff_columns))
+                self._execute(table.alter_add(diff_columns, self.db_type == DB.DBType.sqlite3))
+                self.cache.clear()
 
+    @onWriterThread
     def removeOldColumns(self, table: Tables = None, columns: list[str] = None):
         """
         Remove columns from table (from structure-definition to database.db file)
@@ -450,7 +2261,41 @@ class DB:
             diff_columns = list(set(old_columns) - set(new_columns))
             if diff_columns:
                 self._execute(table.alter_remove(diff_columns))
+                self.cache.clear()
+
+    def cacheInfo(self) -> dict[str, int]:
+        """Returns number of hits, misses, cached results and their used bytes of the cache of getDataColumns()"""
+        return self.cache.info()
+
+    def getDataFuture(
+        self,
+        table_idx: int,
+        columns: int | tuple[int] | list[str] | None = None,
+        start_time: int | None = None,
+        end_time: int | None = None
+    ) -> Future:
+        """
+        Get future of values from table with table_idx, which does not block if threaded (see getData()).
+        The query is executed by a reader thread if there are readers, otherwise by the writer thread
+
+        :param columns: column ids or column names
+        :param table_idx: index of table
+        :param start_time: start time as timestamp
+        :param end_time: end time as timestamp
+        """
 
+        if self.writer is None or current_thread() is self.writer:
+            future = Future()
+            try:
+                future.set_result(self.getData(table_idx, columns, start_time, end_time))
+            except Exception as error:
+                future.set_exception(error)
+            return future
+        if self.read_executor is not None:
+            return self.read_executor.submit(self.getData, table_idx, columns, start_time, end_time)
+        return self._submit(self.getData, table_idx, columns, start_time, end_time)
+
+    @onReader
     def getData(
         self,
         table_idx: int,
@@ -465,6 +2310,401 @@ class DB:
         :param table_idx: index of table
         :param start_time: start time as timestamp
         :param end_time: end time as timestamp
+
+        :returns: tuple of column names and 2D array of column values
+        """
+
+        data = self.getDataColumns(table_idx, columns, start_time, end_time)
+        if data is False:
+            return False
+        column_names, column_values = data
+        return column_names, np.column_stack(column_values).astype(np.float64, copy=False)
+
+    @onReader
+    def getDataColumns(
+        self,
+        table_idx: int,
+        columns: int | tuple[int] | list[str] | None = None,
+        start_time: int | None = None,
+        end_time: int | None = None
+    ) -> bool | tuple[list, list[np.ndarray]]:
+        """
+        Get values from table with table_idx as one contiguous array per column with the type of the column (e.g. int64 for times, float32 or float64 for values).
+        Results are cached and also serve later queries of the same columns within their timeframe, until newer rows are inserted within their timeframe.
+
+        :param columns: column ids or column names
+        :param table_idx: index of table
+        :param start_time: start time as timestamp
+        :param end_time: end time as timestamp
+
+        :returns: tuple of column names and list of column values
+        """
+
+        column_ids = self._columnIds(table_idx, columns)
+        table = self.tables[table_idx]
+
+        # time column is always fetched, so cached results can be sliced by time
+        query_ids = column_ids if 0 in column_ids else (0, ) + column_ids
+        results = self.cache.get((table.name, query_ids), start_time, end_time)
+        if results is None:
+            version = self.cache.version((table.name, query_ids))
+            self._publish([table], end_time)
+            column_names, query = table.get(query_ids, start_time, end_time, self._source(table, start_time, end_time))
+            results = self._read_columns(query, table.dtypes(column_names))
+            self.cache.put((table.name, query_ids), start_time, end_time, results, version)
+            results = [column.copy() for column in results]
+
+        if not len(results[0]):
+            return False
+        if query_ids != column_ids:
+            results = results[1:]
+        return table._column_names(column_ids), results
+
+    @onReader
+    def exportJoined(
+        self,
+        selection: dict[int, tuple[int]],
+        start_time: int | None,
+        end_time: int | None,
+        file_path: str,
+        file_format: str = 'parquet'
+    ):
+        """
+        Exports columns of multiple tables joined on their time directly from the database into a file (only for duckdb)
+
+        :param selection: dictionary of table index and ids of columns (without the time column)
+        :param start_time: start time as timestamp
+        :param end_time: end time as timestamp
+        :param file_path: path of output file
+        :param file_format: 'parquet' or 'csv'
+        """
+
+        if self.db_type != DB.DBType.duckdb:
+            raise NotImplementedError(f'Exporting directly is not supported for database type "{self.db_type}"')
+        if file_format not in ('parquet', 'csv'):
+            raise ValueError(f'File format "{file_format}" is not supported')
+
+        self._publish([self.tables[table_idx] for table_idx in selection.keys()], end_time)
+
+        _, query = self._joinedQuery(selection, start_time, end_time)
+        options = 'FORMAT PARQUET' if file_format == 'parquet' else 'FORMAT CSV, HEADER'
+        file_path = str(file_path).replace("'", "''")
+        self._read(f'''COPY ({query}) TO '{file_path}' ({options});''')
+
+    def _joinedQuery(self, selection: dict[int, tuple[int]], start_time: int | None, end_time: int | None) -> tuple[list, str]:
+        """
+        SQL query to get columns of multiple tables joined on their time within given timeframe
+
+        :param selection: dictionary of table index and ids of columns (without the time column)
+        :param start_time: start time as timestamp
+        :param end_time: end time as timestamp
+
+        :returns: list of columns, sql query
+        """
+
+        column_names = ['Time']
+        subqueries = []
+        for table_idx, column_ids in selection.items():
+            table = self.tables[table_idx]
+            table_column_names, query = table.get((0, ) + tuple(column_ids), start_time, end_time, self._source(table, start_time, end_time))
+            column_names.extend(table_column_names[1:])
+            subqueries.append(f'({query[:-1]}) AS {table.name}')
+        if not subqueries:
+            raise ValueError('No tables selected')
+
+        joins = subqueries[0]
+        for subquery in subqueries[1:]:
+            joins += f' FULL OUTER JOIN {subquery} USING (Time)'
+
+        return column_names, f'''SELECT {', '.join(column_names)} FROM {joins} ORDER BY Time'''
+
+    @onReader
+    def getJoined(
+        self,
+        selection: dict[int, tuple[int]],
+        start_time: int,
+        end_time: int,
+        tolerance: int = 0,
+        hold: bool = False
+    ) -> bool | tuple[list, np.ndarray]:
+        """
+        Get columns of multiple tables aligned on the union of their times with one query, so only the aligned result is transferred.
+        For every time the latest row of each table that is at most tolerance seconds older is used (ASOF join), otherwise its values are NaN.
+        If a table has multiple rows with the same time, only one of them is used.
+
+        :param selection: dictionary of table index and ids of columns (without the time column)
+        :param start_time: start time as timestamp
+        :param end_time: end time as timestamp
+        :param tolerance: maximum age in seconds of rows that are used for later times
+        :param hold: reconstruct step-held values of tables with deadband (see DB), by using at least their hold time (see holdTime()) as their tolerance
+
+        :returns: tuple of column names ('Time' followed by the selected columns) and 2D array of column values
+        """
+
+        selection = {table_idx: tuple(column_ids) for table_idx, column_ids in selection.items() if column_ids}
+        if not selection:
+            raise ValueError('No columns selected')
+
+        # only tables with deadband hold their values longer than tolerance
+        tolerances = {table_idx: tolerance for table_idx in selection.keys()}
+        if hold:
+            tolerances = {table_idx: max(tolerance, self.holdTime(table_idx) or 0) for table_idx in selection.keys()}
+
+        self._publish([self.tables[table_idx] for table_idx in selection.keys()], end_time)
+
+        if self.db_type == DB.DBType.duckdb:
+            column_names, query = self._asofQuery(selection, start_time, end_time, tolerances)
+        else:
+            column_names, query = self._asofQueryWindow(selection, start_time, end_time, tolerances)
+
+        sub_second = any(self.tables[table_idx].time_resolution != 1 for table_idx in selection.keys())
+        time_dtype = np.dtype(np.float64) if sub_second else np.dtype(np.int64)
+        results = self._read_columns(query, [time_dtype] + [np.dtype(np.float64)] * (len(column_names) - 1))
+        if not len(results[0]):
+            return False
+        return column_names, np.column_stack(results).astype(np.float64, copy=False)
+
+    def holdTime(self, table_idx: int) -> int | None:
+        """
+        Returns time in seconds for which stored values of table with table_idx are valid (twice the heartbeat time),
+        if the table has a deadband (see DB), otherwise None
+
+        :param table_idx: index of table
+        """
+
+        if self.tables[table_idx].name not in self.deadbands:
+            return None
+        return 2 * self.heartbeat_time
+
+    def _asofQuery(self, selection: dict[int, tuple[int]], start_time: int, end_time: int, tolerances: dict[int, int]) -> tuple[list, str]:
+        """
+        SQL query of getJoined() using ASOF joins (for duckdb)
+
+        :param selection: dictionary of table index and ids of columns (without the time column)
+        :param start_time: start time as timestamp
+        :param end_time: end time as timestamp
+        :param tolerances: dictionary of table index and maximum age in seconds of its rows that are used for later times
+
+        :returns: list of columns, sql query
+        """
+
+        if not any(tolerances.values()):
+            return self._exactJoinQuery(selection, start_time, end_time)
+
+        column_names = ['Time']
+        times = []
+        values = []
+        joins = []
+        for i, (table_idx, column_ids) in enumerate(selection.items()):
+            table = self.tables[table_idx]
+            tolerance = tolerances[table_idx]
+            source = self._source(table, start_time - tolerance, end_time) or table.name
+            table_column_names = table._column_names(column_ids)
+
+            times.append(f'SELECT {table.time_select()} AS Time FROM {source}{table._time_condition(start_time, end_time)}')
+            joins.append(f'ASOF LEFT JOIN (SELECT {table.time_select()} AS Time, {", ".join(table_column_names)} FROM {source}{table._time_condition(start_time - tolerance, end_time)}) AS t{i} ON Times.Time >= t{i}.Time')
+            for column_name in table_column_names:
+                values.append(f'CASE WHEN Times.Time - t{i}.Time <= {tolerance} THEN t{i}.{column_name} END AS c{len(values)}')
+            column_names.extend(table_column_names)
+
+        return column_names, f'''WITH Times AS (SELECT DISTINCT Time FROM ({' UNION ALL '.join(times)}))
+        SELECT Times.Time, {', '.join(values)} FROM Times {' '.join(joins)} ORDER BY Times.Time;'''
+
+    def _exactJoinQuery(self, selection: dict[int, tuple[int]], start_time: int, end_time: int) -> tuple[list, str]:
+        """
+        SQL query of getJoined() without tolerance (for duckdb): tables with one row per time are joined on their time, which is faster than ASOF joins
+
+        :param selection: dictionary of table index and ids of columns (without the time column)
+        :param start_time: start time as timestamp
+        :param end_time: end time as timestamp
+
+        :returns: list of columns, sql query
+        """
+
+        column_names = ['Time']
+        values = []
+        subqueries = []
+        for i, (table_idx, column_ids) in enumerate(selection.items()):
+            table = self.tables[table_idx]
+            source = self._source(table, start_time, end_time) or table.name
+            aggregates = []
+            for column_name in table._column_names(column_ids):
+                aggregates.append(f'ANY_VALUE({column_name}) AS c{len(values)}')
+                values.append(f'c{len(values)}')
+                column_names.append(column_name)
+            subqueries.append(f'(SELECT {table.time_select("Time")} AS Time, {", ".join(aggregates)} FROM {source}{table._time_condition(start_time, end_time)} GROUP BY {table.name}.Time) AS t{i}')
+
+        joins = subqueries[0]
+        for subquery in subqueries[1:]:
+            joins += f' FULL OUTER JOIN {subquery} USING (Time)'
+
+        return column_names, f'''SELECT Time, {', '.join(values)} FROM {joins} ORDER BY Time;'''
+
+    def _asofQueryWindow(self, selection: dict[int, tuple[int]], start_time: int, end_time: int, tolerances: dict[int, int]) -> tuple[list, str]:
+        """
+        SQL query of getJoined() using window functions (for sqlite3, which has no ASOF joins).
+        All rows are ordered by time and for every table the position of its latest row is carried forward.
+
+        :param selection: dictionary of table index and ids of columns (without the time column)
+        :param start_time: start time as timestamp
+        :param end_time: end time as timestamp
+        :param tolerances: dictionary of table index and maximum age in seconds of its rows that are used for later times
+
+        :returns: list of columns, sql query
+        """
+
+        column_names = ['Time']
+        events = []
+        lasts = []
+        last_groups = []
+        values = []
+        joins = []
+        for i, (table_idx, column_ids) in enumerate(selection.items()):
+            table = self.tables[table_idx]
+            tolerance = tolerances[table_idx]
+            table_column_names = table._column_names(column_ids)
+
+            events.append(f'SELECT {table.time_select()} AS Time, {i} AS Source, rowid AS Row FROM {table.name}{table._time_condition(start_time - tolerance, end_time)}')
+            lasts.append(f'MAX(CASE WHEN Source = {i} THEN Position END) OVER (ORDER BY Position ROWS UNBOUNDED PRECEDING) AS Last{i}')
+            last_groups.append(f'MAX(Last{i}) AS Last{i}')
+            joins.append(f'LEFT JOIN Positions AS p{i} ON p{i}.Position = Aligned.Last{i} LEFT JOIN {table.name} AS t{i} ON t{i}.rowid = p{i}.Row AND Aligned.Time - {table.time_select(f"t{i}.Time")} <= {tolerance}')
+            for column_name in table_column_names:
+                values.append(f't{i}.{column_name} AS c{len(values)}')
+            column_names.extend(table_column_names)
+
+        return column_names, f'''WITH Positions AS (
+            SELECT Time, Source, Row, ROW_NUMBER() OVER (ORDER BY Time, Source, Row) AS Position FROM ({' UNION ALL '.join(events)})
+        ),
+        Lasts AS (SELECT Time, {', '.join(lasts)} FROM Positions),
+        Aligned AS (SELECT Time, {', '.join(last_groups)} FROM Lasts WHERE Time >= {start_time} GROUP BY Time)
+        SELECT Aligned.Time, {', '.join(values)} FROM Aligned {' '.join(joins)} ORDER BY Aligned.Time;'''
+
+    @onReader
+    def getDataDownsampled(
+        self,
+        table_idx: int,
+        columns: int | tuple[int] | list[str] | None,
+        start_time: int,
+        end_time: int,
+        max_points: int
+    ) -> bool | tuple[list, np.ndarray]:
+        """
+        Get minimum, maximum and mean values for at most max_points time buckets from table with table_idx.
+        The aggregation is done by the database, so only the buckets are transferred.
+        The coarsest rollup table whose resolution fits in a time bucket is used instead of the table itself.
+
+        :param table_idx: index of table
+        :param columns: column ids or column names
+        :param start_time: start time as timestamp
+        :param end_time: end time as timestamp
+        :param max_points: maximum number of time buckets
+
+        :returns: tuple of column names ('Time' followed by '<column>_min', '<column>_max', '<column>_mean' for each column) and column values
+        """
+
+        column_ids = self._columnIds(table_idx, columns)
+        table = self.tables[table_idx]
+
+        # tables with sub-second resolution also have time buckets below one second
+        bucket_width = (end_time - start_time + 1 / table.time_resolution) / max(1, max_points)
+        if bucket_width >= 1 or table.time_resolution == 1:
+            bucket_width = max(1, ceil(bucket_width))
+        for rollup_table in self.rollup_tables[table.name]:
+            if rollup_table.resolution <= bucket_width:
+                table = rollup_table
+        if isinstance(table, RollupTable):
+            bucket_width = ceil(bucket_width / table.resolution) * table.resolution
+
+        self._publish([self.tables[table_idx]], end_time)
+
+        source = self._source(self.tables[table_idx], start_time, end_time)
+        if isinstance(table, RollupTable):
+            # constant watermark, so the rows of the base table at the edges are not filtered by a subquery
+            watermark = self._read(table.watermark())[0][0]
+            column_names, query = table.get_downsampled(column_ids, start_time, end_time, bucket_width, source, watermark=watermark or 0)
+        else:
+            column_names, query = table.get_downsampled(column_ids, start_time, end_time, bucket_width, source)
+        results = self._read(query)
+        if not results:
+            return False
+        return column_names, np.array(results, dtype=float)
+
+    @onReader
+    def getStatistics(
+        self,
+        table_idx: int,
+        columns: int | tuple[int] | list[str] | None,
+        start_time: int,
+        end_time: int,
+        stats: list[str] | tuple[str] = ('count', 'min', 'max', 'mean', 'std'),
+        group_by_bucket: int | None = None,
+        approximate: bool = True
+    ) -> bool | tuple[list, np.ndarray]:
+        """
+        Get statistics of columns from table with table_idx, which are calculated by the database, so no rows are transferred.
+        Statistics are 'count', 'min', 'max', 'mean', 'std' (sample standard deviation), 'median' and percentiles 'p<percent>' (e.g. 'p95').
+        If no percentiles are requested, the coarsest fitting rollup table is used, so long timeframes only need a few rows.
+        Percentiles are approximated by duckdb (if approximate) and are the nearest rank for sqlite3.
+        Tables with deadband (see holdTime()) only store changes, so their statistics are time-weighted (see Tables.get_held_statistics()) and do not use rollup tables.
+
+        :param table_idx: index of table
+        :param columns: column ids or column names
+        :param start_time: start time as timestamp
+        :param end_time: end time as timestamp
+        :param stats: list of statistics
+        :param group_by_bucket: width of time buckets in seconds for statistics per time bucket (None for one row of the whole timeframe)
+        :param approximate: use approximate percentiles (only for duckdb)
+
+        :returns: tuple of column names ('Time' followed by '<column>_<statistic>' for each column and statistic) and 2D array with one row per time bucket
+        """
+
+        column_ids = self._columnIds(table_idx, columns)
+        stats = list(stats)
+        for stat in stats:
+            Tables.statistic_quantile(stat)
+
+        table = self.tables[table_idx]
+        hold_time = self.holdTime(table_idx)
+        if hold_time is None and set(stats) <= set(RollupTable.statistics):
+            for rollup_table in self.rollup_tables[table.name]:
+                if group_by_bucket is None:
+                    fits = rollup_table.resolution <= int(end_time) - int(start_time)
+                else:
+                    fits = group_by_bucket % rollup_table.resolution == 0 and int(start_time) % rollup_table.resolution == 0
+                if fits:
+                    table = rollup_table
+
+        self._publish([self.tables[table_idx]], end_time)
+
+        base = self.tables[table_idx]
+        sqlite3 = self.db_type == DB.DBType.sqlite3
+        source = self._source(base, start_time - (hold_time or 0), end_time)
+        if hold_time is not None:
+            column_names, query = table.get_held_statistics(column_ids, start_time, end_time, stats, hold_time, group_by_bucket, source, sqlite3)
+        elif isinstance(table, RollupTable):
+            # constant watermark, so the rows of the base table at the edges are not filtered by a subquery
+            watermark = self._read(table.watermark())[0][0]
+            column_names, query = table.get_statistics(column_ids, start_time, end_time, stats, group_by_bucket, source, watermark=watermark or 0)
+        else:
+            column_names, query = table.get_statistics(column_ids, start_time, end_time, stats, group_by_bucket, source, sqlite3, approximate)
+        results = self._read_columns(query, base.dtypes(['Time']) + [np.dtype(np.float64)] * (len(column_names) - 1))
+        if not len(results[0]):
+            return False
+        results = np.column_stack(results).astype(np.float64, copy=False)
+
+        # sqlite3, rollup tables and time-weighted statistics return the variance
+        if sqlite3 or isinstance(table, RollupTable) or hold_time is not None:
+            for i, column_name in enumerate(column_names):
+                if column_name.endswith('_std'):
+                    results[:, i] = np.sqrt(np.maximum(results[:, i], 0))
+        return column_names, results
+
+    def _columnIds(self, table_idx: int, columns: int | tuple[int] | list[str] | None) -> tuple[int]:
+        """
+        Returns column ids of table with table_idx
+
+        :param table_idx: index of table
+        :param columns: column ids or column names
         """
 
         columns_all = list(self.tables[table_idx].structure.keys())
@@ -481,19 +2721,15 @@ class DB:
                     raise ValueError(f'Column "{column}" is not in table {self.tables[table_idx].name}')
                 column_ids.append(columns_all.index(column))
             column_ids = tuple(column_ids)
-
-        column_names, query = self.tables[table_idx].get(column_ids, start_time, end_time)
-        results = self._execute_return(query)
-        if not results:
-            return False
-        return column_names, np.array(results)
+        return column_ids
 
     def insertPressure(
         self,
         pitbul: float,
         lsd: float,
         esd: float,
-        prevac: float
+        prevac: float,
+        timestamp: float | None = None
     ):
         """
         Inserts Pressure values
@@ -502,9 +2738,10 @@ class DB:
         :param lsd: pressure for LSD in [mbar]
         :param esd: pressure for ESD in [mbar]
         :param prevac: pressure for prevacuum in [mbar]
+        :param timestamp: acquisition time of values as timestamp (default: now)
         """
 
-        self._execute(self.pressure_table.insert(pitbul, lsd, esd, prevac))
+        self._insert(self.pressure_table, pitbul, lsd, esd, prevac, timestamp=timestamp)
 
     def getPressure(
         self,
@@ -534,6 +2771,7 @@ class DB:
         ch2i: float,
         ch3v: float,
         ch3i: float,
+        timestamp: float | None = None
     ):
         """
         Inserts PSU values
@@ -546,9 +2784,10 @@ class DB:
         :param ch2i: measured current of channel 2 in [A]
         :param ch3v: measured voltage of channel 3 in [V]
         :param ch3i: measured current of channel 3 in [A]
+        :param timestamp: acquisition time of values as timestamp (default: now)
         """
 
-        self._execute(self.psu_table.insert(ch0v, ch0i, ch1v, ch1i, ch2v, ch2i, ch3v, ch3i))
+        self._insert(self.psu_table, ch0v, ch0i, ch1v, ch1i, ch2v, ch2i, ch3v, ch3i, timestamp=timestamp)
 
     def getPSU(
         self,
@@ -582,7 +2821,8 @@ class DB:
         pw: int = -1,
         rrd: int = -1,
         sb: int = -1,
-        rl: float = -1
+        rl: float = -1,
+        timestamp: float | None = None
     ):
         """
         Inserts Laser values
@@ -600,9 +2840,10 @@ class DB:
         :param rrd: repetition rate divisor
         :param sb: number of seeder bursts
         :param rl: RF level in [%]
+        :param timestamp: acquisition time of values as timestamp (default: now)
         """
 
-        self._execute(self.laser_table.insert(int(s), int(pc), l, cht, chst, bt, chf, chp, mrr, pw, rrd, sb, rl))
+        self._insert(self.laser_table, int(s), int(pc), l, cht, chst, bt, chf, chp, mrr, pw, rrd, sb, rl, timestamp=timestamp)
 
     def getLaser(
         self,
@@ -631,7 +2872,8 @@ class DB:
         beam_diameter: float,
         attenuation: float,
         averaging: int,
-        wavelength: int
+        wavelength: int,
+        timestamp: float | None = None
     ):
         """
         Inserts Power Meter values
@@ -644,9 +2886,10 @@ class DB:
         :param attenuation: attenuation in [dBm]
         :param averaging: count of averaging events
         :param wavelength: wavelength in [nm]
+        :param timestamp: acquisition time of values as timestamp (default: now)
         """
 
-        self._execute(self.power_meter_table.insert(power, power_dbm, current, irradiance, beam_diameter, attenuation, averaging, wavelength))
+        self._insert(self.power_meter_table, power, power_dbm, current, irradiance, beam_diameter, attenuation, averaging, wavelength, timestamp=timestamp)
 
     def getPowerMeter(
         self,
@@ -679,7 +2922,8 @@ class DB:
         RepV: float,
         RepI: float,
         HeatV: float,
-        HeatI: float
+        HeatI: float,
+        timestamp: float | None = None
     ): 
         """
         Inserts EBIS values
@@ -696,9 +2940,10 @@ class DB:
         :param RepI: repeller current in [A]
         :param HeatV: heating voltage in [V]
         :param HeatI: heating current in [A]
+        :param timestamp: acquisition time of values as timestamp (default: now)
         """
 
-        self._execute(self.ebis_table.insert(CatV, CatI, DT1V, DT1I, DT2V, DT2I, DT3V, DT3I, RepV, RepI, HeatV, HeatI))
+        self._insert(self.ebis_table, CatV, CatI, DT1V, DT1I, DT2V, DT2I, DT3V, DT3I, RepV, RepI, HeatV, HeatI, timestamp=timestamp)
 
     def getEBIS(
         self,
@@ -718,13 +2963,116 @@ class DB:
 
         return self.getData(self.tables.index(self.ebis_table), columns, start_time, end_time)
 
+    def insertPowerMeterFast(
+        self,
+        timestamps: np.ndarray,
+        power: np.ndarray
+    ):
+        """
+        Inserts block of samples of the Power Meter
+
+        :param timestamps: acquisition times of samples as timestamps
+        :param power: power in [W]
+        """
+
+        self._insertSamples(self.power_meter_fast_table, timestamps, power)
+
+    def getPowerMeterFast(
+        self,
+        columns: int | tuple[int] | list[str] | None = None,
+        start_time: float | None = None,
+        end_time: float | None = None
+    ) -> bool | tuple[list, np.ndarray]:
+        """
+        Get samples of the Power Meter, times are returned in seconds with microsecond resolution
+
+        :param columns: list of name of columns, tuple of ids of columns or None(=all columns)
+        :param start_time: start time as timestamp
+        :param end_time: end time as timestamp
+
+        :returns: tuple of column names and column values
+        """
+
+        return self.getData(self.tables.index(self.power_meter_fast_table), columns, start_time, end_time)
+
+    def insertPicoammeterFast(
+        self,
+        timestamps: np.ndarray,
+        current: np.ndarray
+    ):
+        """
+        Inserts block of samples of the Picoammeter
+
+        :param timestamps: acquisition times of samples as timestamps
+        :param current: current in [A]
+        """
+
+        self._insertSamples(self.picoammeter_fast_table, timestamps, current)
+
+    def getPicoammeterFast(
+        self,
+        columns: int | tuple[int] | list[str] | None = None,
+        start_time: float | None = None,
+        end_time: float | None = None
+    ) -> bool | tuple[list, np.ndarray]:
+        """
+        Get samples of the Picoammeter, times are returned in seconds with microsecond resolution
+
+        :param columns: list of name of columns, tuple of ids of columns or None(=all columns)
+        :param start_time: start time as timestamp
+        :param end_time: end time as timestamp
+
+        :returns: tuple of column names and column values
+        """
+
+        return self.getData(self.tables.index(self.picoammeter_fast_table), columns, start_time, end_time)
+
     def close(self):
-        """Must be called on close"""
+        """Must be called on close. Stops the writer thread after all queued tasks are done"""
+
+        self._close()
+
+        if self.writer is not None and current_thread() is not self.writer:
+            self.queue.put(None)
+            self.writer.join()
+            self.writer = None
+
+        if self.readers is not None:
+            self.read_executor.shutdown()
+            for _ in range(self.reader_count):
+                reader = self.readers.get()
+                reader.close()
+                if self.db_type == DB.DBType.sqlite3:
+                    reader.connection.close()
+            self.readers = None
+            self.read_executor = None
+
+    @onWriterThread
+    def flush(self):
+        """Writes buffered rows of all tables and commits. If threaded, this waits for all rows that were inserted before, since the writer thread handles its tasks in order"""
+
+        self._flush()
+        self._commit()
+
+    @onWriterThread
+    def _close(self):
+        """Writes buffered rows and commits"""
+
         if self.connection is None or self.cursor is None:
             GlobalConf.logger.error(f'DB: connection or cursor is None')
             return
 
-        self.connection.commit()
+        # last suppressed rows are stored, so held values end at the last known time
+        for table_name, row in self.held_rows.items():
+            self.buffers[table_name].append(row)
+        self.held_rows = {}
+
+        self._flush()
+        self._commitIfDue(force_commit=True)
+
+        for journal in self.journals.values():
+            journal.close()
+        self.journals = {}
 
 
 def main():
@@ -841,46 +3189,79 @@ def query_plan():
     db.close()
 
 
-def time_db():
+def time_fetch(rows: int = 1000000):
     from time import time
-    from datetime import datetime
+    import tracemalloc
 
-    db = DB()
-    #db = DB(debug=True, db_type=DB.DBType.sqlite3, db_file='Laserlab_backup.db')
+    db = DB(db_file='Benchmark.duckdb')
+    db._execute(f'''INSERT INTO Laser SELECT 1700000000 + range, 1, 1, 0, random() * 20, 20, 28, 5, 10, 50, 300, 1, 1, 90 FROM range({rows});''')
+    column_names, query = db.laser_table.get(tuple(range(len(db.laser_table.column_names()))), None, None)
+
+    tracemalloc.start()
+    start_time = time()
+    np.array(db._execute_return(query))
+    print(f'fetchall: {time() - start_time:.2f}s, peak memory {tracemalloc.get_traced_memory()[1] / 1E6:.0f} MB')
+    tracemalloc.stop()
 
+    tracemalloc.start()
     start_time = time()
-    db.getLaser(
-        start_time=int(datetime.strptime('01.08.2025 00:00:00', '%d.%m.%Y %H:%M:%S').timestamp()),
-        end_time=int(datetime.strptime('31.08.2025 00:00:00', '%d.%m.%Y %H:%M:%S').timestamp())
-    )
-    print(f'Took {time() - start_time}s to look up data from 01.08.2025 to 31.08.2025')
+    db._execute_return_columns(query, db.laser_table.dtypes(column_names))
+    print(f'columns: {time() - start_time:.2f}s, peak memory {tracemalloc.get_traced_memory()[1] / 1E6:.0f} MB')
+    tracemalloc.stop()
 
+    db.close()
+    db.connection.close()
+    db.database_path.unlink()
+
+    """
+    Results (duckdb, all 14 columns of 1000000 rows of Laser table)
+
+    fetchall: 23.07s, peak memory 532 MB
+    columns: 0.19s, peak memory 78 MB
+    (times are inflated by tracemalloc, which slows down every Python allocation)
+    """
+
+
+def backfill_rollups():
+    from time import time
+
+    db = DB(debug=True)
 
     start_time = time()
-    db.getLaser(
-        start_time=int(datetime.strptime('01.01.2025 00:00:00', '%d.%m.%Y %H:%M:%S').timestamp()),
-        end_time=int(datetime.strptime('31.08.2025 00:00:00', '%d.%m.%Y %H:%M:%S').timestamp())
-    )
-    print(f'Took {time() - start_time}s to look up data from 01.01.2025 to 31.08.2025')
+    db.backfillRollups()
+    print(f'Took {time() - start_time}s to fill all rollup tables')
 
     db.close()
 
+
+def split_months(db_file: str = ''):
     """
-    Results
-
-    sqlite3(indexed):
-    Took 4.675286531448364s to look up data from 01.08.2025 to 31.08.2025
-    Took 63.097015380859375s to look up data from 01.01.2025 to 31.08.2025
-    
-    sqlite3(pragmas):
-    Took 4.630336761474609s to look up data from 01.08.2025 to 31.08.2025
-    Took 63.966304540634155s to look up data from 01.01.2025 to 31.08.2025
-    
-    duckdb:
-    Took 3.174304723739624s to look up data from 01.08.2025 to 31.08.2025
-    Took 45.66825556755066s to look up data from 01.01.2025 to 31.08.2025
+    Migration of an existing database: moves all closed months of all tables into monthly Parquet files.
+    Afterwards the database is copied into a new file, since duckdb does not shrink its file when rows are deleted.
     """
 
+    db = DB(debug=True, db_file=db_file)
+    database_path = db.database_path
+    size = database_path.stat().st_size
+
+    start_time = time()
+    archived_rows = db.archiveMonths()
+    for name, rows in archived_rows.items():
+        print(f'Archived {rows} rows of table "{name}"')
+    print(f'Took {time() - start_time}s to archive all closed months')
+
+    compact_path = database_path.with_suffix('.compact')
+    compact_path.unlink(missing_ok=True)
+    database_name = db._execute_return('SELECT current_database();')[0][0]
+    db._execute(f'''ATTACH '{compact_path}' AS compact;''')
+    db._execute(f'''COPY FROM DATABASE {database_name} TO compact;''')
+    db._execute('DETACH compact;')
+    db.close()
+    db.connection.close()
+
+    compact_path.replace(database_path)
+    print(f'Database file shrank from {size / 1E6:.1f} MB to {database_path.stat().st_size / 1E6:.1f} MB')
+
 
 def setup_duckdb_naive():
     db_sqlite3 = DB(debug=True, no_setup=True, db_file='Laserlab.db', db_type=DB.DBType.sqlite3)
@@ -0,0 +1,163 @@
+from pathlib import Path
+from time import time
+from mmap import mmap, ACCESS_WRITE
+import json
+
+import numpy as np
+
+
+class Journal:
+    """
+    Memory-mapped, append-only file of fixed-width records of rows of one table, which are not durable in the database yet.
+    Rows written to the memory map survive a crash of the process immediately, the file is synchronized to disk at most every sync_time seconds, so a power loss only loses the rows since then.
+    After rows are durable in the database, the journal is reset, which only increments the generation in the header, so no records are erased.
+
+    File layout: header of header_size bytes (magic, generation, record size and JSON list of columns), followed by records (columns and generation).
+    Records are valid from the start of the file while their generation equals the generation of the header.
+
+    :param file: path of journal file, which is created if it does not exist
+    :param columns: column names of rows
+    :param dtypes: NumPy data types of columns
+    :param size: initial size in bytes of the file (doubles if full)
+    :param sync_time: maximum time in seconds between synchronizations of the file to disk
+    """
+
+    magic = b'IONJRNL1'
+    header_size = 4096
+    header_dtype = np.dtype([('Magic', 'S8'), ('Generation', '<i8'), ('Record_Size', '<i8')])
+
+    def __init__(self, file: Path, columns: list[str], dtypes: list[np.dtype], size: int = 1024 ** 2, sync_time: float = 1):
+        self.file = Path(file)
+        self.columns = columns
+        self.sync_time = sync_time
+        self.dtype = np.dtype([(column, dtype.newbyteorder('<')) for column, dtype in zip(columns, dtypes)] + [('Generation', '<i8')])
+        self.layout = json.dumps(columns).encode()
+        if self.header_dtype.itemsize + len(self.layout) > self.header_size:
+            raise ValueError(f'Too many columns for header of journal "{self.file}"')
+
+        self.map: mmap | None = None
+        self.header: np.ndarray | None = None
+        self.records: np.ndarray | None = None
+        self.generation = 0
+        self.count = 0
+        self.dirty = False
+        self.new_sync_time = time() + self.sync_time
+
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        if not self.file.exists() or self.file.stat().st_size < self.header_size + self.dtype.itemsize:
+            self._create(size)
+        self._open()
+
+    def _create(self, size: int):
+        """
+        Creates empty journal file
+
+        :param size: size in bytes of the file
+        """
+
+        with open(self.file, 'wb') as file:
+            file.truncate(max(size, self.header_size + self.dtype.itemsize))
+            header = np.zeros(1, dtype=self.header_dtype)
+            header[0] = (self.magic, 1, self.dtype.itemsize)
+            file.write(header.tobytes())
+            file.write(self.layout)
+
+    def _open(self):
+        """Maps the journal file, the records of the current generation are kept"""
+
+        with open(self.file, 'r+b') as file:
+            self.map = mmap(file.fileno(), 0, access=ACCESS_WRITE)
+        self.header = np.frombuffer(self.map, dtype=self.header_dtype, count=1)
+        self.records = np.frombuffer(self.map, dtype=self.dtype, count=(len(self.map) - self.header_size) // self.dtype.itemsize, offset=self.header_size)
+        self.generation = int(self.header[0]['Generation'])
+
+        # first record of another generation is the end
+        invalid = self.records['Generation'] != self.generation
+        self.count = int(np.argmax(invalid)) if invalid.any() else len(self.records)
+
+    def matches(self) -> bool:
+        """Returns if the layout of the file matches the columns"""
+
+        layout_end = self.map.find(b']', self.header_dtype.itemsize, self.header_size) + 1
+        return (
+            self.header[0]['Magic'] == self.magic
+            and self.header[0]['Record_Size'] == self.dtype.itemsize
+            and self.map[self.header_dtype.itemsize:layout_end] == self.layout
+        )
+
+    def rows(self) -> list[tuple]:
+        """Returns rows of the current generation as tuples of Python values (NaN is returned as None, since journaled NULL values are NaN)"""
+
+        records = self.records[:self.count][self.columns].tolist()
+        return [tuple(None if value != value else value for value in record) for record in records]
+
+    def append(self, row: tuple):
+        """
+        Appends row and synchronizes the file if sync_time has passed
+
+        :param row: row with values of columns
+        """
+
+        if self.count >= len(self.records):
+            self._grow()
+
+        self.records[self.count] = (*row, self.generation)
+        self.count += 1
+        self.dirty = True
+
+        if time() >= self.new_sync_time:
+            self.sync()
+
+    def reset(self, rows: list[tuple] | None = None):
+        """
+        Starts a new generation, which discards all records, and appends rows that are not durable yet
+
+        :param rows: rows to keep in the journal
+        """
+
+        self.generation += 1
+        self.header[0]['Generation'] = self.generation
+        self.count = 0
+        self.dirty = True
+        for row in rows or []:
+            self.append(row)
+
+    def sync(self, force: bool = False):
+        """
+        Synchronizes the file to disk if it changed
+
+        :param force: synchronize even if sync_time has not passed
+        """
+
+        if self.dirty and (force or time() >= self.new_sync_time):
+            self.map.flush()
+            self.dirty = False
+        self.new_sync_time = time() + self.sync_time
+
+    def _grow(self):
+        """Doubles the size of the file"""
+
+        self.sync(force=True)
+        size = len(self.map)
+        self._unmap()
+        with open(self.file, 'r+b') as file:
+            file.truncate(2 * size)
+        count = self.count
+        self._open()
+        self.count = count
+
+    def _unmap(self):
+        """Releases the NumPy views and closes the memory map"""
+
+        self.header = None
+        self.records = None
+        self.map.close()
+        self.map = None
+
+    def close(self):
+        """Synchronizes and closes the file"""
+
+        if self.map is None:
+            return
+        self.sync(force=True)
+        self._unmap()
@@ -3,11 +3,13 @@ from socket import socket, AF_INET, SOCK_STREAM
 from time import time, sleep
 
 
-from PyQt6.QtCore import pyqtSignal, QObject, QRunnable, pyqtSlot, QThreadPool
+from PyQt6.QtCore import pyqtSignal, QObject, QRunnable, pyqtSlot
 
 
 from Config.GlobalConf import GlobalConf, DefaultParams
 
+from Connection.Threaded import DeviceThreadPool
+
 
 class CommandQueue:
     """
@@ -340,7 +342,7 @@ class ScriptServer(QObject):
 
     def start(self):
         """Starts the execution of commands"""
-        QThreadPool.globalInstance().start(self.worker)
+        DeviceThreadPool.globalInstance().start(self.worker, 'ScriptServer')
 
     def stop(self):
         """Stops execution of commands"""
@@ -1,18 +1,14 @@
-from locale import getpreferredencoding
-from os import path
-from time import time
-from datetime import datetime
 from re import match
 
 
-from PyQt6.QtCore import Qt, QThreadPool, QObject, QRunnable, pyqtSignal, pyqtSlot, QProcess, QDir
-from PyQt6.QtWidgets import QDialog, QVBoxLayout, QLabel, QPushButton, QCheckBox, QHBoxLayout, QWidget, QProgressBar, QTextEdit, QMessageBox
+from PyQt6.QtCore import Qt, QThreadPool, QObject, QRunnable, pyqtSignal, pyqtSlot
+from PyQt6.QtWidgets import QDialog, QVBoxLayout, QLabel, QPushButton, QCheckBox, QHBoxLayout, QWidget, QProgressBar, QMessageBox
 from PyQt6.QtGui import QFont
 
 
 from Utility.Layouts import InputHBoxLayout, DoubleSpinBox, SpinBox, SpinBoxRange, FilePath, LineEdit
 from Utility.FileDialogs import selectFileDialog
-from Utility.LMFConvert import LM
+from Utility.LMFConvert import LM, TOFHistogram
 
 
 def showMessageBox(
@@ -117,7 +113,7 @@ class TACDialog(QDialog):
 
 class LMFDialog(QDialog):
     """
-    Dialog for converting LMFs
+    Dialog for converting LMFs into histograms
 
     :param filename: name of file
     """
@@ -134,9 +130,11 @@ class LMFDialog(QDialog):
             Signals for worker
 
             result: new LM
+            error: any occurring error
             """
 
             result = pyqtSignal(object)
+            error = pyqtSignal(Exception)
 
         def __init__(self, filename):
             super().__init__()
@@ -148,8 +146,61 @@ class LMFDialog(QDialog):
         def run(self):
             """Called when worker is started"""
 
-            self.lm.readLMF(self.filename, ignore_DAN=True, ignore_DAQ=True)
-            self.signals.result.emit(self.lm)
+            try:
+                self.lm.readLMF(self.filename, ignore_DAN=True, ignore_DAQ=True)
+                self.signals.result.emit(self.lm)
+            except Exception as error:
+                self.signals.error.emit(error)
+
+    class HistogramWorker(QRunnable):
+        """
+        Threaded worker for reading the events of the LMF chunk by chunk into a histogram
+
+        :param lm: initialized LM
+        :param histogram: histogram to fill
+        """
+
+        class WorkerSignals(QObject):
+            """
+            Signals for worker
+
+            progress: progress in percent
+            finished: if histogram was completed (False if cancelled)
+            error: any occurring error
+            """
+
+            progress = pyqtSignal(int)
+            finished = pyqtSignal(bool)
+            error = pyqtSignal(Exception)
+
+        def __init__(self, lm: LM, histogram: TOFHistogram):
+            super().__init__()
+            self.lm = lm
+            self.histogram = histogram
+            self.signals = self.WorkerSignals()
+            self.cancelled = False
+
+        def cancel(self):
+            """Cancels reading after the current chunk"""
+            self.cancelled = True
+
+        @pyqtSlot()
+        def run(self):
+            """Called when worker is started"""
+
+            try:
+                for chunk in self.lm.readEvents():
+                    if self.cancelled:
+                        self.signals.finished.emit(False)
+                        return
+                    if not self.histogram.add(*chunk):
+                        break
+                    if len(chunk[0]) and self.lm.NumberOfEvents:
+                        self.signals.progress.emit(min(100, round((chunk[0][-1] + 1) / self.lm.NumberOfEvents * 100)))
+                self.signals.finished.emit(True)
+
+            except Exception as error:
+                self.signals.error.emit(error)
 
     def __init__(
         self,
@@ -159,11 +210,9 @@ class LMFDialog(QDialog):
     ):
         super().__init__(*args, **kwargs)
 
-        self.program = path.join(QDir.currentPath(), 'lmf2txt', 'lmf2txt.exe')
-        self.total_process_log: list[tuple[float, str]] = []
-
         self.filename = filename
         self.finish_state = False
+        self.histogram_worker = None
 
         self.setWindowFlags(Qt.WindowType.Dialog | Qt.WindowType.WindowTitleHint)
         self.setWindowTitle('LMF converter')
@@ -199,6 +248,25 @@ class LMFDialog(QDialog):
         )
         self.main_layout.addLayout(self.time_stop_layout)
 
+        # Edges and trigger channel
+        self.rising_input = QCheckBox(self)
+        self.rising_layout = InputHBoxLayout(
+            'Rising edges:',
+            self.rising_input,
+            tooltip='Also include rising edges in histogram',
+            split=split
+        )
+        self.main_layout.addLayout(self.rising_layout)
+
+        self.trigger_input = QCheckBox(self)
+        self.trigger_layout = InputHBoxLayout(
+            'Trigger channel:',
+            self.trigger_input,
+            tooltip='Also include trigger channel in histogram',
+            split=split
+        )
+        self.main_layout.addLayout(self.trigger_layout)
+
         # Output file name
         first_output_filename = f'{self.filename[:-4]}.cod2'
         self.output_filename = FilePath(
@@ -224,27 +292,15 @@ class LMFDialog(QDialog):
         self.convert_button = QPushButton('Convert', self)
         self.convert_button.setToolTip('Convert LMF')
         self.convert_button.clicked.connect(self._startConverting)
+        self.convert_button.setDisabled(True)
         self.main_layout.addWidget(self.convert_button)
 
-        # Process
-        self.process = QProcess(self)
-        self.process.readyRead.connect(self._processReadyRead)
-        self.process.errorOccurred.connect(self._processError)
-        self.process.finished.connect(self._processFinished)
-
         # Progress bar
         self.progress_bar = QProgressBar()
         self.progress_bar.setToolTip('Progress of conversion')
         self.progress_bar.setValue(0)
         self.main_layout.addWidget(self.progress_bar)
 
-        # Console output
-        self.console_output = QTextEdit(self)
-        self.console_output.setReadOnly(True)
-        self.console_output.setPlaceholderText('Console output')
-        self.console_output.setToolTip('Console output')
-        self.main_layout.addWidget(self.console_output)
-
         # Cancel button
         self.cancel_button = QPushButton('Cancel', self)
         self.cancel_button.setToolTip('Cancel conversion')
@@ -253,61 +309,64 @@ class LMFDialog(QDialog):
 
         self._analyzeLMF()
 
-    def _processReadyRead(self):
-        """Converting process is ready to read"""
+    def _startConverting(self):
+        """Start converting the LMF"""
 
-        process_log = self.process.readLine().data().decode(getpreferredencoding(), 'ignore').rstrip()
-        self.total_process_log.append((time(), process_log))
-        self.console_output.append(f'<i>{datetime.fromtimestamp(time()).strftime("%H:%M:%S")}</i>: {process_log}')
+        self.time_start_input.setDisabled(True)
+        self.time_stop_input.setDisabled(True)
+        self.rising_input.setDisabled(True)
+        self.trigger_input.setDisabled(True)
+        self.output_filename.setDisabled(True)
+        self.convert_button.setDisabled(True)
+
+        histogram = TOFHistogram.fromLM(
+            self.lm,
+            start_time=self.time_start_input.value(),
+            stop_time=self.time_stop_input.value(),
+            rising=self.rising_input.isChecked(),
+            trigger=self.trigger_input.isChecked()
+        )
+        self.histogram_worker = self.HistogramWorker(self.lm, histogram)
+        self.histogram_worker.signals.progress.connect(self.progress_bar.setValue)
+        self.histogram_worker.signals.finished.connect(self._convertingFinished)
+        self.histogram_worker.signals.error.connect(self._convertingError)
+        QThreadPool.globalInstance().start(self.histogram_worker)
 
-        try:
-            percentage = float(process_log.split('(')[-1].split('%)')[0])
-            percentage = min(100., percentage)
-            percentage = max(0., percentage)
-            self.progress_bar.setValue(round(percentage))
-        except (ValueError, IndexError):
-            pass
-
-    def _processError(self, error):
-        """Converting process had error"""
-
-        if isinstance(error, int):
-            errors = {
-                0: 'QProcess::FailedToStart',
-                1: 'QProcess::Crashed',
-                2: 'QProcess::Timed out',
-                3: 'QProcess::WriteError',
-                4: 'QProcess::ReadError',
-                5: 'QProcess::UnknownError'
-            }
-            error = errors.get(error)
-        self.information_label.setText(f'Error occurred while converting LMF: <i>{error}</i>.')
+    def _convertingFinished(self, completed: bool):
+        """Converting has finished or was cancelled"""
 
-    def _processFinished(self, exit_code: int, exit_status: int):
-        """Converting process has finished"""
+        if not completed:
+            return
 
-        self.progress_bar.setValue(100)
-        if exit_status == QProcess.ExitStatus.NormalExit and exit_code == 0:
-            self.finish_state = True
-            self.accept()
+        try:
+            self.histogram_worker.histogram.save(self.output_filename.path)
+        except OSError as error:
+            self._convertingError(error)
             return
-        self.information_label.setText(f'Error occurred while converting LMF:<br> Code: {exit_code}<br> Status: {exit_status}')
 
-    def _startConverting(self):
-        """Start converting the LMF"""
+        self.progress_bar.setValue(100)
+        self.finish_state = True
+        self.accept()
 
-        self.time_start_input.setDisabled(True)
-        self.time_stop_input.setDisabled(True)
-        self.output_filename.setDisabled(True)
+    def _convertingError(self, error: Exception):
+        """Converting had error"""
 
-        self.process.setProgram(f'"{self.program}" "{self.filename}" -H -v -o "{self.output_filename.path}"')
-        self.process.start()
+        self.information_label.setText(f'Error occurred while converting LMF: <i>{error}</i>.')
+
+        # a failed conversion can be started again, e.g. with another output file
+        self.time_start_input.setEnabled(True)
+        self.time_stop_input.setEnabled(True)
+        self.rising_input.setEnabled(True)
+        self.trigger_input.setEnabled(True)
+        self.output_filename.setEnabled(True)
+        self.convert_button.setEnabled(self.histogram_worker is not None)
 
     def _analyzeLMF(self):
         """Analyze the LMF"""
 
         worker = self.Worker(self.filename)
         worker.signals.result.connect(self._updateLMF)
+        worker.signals.error.connect(self._convertingError)
         threadpool = QThreadPool.globalInstance()
         threadpool.start(worker)
 
@@ -316,7 +375,20 @@ class LMFDialog(QDialog):
 
         self.lm = new_lm
         total_time = self.lm.StopTime - self.lm.StartTime
+        self.time_stop_input.setValue(total_time)
         self.information_label.setText(f'File is <strong>{total_time:.3f}</strong> seconds long.<br>Bin size is <strong>{self.lm.TDC.TDCResolution * 1000:.3f} ps</strong>.')
+        self.convert_button.setEnabled(True)
+
+    def done(self, result: int):
+        """
+        Cancels running conversion when dialog is closed
+
+        :param result: result code of dialog
+        """
+
+        if self.histogram_worker is not None:
+            self.histogram_worker.cancel()
+        super().done(result)
 
 
 class IPDialog(QDialog):
@@ -10,6 +10,63 @@ class CyclicList(list):
         return super().__getitem__(index % len(self))
 
 
+class RingBuffer:
+    """
+    Buffer of rows that are appended at the end and removed at the beginning without moving all rows every time.
+    The first column is expected to be sorted (e.g. time).
+
+    :param columns: number of columns
+    :param capacity: initial number of rows (will grow if needed)
+    """
+
+    def __init__(self, columns: int, capacity: int = 1024):
+        self.buffer = np.empty((2 * max(1, capacity), columns))
+        self.start = 0
+        self.end = 0
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def data(self) -> np.ndarray:
+        """Returns contiguous view of all rows"""
+        return self.buffer[self.start:self.end]
+
+    def append(self, rows: np.ndarray):
+        """
+        Appends rows at the end
+
+        :param rows: 2D array of rows
+        """
+
+        if self.end + len(rows) > len(self.buffer):
+            data = self.data()
+            if 2 * (len(data) + len(rows)) > len(self.buffer):
+                self.buffer = np.empty((2 * (len(data) + len(rows)), self.buffer.shape[1]))
+            self.buffer[:len(data)] = data
+            self.start, self.end = 0, len(data)
+
+        self.buffer[self.end:self.end + len(rows)] = rows
+        self.end += len(rows)
+
+    def trimBefore(self, x: float):
+        """
+        Removes rows at the beginning whose first value is smaller than x
+
+        :param x: smallest first value to keep
+        """
+
+        self.start += int(np.searchsorted(self.data()[:, 0], x, side='left'))
+
+    def trimFrom(self, x: float):
+        """
+        Removes rows at the end whose first value is larger than or equal to x
+
+        :param x: first value that is not kept anymore
+        """
+
+        self.end = self.start + int(np.searchsorted(self.data()[:, 0], x, side='left'))
+
+
 def getPrefix(number: float | int, use_latex: bool = False) -> tuple[float | int, str]:
     """
     Gets the prefix of a number and returns the converted number and the prefix
@@ -63,29 +120,162 @@ def getIntIfInt(number: float) -> float | int:
     return number
 
 
-def mergeArraysFirstColumn(arrays: list[np.ndarray], missing_value: float = np.nan):
+def mergeArraysFirstColumn(
+    arrays: list[np.ndarray],
+    missing_value: float = np.nan,
+    tolerance: float = 0,
+    forward_fill: bool = False
+) -> np.ndarray:
     """
-    Merge numpy arrays in one, where first column will be the same (only integer steps)
+    Merge numpy arrays in one, where first column will be the same.
+    Only the union of occurring values of the first columns is used, so memory is proportional to the data.
+    Rows with the same first value in one array are not overwritten, but are placed in consecutive rows.
 
     :param arrays: list of numpy arrays to merge
     :param missing_value: default replacement for missing values
+    :param tolerance: first values that are at most this far from the previous first value are merged into the first of them
+    :param forward_fill: replace missing values with the last available value of the same column
     """
 
-    min_x = int(min(arr[:, 0].min() for arr in arrays))
-    max_x = int(max(arr[:, 0].max() for arr in arrays))
-    x_range = np.arange(min_x, max_x + 1)
+    total_columns = sum(arr.shape[1] - 1 for arr in arrays) + 1
+    xs = [arr[:, 0] for arr in arrays if len(arr)]
+    if not xs:
+        return np.full((0, total_columns), missing_value)
+
+    # representative first values: start of every group of values closer than tolerance
+    x_unique = np.unique(np.concatenate(xs))
+    x_merged = x_unique[np.concatenate(([True], np.diff(x_unique) > tolerance))]
+
+    # index of merged value and rank of duplicates for every row of every array
+    indices = []
+    rows_per_x = np.zeros(len(x_merged), dtype=np.int64)
+    for array in arrays:
+        order = np.argsort(array[:, 0], kind='stable')
+        index = np.searchsorted(x_merged, array[order, 0], side='right') - 1
+        rank = np.arange(len(index)) - np.searchsorted(index, index, side='left')
+        indices.append((order, index, rank))
+        rows_per_x = np.maximum(rows_per_x, np.bincount(index, minlength=len(x_merged)))
 
-    result = np.full((len(x_range), sum(arr.shape[1] - 1 for arr in arrays) + 1), missing_value)
-    result[:, 0] = x_range
+    row_offsets = np.cumsum(rows_per_x) - rows_per_x
+
+    result = np.full((int(rows_per_x.sum()), total_columns), missing_value)
+    result[:, 0] = np.repeat(x_merged, rows_per_x)
+
+    offset = 1
+    for array, (order, index, rank) in zip(arrays, indices):
+        columns = slice(offset, offset + array.shape[1] - 1)
+        rows = row_offsets[index] + rank
+        result[rows, columns] = array[order, 1:]
+
+        if forward_fill and len(rows):
+            last_rows = np.full(len(result), -1)
+            last_rows[rows] = rows
+            last_rows = np.maximum.accumulate(last_rows)
+            filled = last_rows >= 0
+            result[filled, columns] = result[last_rows[filled], columns]
+
+        offset += array.shape[1] - 1
+
+    return result
+
+
+def resampleArraysFirstColumn(
+    arrays: list[np.ndarray],
+    step: float,
+    start: float | None = None,
+    end: float | None = None,
+    max_age: float = np.inf,
+    missing_value: float = np.nan
+) -> np.ndarray:
+    """
+    Resample numpy arrays onto one regular grid of first values (e.g. times), which does not need to be integer.
+    For every grid value the last row of each array whose first value is not larger is used (sample and hold), so arrays of different rates can be compared.
+
+    :param arrays: list of numpy arrays to resample, their first column has to be sorted
+    :param step: distance of grid values
+    :param start: first grid value (default: smallest first value of arrays)
+    :param end: last possible grid value (default: largest first value of arrays)
+    :param max_age: rows whose first value is more than this before the grid value are missing
+    :param missing_value: default replacement for missing values
+    """
+
+    if step <= 0:
+        raise ValueError(f'Step ({step}) has to be positive')
+
+    total_columns = sum(arr.shape[1] - 1 for arr in arrays) + 1
+    xs = [arr[:, 0] for arr in arrays if len(arr)]
+    if start is None:
+        start = min([x[0] for x in xs], default=0)
+    if end is None:
+        end = max([x[-1] for x in xs], default=start - step)
+
+    # grid from multiples of the step, so rounding errors do not add up
+    grid = start + step * np.arange(max(0, int(np.floor((end - start) / step + 1E-9)) + 1))
+
+    result = np.full((len(grid), total_columns), missing_value)
+    result[:, 0] = grid
 
     offset = 1
     for array in arrays:
-        result[(array[:, 0] - min_x).astype(int), offset:offset + array.shape[1] - 1] = array[:, 1:]
+        columns = slice(offset, offset + array.shape[1] - 1)
+        if len(array):
+            index = np.searchsorted(array[:, 0], grid, side='right') - 1
+            valid = index >= 0
+            valid[valid] = grid[valid] - array[index[valid], 0] <= max_age
+            result[valid, columns] = array[index[valid], 1:]
         offset += array.shape[1] - 1
 
     return result
 
 
+def holdCurve(x: np.ndarray, y: np.ndarray, max_age: float = np.inf, end: float | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns x and y values of a step curve, where every value is held until the next x value (e.g. values that are only stored if they change).
+    Values are held for at most max_age, then the curve is interrupted by NaN until the next value.
+
+    :param x: sorted x values
+    :param y: y values
+    :param max_age: maximum time a value is held
+    :param end: x value until which the last value is held (at most max_age)
+    """
+
+    if not len(x):
+        return x, y
+
+    x_next = np.append(x[1:], x[-1] if end is None else max(end, x[-1]))
+    x_held = np.minimum(x_next, x + max_age)
+    y_gap = np.where(x_next - x > max_age, np.nan, y)
+
+    x_curve = np.column_stack((x, x_held, x_held)).ravel()
+    y_curve = np.column_stack((y, y, y_gap)).ravel()
+    return x_curve, y_curve
+
+
+def downsampleMinMax(x: np.ndarray, y: np.ndarray, points: int, start: float | None = None, end: float | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns x and y values reduced to the minimum and maximum of y in at most points buckets of equal width of x (e.g. one per pixel of a plot),
+    so short peaks stay visible. The x value of both is the first x value in the bucket. Values are returned unchanged if there are not more than 2 * points.
+
+    :param x: sorted x values
+    :param y: y values
+    :param points: number of buckets
+    :param start: x value of the start of the first bucket (default: first x value)
+    :param end: x value of the end of the last bucket (default: last x value)
+    """
+
+    if len(x) <= 2 * points:
+        return x, y
+
+    start = x[0] if start is None else start
+    end = x[-1] if end is None else end
+    index = np.clip(((x - start) * (points / max(end - start, 1E-12))).astype(np.int64), 0, points - 1)
+    starts = np.flatnonzero(np.diff(index, prepend=-1))
+
+    x_downsampled = np.repeat(x[starts], 2)
+    y_downsampled = np.column_stack((np.fmin.reduceat(y, starts), np.fmax.reduceat(y, starts))).ravel()
+    return x_downsampled, y_downsampled
+
+
 def assertionTests():
     def getPrefixTest():
         assert getPrefix(1E-24) == (1, 'y')
@@ -132,9 +322,66 @@ def assertionTests():
         assert getIntIfInt(1.1) == 1.1
         assert getIntIfInt(111.1) == 111.1
 
+    def ringBufferTest():
+        ring_buffer = RingBuffer(2, capacity=2)
+        for i in range(10):
+            ring_buffer.append(np.array([[i, 10 * i]]))
+            ring_buffer.trimBefore(i - 2)
+        assert ring_buffer.data().tolist() == [[7, 70], [8, 80], [9, 90]]
+        ring_buffer.append(np.array([[10, 100], [11, 110], [12, 120], [13, 130]]))
+        ring_buffer.trimFrom(12)
+        assert ring_buffer.data()[:, 0].tolist() == [7, 8, 9, 10, 11]
+        assert len(ring_buffer) == 5
+
+    def mergeArraysFirstColumnTest():
+        a = np.array([[1, 10], [3, 30], [3, 31]])
+        b = np.array([[2, 20, 200], [3, 32, 320], [1000000, 40, 400]])
+        merged = mergeArraysFirstColumn([a, b], missing_value=-1)
+        assert merged.tolist() == [[1, 10, -1, -1], [2, -1, 20, 200], [3, 30, 32, 320], [3, 31, -1, -1], [1000000, -1, 40, 400]]
+
+        merged = mergeArraysFirstColumn([a, b], forward_fill=True)
+        assert np.array_equal(merged, [[1, 10, np.nan, np.nan], [2, 10, 20, 200], [3, 30, 32, 320], [3, 31, 32, 320], [1000000, 31, 40, 400]], equal_nan=True)
+
+        merged = mergeArraysFirstColumn([np.array([[1.0, 1], [2.1, 2]]), np.array([[1.2, 3], [2.0, 4]])], tolerance=0.5)
+        assert merged.tolist() == [[1.0, 1, 3], [2.0, 2, 4]]
+
+        assert mergeArraysFirstColumn([np.empty((0, 2)), np.empty((0, 3))]).shape == (0, 4)
+
+    def resampleArraysFirstColumnTest():
+        slow = np.array([[0.0, 1], [1.0, 2], [2.0, 3]])
+        fast = np.array([[0.001, 10], [0.101, 11], [0.201, 12], [1.501, 13]])
+        resampled = resampleArraysFirstColumn([slow, fast], 0.5, 0, 2, max_age=0.5)
+        assert np.allclose(resampled[:, 0], [0, 0.5, 1, 1.5, 2])
+        assert np.array_equal(resampled[:, 1:], [[1, np.nan], [1, 12], [2, np.nan], [2, np.nan], [3, 13]], equal_nan=True)
+
+        assert len(resampleArraysFirstColumn([fast], 0.1)) == 16
+        assert resampleArraysFirstColumn([np.empty((0, 2))], 0.1).shape == (0, 2)
+
+    def holdCurveTest():
+        x, y = holdCurve(np.array([0, 2, 10]), np.array([1.0, 2.0, 3.0]), max_age=5, end=12)
+        assert x.tolist() == [0, 2, 2, 2, 7, 7, 10, 12, 12]
+        assert np.array_equal(y, [1, 1, 1, 2, 2, np.nan, 3, 3, 3], equal_nan=True)
+
+        x, y = holdCurve(np.array([0.0, 1.0]), np.array([1.0, 2.0]))
+        assert x.tolist() == [0, 1, 1, 1, 1, 1] and y.tolist() == [1, 1, 1, 2, 2, 2]
+        assert len(holdCurve(np.empty(0), np.empty(0))[0]) == 0
+
+    def downsampleMinMaxTest():
+        x = np.arange(10.0)
+        y = np.array([0, 5, 1, 1, 7, 2, 3, 3, 3, -1.0])
+        x_downsampled, y_downsampled = downsampleMinMax(x, y, 2, 0, 10)
+        assert x_downsampled.tolist() == [0, 0, 5, 5]
+        assert y_downsampled.tolist() == [0, 7, -1, 3]
+        assert downsampleMinMax(x, y, 5)[0] is x
+
     getPrefixTest()
     getSignificantDigitsTest()
     getIntIfIntTest()
+    ringBufferTest()
+    mergeArraysFirstColumnTest()
+    resampleArraysFirstColumnTest()
+    holdCurveTest()
+    downsampleMinMaxTest()
 
 
 if __name__ == '__main__':
@@ -3113,6 +3113,18 @@ class Canvas(pg.PlotWidget):
         self.data.append((x, y))
         self.graph_curves.append(self.plotItem.plot(x, y, **plot_params))
 
+    def setData(self, index: int, x: np.ndarray, y: np.ndarray):
+        """
+        Replaces data of already plotted curve
+
+        :param index: index of curve
+        :param x: numpy array of x values
+        :param y: numpy array of y values
+        """
+
+        self.data[index] = (x, y)
+        self.graph_curves[index].setData(x, y)
+
     def clean(self):
         """Clears whole plot"""
 
@@ -16,7 +16,7 @@ from Utility.Dialogs import showMessageBox
 
 from Connection.USBPorts import getComports
 from Connection.ISEG import ISEGConnection
-from Connection.Threaded import ThreadedISEGConnection, ThreadedDummyConnection
+from Connection.Threaded import ThreadedISEGConnection, ThreadedDummyConnection, ConnectionWorker
 
 
 class EBISVBoxLayout(QVBoxLayout):
@@ -478,12 +478,18 @@ class EBISVBoxLayout(QVBoxLayout):
         if last_connection:
             self.connect(last_connection, False)
 
-    def updateLoop(self):
-        """Called by timer; Updates actual voltages"""
+    def updateLoop(self, poll: bool = True):
+        """
+        Called by timer; Updates actual voltages
+
+        :param poll: reads are repeated by the timer and dropped if not started in time, see <ThreadedConnection.polling()> (False for one-shot reads)
+        """
 
         if not self.checkConnection(False):
             return
 
+        reads = self.threaded_connection.polling() if poll else self.threaded_connection
+
         def checkHighVoltageOn(state: int):
             if not isinstance(state, int) or state == -1:
                 GlobalConf.logger.error(f'State must be int and not -1, got <{type(state)}> with value {state}')
@@ -494,7 +500,7 @@ class EBISVBoxLayout(QVBoxLayout):
             self.status_high_voltage.setText('Enabled' if state else 'Disabled')
             self.button_high_voltage.setText('Disable' if state else 'Enable')
 
-        self.threaded_connection.callback(checkHighVoltageOn, self.threaded_connection.configureMiccGet())
+        self.threaded_connection.callback(checkHighVoltageOn, reads.configureMiccGet())
 
         def checkVoltageOn(states: list[float]):
             if len(states) != len(self.indicators_voltage) != len(self.buttons_enable) != len(self.status_voltages):
@@ -509,7 +515,7 @@ class EBISVBoxLayout(QVBoxLayout):
                 if not state:
                     status_voltage.setTargetValue(0)
 
-        self.threaded_connection.callback(checkVoltageOn, self.threaded_connection.readVoltageOn(self.all_channels_selector))
+        self.threaded_connection.callback(checkVoltageOn, reads.readVoltageOn(self.all_channels_selector))
 
         def measureVoltage(voltages: list[float]):
             if len(voltages) != len(self.status_voltages):
@@ -519,7 +525,7 @@ class EBISVBoxLayout(QVBoxLayout):
             for status_voltage, voltage in zip(self.status_voltages, voltages):
                 status_voltage.setValue(voltage)
 
-        self.threaded_connection.callback(measureVoltage, self.threaded_connection.measureVoltage(self.all_channels_selector))
+        self.threaded_connection.callback(measureVoltage, reads.measureVoltage(self.all_channels_selector))
 
         def measureCurrent(currents: list[float]):
             if len(currents) != len(self.status_currents):
@@ -535,7 +541,7 @@ class EBISVBoxLayout(QVBoxLayout):
                 if indicator_limit is not None and spinbox_limit_current is not None:
                     indicator_limit.setValue(current >= spinbox_limit_current.value() / 1000)
 
-        self.threaded_connection.callback(measureCurrent, self.threaded_connection.measureCurrent(self.all_channels_selector))
+        self.threaded_connection.callback(measureCurrent, reads.measureCurrent(self.all_channels_selector))
 
     def updateAllValues(self):
         """Updates all values"""
@@ -543,7 +549,7 @@ class EBISVBoxLayout(QVBoxLayout):
         if not self.checkConnection(False):
             return
 
-        self.updateLoop()
+        self.updateLoop(poll=False)
 
         def readVoltage(voltages: list[float]):
             if len(voltages) != len(self.spinbox_voltages) != len(self.status_voltages):
@@ -594,12 +600,13 @@ class EBISVBoxLayout(QVBoxLayout):
         phys_channel = self.channel_dict[channel]
         self.threaded_connection.voltageSet(phys_channel, voltage)
 
-    def setCurrent(self, channel: int, current: float):
+    def setCurrent(self, channel: int, current: float, interlock: bool = False):
         """
         Sets current to specified channel
 
         :param channel: channel to be set
         :param current: current to be set
+        :param interlock: safety action, which is sent before all other queued calls
         """
 
         if not self.checkConnection():
@@ -607,7 +614,10 @@ class EBISVBoxLayout(QVBoxLayout):
 
         self.status_currents[channel].setTargetValue(current)
         phys_channel = self.channel_dict[channel]
-        self.threaded_connection.currentSet(phys_channel, current)
+        if interlock:
+            self.threaded_connection.withPriority(ConnectionWorker.Priority.Interlock).currentSet(phys_channel, current)
+        else:
+            self.threaded_connection.currentSet(phys_channel, current)
 
     def setCurrentLimit(self, channel: int, current: float):
         """
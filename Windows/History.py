@@ -1,24 +1,107 @@
 import numpy as np
 from datetime import datetime, timedelta
+from os import remove as os_remove
 
 
 from PyQt6.QtWidgets import (
     QSplitter, QWidget, QBoxLayout, QHBoxLayout, QVBoxLayout, QPushButton, QGroupBox, QListWidget, QListWidgetItem, QApplication,
-    QLabel, QMessageBox
+    QLabel, QMessageBox, QProgressBar, QTableWidget, QTableWidgetItem, QAbstractItemView
 )
-from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtCore import Qt, QTimer, QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
 
 
 from Config.GlobalConf import DefaultParams
 
 from DB.db import DB
 
-from Utility.Functions import mergeArraysFirstColumn
+from Utility.Functions import RingBuffer, holdCurve, downsampleMinMax
 from Utility.FileDialogs import selectFileDialog
 from Utility.Dialogs import showMessageBox
 from Utility.Layouts import TabWidget, TimeCanvas, IndicatorLedButton, DateTimeEdit, FilePath
 
 
+class ExportWorker(QRunnable):
+    """
+    Threaded worker for exporting data chunk by chunk, so the whole selection never has to be in memory
+
+    :param database: database class (should be threaded, since it is accessed from another thread)
+    :param selection: dictionary of table index and ids of columns (without the time column)
+    :param start_time: start time as timestamp
+    :param end_time: end time as timestamp
+    :param file_path: path of output file, '.parquet' files are exported directly by the database
+    """
+
+    class WorkerSignals(QObject):
+        """
+        Signals for worker
+
+        progress: progress in percent
+        finished: if export was completed (False if cancelled)
+        error: any occurring error
+        """
+
+        progress = pyqtSignal(int)
+        finished = pyqtSignal(bool)
+        error = pyqtSignal(Exception)
+
+    def __init__(self, database: DB, selection: dict[int, tuple[int]], start_time: int, end_time: int, file_path: str):
+        super().__init__()
+        self.database = database
+        self.selection = selection
+        self.start_time = start_time
+        self.end_time = end_time
+        self.file_path = file_path
+        self.signals = self.WorkerSignals()
+        self.cancelled = False
+
+    def cancel(self):
+        """Cancels export after the current chunk"""
+        self.cancelled = True
+
+    @pyqtSlot()
+    def run(self):
+        """Called when worker is started"""
+
+        try:
+            if self.file_path.lower().endswith('.parquet'):
+                self.database.exportJoined(self.selection, self.start_time, self.end_time, self.file_path)
+                self.signals.progress.emit(100)
+                self.signals.finished.emit(True)
+                return
+
+            completed = self._exportCSV()
+            if not completed:
+                os_remove(self.file_path)
+            self.signals.finished.emit(completed)
+
+        except Exception as error:
+            self.signals.error.emit(error)
+
+    def _exportCSV(self) -> bool:
+        """Exports chunks joined on their time by the database to CSV file, returns False if cancelled"""
+
+        labels = ['Time']
+        for table_idx, checked in self.selection.items():
+            labels.extend(self.database.tables[table_idx].column_names()[column_id] for column_id in checked)
+
+        chunk_time = DefaultParams.history_export_chunk_time
+        with open(self.file_path, 'w', encoding='utf-8') as file:
+            file.write(f'# {",".join(labels)}\n')
+
+            for chunk_start in range(self.start_time, self.end_time + 1, chunk_time):
+                if self.cancelled:
+                    return False
+
+                chunk_end = min(chunk_start + chunk_time - 1, self.end_time)
+                data = self.database.getJoined(self.selection, chunk_start, chunk_end, hold=True)
+                if data is not False:
+                    np.savetxt(file, data[1], delimiter=',')
+
+                self.signals.progress.emit(round(100 * (chunk_end - self.start_time + 1) / (self.end_time - self.start_time + 1)))
+
+        return True
+
+
 class HistoryWindow(TabWidget):
     """
     Widget for displaying parameter histories
@@ -30,6 +113,12 @@ class HistoryWindow(TabWidget):
         super().__init__(parent)
 
         self.database = database
+        self.export_worker: ExportWorker | None = None
+
+        # state of auto update, where only new rows are queried and appended to the plotted curves
+        self.live_selection: dict[int, tuple[int]] = {}
+        self.live_buffers: dict[int, RingBuffer] = {}
+        self.live_curves: dict[int, list[int]] = {}
 
         self.main_layout = QBoxLayout(QBoxLayout.Direction.TopToBottom)
         self.setLayout(self.main_layout)
@@ -90,7 +179,7 @@ class HistoryWindow(TabWidget):
 
         # Auto update button
         self.auto_update_button = IndicatorLedButton('Auto update')
-        self.auto_update_button.setToolTip('Will show last 10 minutes')
+        self.auto_update_button.setToolTip(f'Will show last {DefaultParams.history_live_time // 60} minutes')
         self.auto_update_button.clicked.connect(self.autoUpdate)
         self.export_title_hbox.addWidget(self.auto_update_button, alignment=Qt.AlignmentFlag.AlignLeft)
 
@@ -121,6 +210,14 @@ class HistoryWindow(TabWidget):
 
         self.export_title_hbox.addStretch()
 
+        # Statistics button
+        self.button_statistics = IndicatorLedButton('Statistics')
+        self.button_statistics.setToolTip(
+            f'Show statistics of the selected timeframe (percentiles only for timeframes up to {DefaultParams.history_statistics_percentile_time // 3600} hours)'
+        )
+        self.button_statistics.clicked.connect(self.showStatistics)
+        self.export_title_hbox.addWidget(self.button_statistics, alignment=Qt.AlignmentFlag.AlignRight)
+
         # Y-log button
         self.button_log_y_preview = IndicatorLedButton('Log-y')
         self.button_log_y_preview.clicked.connect(self.logYAxis)
@@ -130,6 +227,13 @@ class HistoryWindow(TabWidget):
         self.time_canvas = TimeCanvas([], grid=True)
         self.preview_export_vbox.addWidget(self.time_canvas)
 
+        # Statistics table
+        self.statistics_table = QTableWidget()
+        self.statistics_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.statistics_table.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self.statistics_table.setHidden(True)
+        self.preview_export_vbox.addWidget(self.statistics_table)
+
         self.export_hbox = QHBoxLayout()
         self.export_hbox.setAlignment(Qt.AlignmentFlag.AlignLeft)
         self.preview_export_vbox.addLayout(self.export_hbox)
@@ -143,7 +247,7 @@ class HistoryWindow(TabWidget):
                 self,
                 for_saving=True,
                 instruction='Select output file for export',
-                file_filter='*.csv'
+                file_filter='*.csv *.parquet'
             )
         )
         self.export_hbox.addWidget(self.file_path, alignment=Qt.AlignmentFlag.AlignLeft)
@@ -154,6 +258,12 @@ class HistoryWindow(TabWidget):
         self.export_button.clicked.connect(self.exportData)
         self.export_hbox.addWidget(self.export_button, alignment=Qt.AlignmentFlag.AlignLeft)
 
+        # Exporting progress
+        self.export_progress_bar = QProgressBar()
+        self.export_progress_bar.setToolTip('Progress of export')
+        self.export_progress_bar.setHidden(True)
+        self.export_hbox.addWidget(self.export_progress_bar, alignment=Qt.AlignmentFlag.AlignLeft)
+
         self.export_hbox.addStretch()
 
         self.splitter.addWidget(self.preview_export_widget)
@@ -173,8 +283,8 @@ class HistoryWindow(TabWidget):
         for row in range(self.selection_listwidgets[listwidget_index].count()):
             self.selection_listwidgets[listwidget_index].item(row).setCheckState(state)
 
-    def getData(self) -> tuple[np.ndarray, list[str]]:
-        """Gets checked data"""
+    def getTimeRange(self) -> tuple[int, int] | None:
+        """Gets selected start and end time as timestamps or None if they are invalid"""
 
         start_time = int(self.start_datetime_widget.getTime().timestamp())
         end_time = int(self.end_datetime_widget.getTime().timestamp())
@@ -186,59 +296,151 @@ class HistoryWindow(TabWidget):
                 'End time before start time!',
                 f'The selected end time ({datetime.fromtimestamp(end_time)}) is before the selected start time ({datetime.fromtimestamp(start_time)})'
             )
-            return np.array([]), []
+            return None
 
-        datas = []
-        labels = []
+        return start_time, end_time
 
-        for i, table in enumerate(self.database.tables):
-            checked = [0]
-            table_labels = []
-            for row, attribute in enumerate(list(table.structure.keys())[1:]):
-                if self.selection_listwidgets[i].item(row).checkState() == Qt.CheckState.Checked:
-                    table_labels.append(f'{table.name}_{attribute}')
-                    checked.append(row + 1)
-            if not checked:
-                continue
-            data = self.database.getData(self.database.tables.index(table), tuple(checked), start_time, end_time)
-
-            if data is False:
-                continue
-            column_names, column_values = data
-
-            labels.extend(column_names[1:])
-            datas.append(column_values)
+    def getCheckedColumns(self, table_idx: int) -> tuple[int]:
+        """
+        Gets ids of checked columns (without the time column)
 
-        if not labels:
-            return np.array([]), []
-        labels.insert(0, 'Time')
+        :param table_idx: index of table
+        """
 
-        return mergeArraysFirstColumn(datas), labels
+        checked = []
+        for row in range(self.selection_listwidgets[table_idx].count()):
+            if self.selection_listwidgets[table_idx].item(row).checkState() == Qt.CheckState.Checked:
+                checked.append(row + 1)
+        return tuple(checked)
 
     def updatePreview(self):
         """Updates the preview with given data"""
 
         if self.auto_update_button.value():
-            self.start_datetime_widget.setTime(datetime.now() - timedelta(minutes=10))
-            self.end_datetime_widget.setTime(datetime.now())
+            self.updateLivePreview()
+            return
+
+        time_range = self.getTimeRange()
+        if time_range is None:
+            return
+        start_time, end_time = time_range
 
         QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
 
         self.time_canvas.clean()
-        data, labels = self.getData()
 
-        if len(labels) < 2:
+        # every bucket is drawn as its minimum and maximum, so short peaks stay visible
+        min_time, max_time = np.inf, -np.inf
+        for i, table in enumerate(self.database.tables):
+            checked = self.getCheckedColumns(i)
+            if not checked:
+                continue
+            data = self.database.getDataDownsampled(i, checked, start_time, end_time, DefaultParams.history_preview_points)
+
+            if data is False:
+                continue
+            column_names, column_values = data
+
+            x = np.repeat(column_values[:, 0], 2)
+            ys = [column_values[:, 1 + 3 * j:3 + 3 * j].ravel() for j in range(len(checked))]
+
+            # values of tables with deadband are only stored if they change, so they are held until the next stored value
+            hold_time = self.database.holdTime(i)
+            if hold_time is not None:
+                # the last row of a bucket can be up to one bucket width after its start
+                bucket_width = np.min(np.diff(column_values[:, 0])) if len(column_values) > 1 else 0
+                before = self.database.getDataColumns(i, (0, ) + checked, start_time - hold_time, start_time - 1)
+                if before is not False and column_values[0, 0] > start_time:
+                    x = np.append(start_time, x)
+                    ys = [np.append(before[1][j + 1][-1], y) for j, y in enumerate(ys)]
+                held = [holdCurve(x, y, hold_time + bucket_width, end_time) for y in ys]
+                x = held[0][0]
+                ys = [y for _, y in held]
+
+            for j, y in enumerate(ys):
+                self.time_canvas.plot(x, y, label=column_names[1 + 3 * j][:-len('_min')])
+
+            min_time = min(min_time, x[0])
+            max_time = max(max_time, x[-1])
+
+        if min_time > max_time:
             self.writeStatusBar('No data selected or no datapoints available')
         else:
-            for i in range(1, len(labels)):
-                self.time_canvas.plot(data[:, 0], data[:, i], label=labels[i])
+            self.time_canvas.setXRange(min_time, max_time)
 
-            self.time_canvas.setXRange(np.min(data[:, 0]), np.max(data[:, 0]))
+        if self.button_statistics.value():
+            self.updateStatistics(start_time, end_time)
 
         QApplication.restoreOverrideCursor()
 
+    def updateLivePreview(self):
+        """Updates the preview of the last minutes by only querying rows newer than the last update"""
+
+        end_time = datetime.now()
+        start_time = end_time - timedelta(seconds=DefaultParams.history_live_time)
+        self.start_datetime_widget.setTime(start_time)
+        self.end_datetime_widget.setTime(end_time)
+        start_time = int(start_time.timestamp())
+
+        selection = {}
+        for i in range(len(self.database.tables)):
+            checked = self.getCheckedColumns(i)
+            if checked:
+                selection[i] = checked
+
+        # recreate curves if selection changed
+        if selection != self.live_selection:
+            self.time_canvas.clean()
+            self.live_selection = selection
+            self.live_buffers = {}
+            self.live_curves = {}
+            for table_idx, checked in selection.items():
+                self.live_buffers[table_idx] = RingBuffer(len(checked) + 1, capacity=DefaultParams.history_live_time)
+                self.live_curves[table_idx] = []
+                for column_id in checked:
+                    self.live_curves[table_idx].append(len(self.time_canvas.graph_curves))
+                    self.time_canvas.plot(np.empty(0), np.empty(0), label=self.database.tables[table_idx].column_names()[column_id])
+
+        if not selection:
+            self.writeStatusBar('No data selected or no datapoints available')
+            return
+
+        for table_idx, checked in selection.items():
+            # values of tables with deadband are held, so rows up to the hold time before the start are needed
+            hold_time = self.database.holdTime(table_idx)
+            table_start_time = start_time if hold_time is None else start_time - hold_time
+
+            buffer = self.live_buffers[table_idx]
+            buffer.trimBefore(table_start_time)
+
+            # rows of the last second might not have been complete, so they are queried again
+            query_start_time = table_start_time
+            if len(buffer):
+                query_start_time = int(buffer.data()[-1, 0])
+                buffer.trimFrom(query_start_time)
+
+            data = self.database.getDataColumns(table_idx, (0, ) + checked, query_start_time, None)
+            if data is not False:
+                buffer.append(np.column_stack(data[1]))
+
+            # curves are reduced to the minimum and maximum per pixel, so fast tables do not plot all buffered rows every update
+            values = buffer.data()
+            for j, curve_index in enumerate(self.live_curves[table_idx]):
+                x, y = values[:, 0], values[:, j + 1]
+                if hold_time is not None:
+                    x, y = holdCurve(x, y, hold_time, end_time.timestamp())
+                x, y = downsampleMinMax(x, y, max(1, self.time_canvas.width()), start_time, end_time.timestamp())
+                self.time_canvas.setData(curve_index, x, y)
+
+        self.time_canvas.setXRange(start_time, int(end_time.timestamp()))
+
     def exportData(self):
-        """Exports the data"""
+        """Exports the data in a worker thread or cancels a running export"""
+
+        if self.export_worker is not None:
+            self.export_worker.cancel()
+            self.writeStatusBar('Cancelling export...')
+            return
 
         if not self.file_path.path:
             showMessageBox(
@@ -250,27 +452,68 @@ class HistoryWindow(TabWidget):
             self.writeStatusBar('Exporting aborted')
             return
 
-        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        time_range = self.getTimeRange()
+        if time_range is None:
+            return
+        start_time, end_time = time_range
 
-        data, labels = self.getData()
+        selection = {}
+        for i in range(len(self.database.tables)):
+            checked = self.getCheckedColumns(i)
+            if checked:
+                selection[i] = checked
 
-        if len(labels) < 2:
+        if not selection:
             self.writeStatusBar('No data selected')
-        else:
-            try:
-                np.savetxt(self.file_path.path, data, delimiter=',', header=','.join(labels), encoding='utf-8')
-                self.writeStatusBar('Exported successfully')
-            except FileNotFoundError as error:
-                showMessageBox(
-                    None,
-                    QMessageBox.Icon.Warning,
-                    'File path not found!',
-                    f'The given file path "{self.file_path.path}" can not be opened',
-                    str(error)
-                )
-                self.writeStatusBar('Exporting aborted')
+            return
 
-        QApplication.restoreOverrideCursor()
+        self.export_worker = ExportWorker(self.database, selection, start_time, end_time, self.file_path.path)
+        self.export_worker.signals.progress.connect(self.export_progress_bar.setValue)
+        self.export_worker.signals.finished.connect(self._exportFinished)
+        self.export_worker.signals.error.connect(self._exportError)
+
+        self.export_button.setText('Cancel')
+        self.export_button.setToolTip('Cancel running export')
+        self.export_progress_bar.setValue(0)
+        self.export_progress_bar.setHidden(False)
+        self.writeStatusBar('Exporting...')
+
+        QThreadPool.globalInstance().start(self.export_worker)
+
+    def _exportFinished(self, completed: bool):
+        """
+        Called when export worker is finished
+
+        :param completed: if export was completed
+        """
+
+        self._resetExport()
+        self.writeStatusBar('Exported successfully' if completed else 'Exporting cancelled')
+
+    def _exportError(self, error: Exception):
+        """
+        Called when export worker had an error
+
+        :param error: occurred error
+        """
+
+        self._resetExport()
+        showMessageBox(
+            None,
+            QMessageBox.Icon.Warning,
+            'Exporting failed!',
+            f'The data could not be exported to the given file path "{self.file_path.path}"',
+            str(error)
+        )
+        self.writeStatusBar('Exporting aborted')
+
+    def _resetExport(self):
+        """Resets export widgets after export worker is done"""
+
+        self.export_worker = None
+        self.export_button.setText('Export')
+        self.export_button.setToolTip('Export selected data to selected file')
+        self.export_progress_bar.setHidden(True)
 
     def autoUpdate(self):
         """Automatically updates graphs"""
@@ -281,11 +524,70 @@ class HistoryWindow(TabWidget):
         self.start_datetime_widget.setDisabled(auto_update_status)
         self.end_datetime_widget.setDisabled(auto_update_status)
 
+        self.live_selection = {}
+        self.live_buffers = {}
+        self.live_curves = {}
+
         if auto_update_status:
             self.update_timer.start()
         else:
             self.update_timer.stop()
 
+    def showStatistics(self):
+        """Shows or hides the statistics of the selected timeframe"""
+
+        self.statistics_table.setHidden(not self.button_statistics.value())
+        if not self.button_statistics.value():
+            return
+
+        time_range = self.getTimeRange()
+        if time_range is None:
+            return
+        self.updateStatistics(*time_range)
+
+    def updateStatistics(self, start_time: int, end_time: int):
+        """
+        Updates the statistics table with statistics of the checked columns, which are calculated by the database.
+        Percentiles need all rows, so they are only calculated for short timeframes.
+        Statistics of tables with deadband are time-weighted, which is marked in their labels.
+
+        :param start_time: start time as timestamp
+        :param end_time: end time as timestamp
+        """
+
+        stats = list(DefaultParams.history_statistics)
+        if end_time - start_time <= DefaultParams.history_statistics_percentile_time:
+            stats.extend(DefaultParams.history_statistics_percentiles)
+
+        labels = []
+        rows = []
+        for i, table in enumerate(self.database.tables):
+            checked = self.getCheckedColumns(i)
+            if not checked:
+                continue
+            data = self.database.getStatistics(i, checked, start_time, end_time, stats)
+            column_names = table.column_names()
+            weighted = ' (time-weighted)' if self.database.holdTime(i) is not None else ''
+            for j, column_id in enumerate(checked):
+                labels.append(f'{table.name}: {column_names[column_id]}{weighted}')
+                rows.append(None if data is False else data[1][0, 1 + j * len(stats):1 + (j + 1) * len(stats)])
+
+        self.statistics_table.clear()
+        self.statistics_table.setColumnCount(len(stats))
+        self.statistics_table.setRowCount(len(rows))
+        self.statistics_table.setHorizontalHeaderLabels(stats)
+        self.statistics_table.setVerticalHeaderLabels(labels)
+        for row, values in enumerate(rows):
+            if values is None:
+                continue
+            for column, (stat, value) in enumerate(zip(stats, values)):
+                text = '' if np.isnan(value) else (f'{int(value)}' if stat == 'count' else f'{value:.6G}')
+                self.statistics_table.setItem(row, column, QTableWidgetItem(text))
+        self.statistics_table.resizeColumnsToContents()
+
+        if not rows:
+            self.writeStatusBar('No data selected')
+
     def logYAxis(self):
         """Updates the y-axis to be logarithmic or normal"""
 
@@ -15,7 +15,7 @@ from Utility.Dialogs import IPDialog, showMessageBox
 from Utility.Functions import getPrefix, getSignificantDigits, getIntIfInt
 
 from Connection.Monaco import MonacoConnection
-from Connection.Threaded import ThreadedMonacoConnection, ThreadedDummyConnection, ThreadedConnection
+from Connection.Threaded import ThreadedMonacoConnection, ThreadedDummyConnection, ThreadedConnection, ConnectionWorker
 
 
 class LaserVBoxLayout(QVBoxLayout):
@@ -327,12 +327,18 @@ class LaserVBoxLayout(QVBoxLayout):
             self.port = last_connection[4]
             self.connect(self.ip, self.port, False)
 
-    def updateLoop(self):
-        """Called by timer; Updates actual voltages"""
+    def updateLoop(self, poll: bool = True):
+        """
+        Called by timer; Updates actual voltages
+
+        :param poll: reads are repeated by the timer and dropped if not started in time, see <ThreadedConnection.polling()> (False for one-shot reads)
+        """
 
         if not self.checkConnection(False):
             return
 
+        reads = self.device_wrapper.threaded_connection.polling() if poll else self.device_wrapper.threaded_connection
+
         def keyOn(state: int):
             if not isinstance(state, int) or state == -1:
                 GlobalConf.logger.error(f'State for Key must be <int> and not -1, got {type(state)} with value "{state}"')
@@ -344,7 +350,7 @@ class LaserVBoxLayout(QVBoxLayout):
 
         self.device_wrapper.threaded_connection.callback(
             keyOn,
-            self.device_wrapper.threaded_connection.kGet()
+            reads.kGet()
         )
 
         def shutterOn(state: int):
@@ -359,7 +365,7 @@ class LaserVBoxLayout(QVBoxLayout):
 
         self.device_wrapper.threaded_connection.callback(
             shutterOn,
-            self.device_wrapper.threaded_connection.sGet()
+            reads.sGet()
         )
 
         def pulsingOn(state: int):
@@ -374,7 +380,7 @@ class LaserVBoxLayout(QVBoxLayout):
 
         self.device_wrapper.threaded_connection.callback(
             pulsingOn,
-            self.device_wrapper.threaded_connection.pcGet()
+            reads.pcGet()
         )
 
         def systemStatus(l_info: tuple[str, bool, int]):
@@ -390,7 +396,7 @@ class LaserVBoxLayout(QVBoxLayout):
 
         self.device_wrapper.threaded_connection.callback(
             systemStatus,
-            self.device_wrapper.threaded_connection.lGetInfo()
+            reads.lGetInfo()
         )
 
         def chillerTemperature(temperature: float):
@@ -403,7 +409,7 @@ class LaserVBoxLayout(QVBoxLayout):
 
         self.device_wrapper.threaded_connection.callback(
             chillerTemperature,
-            self.device_wrapper.threaded_connection.chtGet()
+            reads.chtGet()
         )
 
         def chillerSetPoint(temperature: float):
@@ -415,7 +421,7 @@ class LaserVBoxLayout(QVBoxLayout):
 
         self.device_wrapper.threaded_connection.callback(
             chillerSetPoint,
-            self.device_wrapper.threaded_connection.chstGet()
+            reads.chstGet()
         )
 
         def baseplateTemperature(temperature: float):
@@ -427,7 +433,7 @@ class LaserVBoxLayout(QVBoxLayout):
 
         self.device_wrapper.threaded_connection.callback(
             baseplateTemperature,
-            self.device_wrapper.threaded_connection.btGet()
+            reads.btGet()
         )
 
         def chillerFlow(flow: float):
@@ -441,7 +447,7 @@ class LaserVBoxLayout(QVBoxLayout):
 
         self.device_wrapper.threaded_connection.callback(
             chillerFlow,
-            self.device_wrapper.threaded_connection.chfGet()
+            reads.chfGet()
         )
         
         def chillerPressure(pressure: float):
@@ -456,7 +462,7 @@ class LaserVBoxLayout(QVBoxLayout):
 
         self.device_wrapper.threaded_connection.callback(
             chillerPressure,
-            self.device_wrapper.threaded_connection.chpGet()
+            reads.chpGet()
         )
 
         def chillerService(hours: float):
@@ -469,7 +475,7 @@ class LaserVBoxLayout(QVBoxLayout):
 
         self.device_wrapper.threaded_connection.callback(
             chillerService,
-            self.device_wrapper.threaded_connection.chservicehrsremGet()
+            reads.chservicehrsremGet()
         )
 
         def faultsTable(faults: tuple[dict[int, tuple[str, str]], dict[int, tuple[str, str]]]):
@@ -500,7 +506,7 @@ class LaserVBoxLayout(QVBoxLayout):
 
         self.device_wrapper.threaded_connection.callback(
             faultsTable,
-            self.device_wrapper.threaded_connection.fwGetInfo()
+            reads.fwGetInfo()
         )
 
         def settings(params: tuple[float, int, int, int]):
@@ -525,7 +531,7 @@ class LaserVBoxLayout(QVBoxLayout):
 
         self.device_wrapper.threaded_connection.callback(
             settings,
-            self.device_wrapper.threaded_connection.setGet()
+            reads.setGet()
         )
 
         def outputFrequency(frequency: float):
@@ -537,7 +543,7 @@ class LaserVBoxLayout(QVBoxLayout):
 
         self.device_wrapper.threaded_connection.callback(
             outputFrequency,
-            self.device_wrapper.threaded_connection.crrGet()
+            reads.crrGet()
         )
 
         def rfLevel(level: float):
@@ -549,7 +555,7 @@ class LaserVBoxLayout(QVBoxLayout):
 
         self.device_wrapper.threaded_connection.callback(
             rfLevel,
-            self.device_wrapper.threaded_connection.rlGet()
+            reads.rlGet()
         )
 
     def updateAllValues(self):
@@ -688,7 +694,7 @@ class LaserVBoxLayout(QVBoxLayout):
             self.device_wrapper.threaded_connection.setGet()
         )
 
-        self.updateLoop()
+        self.updateLoop(poll=False)
 
     def setShutter(self, state: bool):
         """
@@ -715,7 +721,11 @@ class LaserVBoxLayout(QVBoxLayout):
             if result == QMessageBox.StandardButton.Cancel:
                 return
 
-        self.device_wrapper.threaded_connection.sSet(state)
+            self.device_wrapper.threaded_connection.sSet(state)
+            return
+
+        # closing the shutter is a safety action and is sent before all other queued calls
+        self.device_wrapper.threaded_connection.withPriority(ConnectionWorker.Priority.Interlock).sSet(state)
 
     def setPulsing(self, state: bool):
         """
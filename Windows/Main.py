@@ -1,10 +1,15 @@
+from time import time
+
+
 from PyQt6.QtCore import QCoreApplication, QPoint, QTimer, QSize, Qt
 from PyQt6.QtGui import QCloseEvent, QPixmap
-from PyQt6.QtWidgets import QMainWindow, QTabWidget, QApplication, QSplashScreen
+from PyQt6.QtWidgets import QMainWindow, QTabWidget, QApplication, QSplashScreen, QLabel
 
 
 from Config.GlobalConf import GlobalConf, DefaultParams
 
+from Connection.Threaded import DeviceThreadPool, ConnectionWorker
+
 from DB.db import DB
 
 from Socket.CommandServer import CommandServer
@@ -43,7 +48,7 @@ class MainWindow(QMainWindow):
 
         self.window_title = GlobalConf.title
 
-        self.database = DB()
+        self.database = DB(threaded=True)
 
         #
         # TABS FOR DIFFERENT SIMULATION PROGRAMS
@@ -101,12 +106,17 @@ class MainWindow(QMainWindow):
 
         self.statusBar()
 
+        # occupancy of thread pools, details of device workers are shown in tooltip
+        self.diagnostics_label = QLabel()
+        self.statusBar().addPermanentWidget(self.diagnostics_label)
+
         #
         # Setup logging for tabs
         #
 
         self.logging_timer = QTimer()
         self.logging_timer.timeout.connect(self.logTabs)
+        self.logging_timer.timeout.connect(self.updateDiagnostics)
         self.logging_timer.setInterval(DefaultParams.update_timer_time)
         self.logging_timer.start()
 
@@ -130,6 +140,28 @@ class MainWindow(QMainWindow):
         for index in range(self.tabs.count()):
             self.tabs.widget(index).log(self.database)
 
+    def updateDiagnostics(self):
+        """Updates occupancy of the device and global thread pools in the status bar"""
+
+        occupancy = DeviceThreadPool.globalInstance().occupancy()
+        self.diagnostics_label.setText(
+            f'Device I/O threads: {occupancy["device_active"]}/{occupancy["device_threads"]} | '
+            f'Background threads: {occupancy["global_active"]}/{occupancy["global_threads"]}'
+        )
+
+        lines = []
+        for name, start_time, runnable in occupancy['device_tasks']:
+            line = f'{name}: running for {int(time() - start_time)} s'
+            if isinstance(runnable, ConnectionWorker):
+                latencies = ', '.join(
+                    f'{priority} {statistics["median_ms"]:.1f} ms'
+                    for priority, statistics in runnable.dispatchLatency().items()
+                    if statistics['calls']
+                )
+                line += f', {runnable.queued()} queued, median dispatch latency: {latencies or "-"}'
+            lines.append(line)
+        self.diagnostics_label.setToolTip('\n'.join(lines) or 'No device workers running')
+
     def addTab(self, widget: TabWidget, title: str):
         """
         Add simulation tab
@@ -199,5 +231,9 @@ class MainWindow(QMainWindow):
         self.database.close()
         self.server.stopServer()
 
+        # connections of the tabs and the script server are stopped, so their workers finish
+        if not DeviceThreadPool.globalInstance().waitForDone(DefaultParams.connection_close_timeout):
+            GlobalConf.logger.warning(f'Device workers did not finish within {DefaultParams.connection_close_timeout} ms')
+
         splash.close()
         event.accept()
@@ -376,12 +376,18 @@ class PSUVBoxLayout(QVBoxLayout):
         if last_connection:
             self.connect(last_connection, False)
 
-    def updateLoop(self):
-        """Called by timer; Updates actual voltages"""
+    def updateLoop(self, poll: bool = True):
+        """
+        Called by timer; Updates actual voltages
+
+        :param poll: reads are repeated by the timer and dropped if not started in time, see <ThreadedConnection.polling()> (False for one-shot reads)
+        """
 
         if not self.checkConnection(False):
             return
 
+        reads = self.device_wrapper.threaded_connection.polling() if poll else self.device_wrapper.threaded_connection
+
         def checkVoltageOn(states: list[float]):
             if len(states) != len(self.indicators) != len(self.buttons) != len(self.status_voltages):
                 GlobalConf.logger.error(f'High voltage indicators cannot be set, non matching length: expected len = {len(self.indicators)}, got len = {len(states)}')
@@ -397,7 +403,7 @@ class PSUVBoxLayout(QVBoxLayout):
 
         self.device_wrapper.threaded_connection.callback(
             checkVoltageOn,
-            self.device_wrapper.threaded_connection.readVoltageOn(self.all_channels_selector)
+            reads.readVoltageOn(self.all_channels_selector)
         )
 
         def measureVoltage(voltages: list[float]):
@@ -414,7 +420,7 @@ class PSUVBoxLayout(QVBoxLayout):
 
         self.device_wrapper.threaded_connection.callback(
             measureVoltage,
-            self.device_wrapper.threaded_connection.measureVoltage(self.all_channels_selector)
+            reads.measureVoltage(self.all_channels_selector)
         )
 
         def measureCurrent(currents: list[float]):
@@ -432,7 +438,7 @@ class PSUVBoxLayout(QVBoxLayout):
 
         self.device_wrapper.threaded_connection.callback(
             measureCurrent,
-            self.device_wrapper.threaded_connection.measureCurrent(self.all_channels_selector)
+            reads.measureCurrent(self.all_channels_selector)
         )
 
         def checkPolarity(polarities: list[bool]):
@@ -445,7 +451,7 @@ class PSUVBoxLayout(QVBoxLayout):
 
         self.device_wrapper.threaded_connection.callback(
             checkPolarity,
-            self.device_wrapper.threaded_connection.configureOutputPolarityGet(self.all_channels_selector)
+            reads.configureOutputPolarityGet(self.all_channels_selector)
         )
 
     def updateAllValues(self):
@@ -454,7 +460,7 @@ class PSUVBoxLayout(QVBoxLayout):
         if not self.checkConnection(False):
             return
 
-        self.updateLoop()
+        self.updateLoop(poll=False)
 
         def readVoltage(voltages: list[float]):
             if len(voltages) != len(self.spinbox_voltages) != len(self.status_voltages):
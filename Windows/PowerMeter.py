@@ -247,11 +247,6 @@ class PowerMeterVBoxLayout(QVBoxLayout):
                 self.status_wavelength.setTargetValue(wavelength)
                 self.spinbox_wavelength.setValue(round(wavelength))
 
-        self.device_wrapper.threaded_connection.callback(
-            setWavelength,
-            self.device_wrapper.threaded_connection.getWavelength(TLPMxValues.Attribute.SetValue)
-        )
-
         # get attenuation
         def setAttenuation(attenuation: float):
             self.status_attenuation.setValue(attenuation)
@@ -259,11 +254,6 @@ class PowerMeterVBoxLayout(QVBoxLayout):
                 self.status_attenuation.setTargetValue(attenuation)
                 self.spinbox_attenuation.setValue(attenuation)
 
-        self.device_wrapper.threaded_connection.callback(
-            setAttenuation,
-            self.device_wrapper.threaded_connection.getAttenuation(TLPMxValues.Attribute.SetValue)
-        )
-
         # get averaging
         def setAveraging(averaging: int):
             self.status_averaging.setValue(averaging)
@@ -271,11 +261,6 @@ class PowerMeterVBoxLayout(QVBoxLayout):
                 self.status_averaging.setTargetValue(averaging)
                 self.spinbox_averaging.setValue(averaging)
 
-        self.device_wrapper.threaded_connection.callback(
-            setAveraging,
-            self.device_wrapper.threaded_connection.getAverageCount()
-        )
-
         # get beam diameter
         def setBeamDiameter(diameter: float):
             diameter *= sqrt(2)  # conversion from gauss circular beam
@@ -284,11 +269,6 @@ class PowerMeterVBoxLayout(QVBoxLayout):
                 self.status_beam_diameter.setTargetValue(diameter)
                 self.spinbox_beam_diameter.setValue(diameter)
 
-        self.device_wrapper.threaded_connection.callback(
-            setBeamDiameter,
-            self.device_wrapper.threaded_connection.getBeamDiameter(TLPMxValues.Attribute.SetValue)
-        )
-
         # get display value
         def setDisplayValue(values: [float, float]):
             value = self.getDisplayParameter(values)
@@ -300,10 +280,15 @@ class PowerMeterVBoxLayout(QVBoxLayout):
                 self.reset_min_max_next_update = False
                 self.resetMinMax()
 
-        self.device_wrapper.threaded_connection.callback(
-            setDisplayValue,
-            self.device_wrapper.threaded_connection.measure()
-        )
+        # every value is applied on its own, so a failed call only misses its value and its error is logged by the connection
+        # the startup values are read once, so only timer reads are dropped if not started in time
+        connection = self.device_wrapper.threaded_connection
+        reads = connection if set_startup else connection.polling()
+        connection.callback(setWavelength, reads.getWavelength(TLPMxValues.Attribute.SetValue))
+        connection.callback(setAttenuation, reads.getAttenuation(TLPMxValues.Attribute.SetValue))
+        connection.callback(setAveraging, reads.getAverageCount())
+        connection.callback(setBeamDiameter, reads.getBeamDiameter(TLPMxValues.Attribute.SetValue))
+        connection.callback(setDisplayValue, reads.measure())
 
     def updateAllValues(self):
         """Updates all values"""
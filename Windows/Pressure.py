@@ -131,7 +131,7 @@ class PressureVBoxLayout(QVBoxLayout):
                     continue
                 pressure_widget.setPressure(pressure)
 
-        self.device_wrapper.threaded_connection.callback(setPressures, self.device_wrapper.threaded_connection.getPressureAll())
+        self.device_wrapper.threaded_connection.callback(setPressures, self.device_wrapper.threaded_connection.polling().getPressureAll())
 
     def connect(self, comport: str = '', messagebox: bool = True):
         """